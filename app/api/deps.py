@@ -4,7 +4,7 @@ from collections.abc import AsyncIterator
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import Depends, Query, Request
+from fastapi import Depends, Header, Query, Request
 from fastapi.security import OAuth2PasswordBearer
 
 from app.api.files.exceptions import DownloadNotFound
@@ -16,6 +16,8 @@ from app.app.infrastructure.worker import IWorker
 from app.app.users.domain import User
 from app.config import config
 from app.infrastructure.context import UseCases
+from app.infrastructure.database.tortoise.routers import read_your_writes
+from app.toolkit.mediatypes import MediaType
 
 from . import exceptions, shortcuts
 
@@ -23,6 +25,7 @@ __all__ = [
     "CurrentUserDeps",
     "CurrentUserContextDeps",
     "NamespaceDeps",
+    "ThumbnailTypeDeps",
     "UseCasesDeps",
     "VerifiedCurrentUserDeps",
     "WorkerDeps",
@@ -67,7 +70,13 @@ async def current_user_ctx(
     """Sets context about current user."""
     current_user = CurrentUser(id=user.id, username=user.username)
     with CurrentUserContext(user=current_user) as ctx:
-        yield ctx
+        if not config.database.replica_dsns:
+            yield ctx
+            return
+
+        window = config.database.replica_read_your_writes_window
+        async with read_your_writes(user.id, window):
+            yield ctx
 
 
 async def current_user(
@@ -102,12 +111,18 @@ async def namespace(
     return await usecases.namespace.namespace.get_by_owner_id(user.id)
 
 
+def thumbnail_type(accept: str | None = Header(default=None)) -> MediaType:
+    """Returns a thumbnail format negotiated from the Accept header."""
+    return shortcuts.negotiate_thumbnail_type(accept)
+
+
 CurrentUserDeps = Annotated[User, Depends(current_user)]
 CurrentUserContextDeps = Annotated[
     CurrentUserContext, Depends(current_user_ctx)
 ]
 DownloadCacheDeps = Annotated[File, Depends(download_cache)]
 NamespaceDeps = Annotated[Namespace, Depends(namespace)]
+ThumbnailTypeDeps = Annotated[MediaType, Depends(thumbnail_type)]
 UseCasesDeps = Annotated[UseCases, Depends(usecases)]
 VerifiedCurrentUserDeps = Annotated[User, Depends(verified_current_user)]
 WorkerDeps = Annotated[IWorker, Depends(worker)]
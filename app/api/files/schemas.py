@@ -7,7 +7,13 @@ from typing import TYPE_CHECKING, Annotated, Self
 from uuid import UUID
 
 from fastapi import UploadFile
-from pydantic import BaseModel, RootModel, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    RootModel,
+    field_validator,
+    model_validator,
+)
 from pydantic.functional_validators import AfterValidator
 
 from app.config import ThumbnailSize as AppThumbnailSize
@@ -71,6 +77,7 @@ class FileSchema(BaseModel):
     hidden: bool = False
     shared: bool
     thumbnail_url: str | None
+    placeholder: str | None
     modified_at: datetime
 
     @classmethod
@@ -84,6 +91,7 @@ class FileSchema(BaseModel):
             hidden=file.is_hidden(),
             shared=file.shared,
             thumbnail_url=cls._make_thumbnail_url(request, file),
+            placeholder=file.placeholder,
             modified_at=file.modified_at,
         )
 
@@ -135,6 +143,16 @@ class AsyncTaskResult(BaseModel):
         )
 
 
+class AsyncTaskProgress(BaseModel):
+    index: int
+    result: AsyncTaskResult
+
+
+class AsyncTaskCheckResponse(BaseModel):
+    status: AsyncTaskStatus
+    result: list[AsyncTaskResult] | None = None
+
+
 class CreateFolderRequest(PathRequest):
     @field_validator("path")
     @classmethod
@@ -186,6 +204,11 @@ class GetBatchRequest(BaseModel):
     ids: list[UUID]
 
 
+class GetThumbnailBatchRequest(BaseModel):
+    ids: Annotated[list[UUID], Field(min_length=1, max_length=200)]
+    size: ThumbnailSize
+
+
 class GetBatchResponse(BaseModel):
     items: list[FileSchema]
     count: int
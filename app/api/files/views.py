@@ -1,7 +1,8 @@
+from collections.abc import AsyncIterator
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Form, Request
+from fastapi import APIRouter, Form, Header, Request
 from fastapi import File as FileParam
 from fastapi.responses import Response, StreamingResponse
 
@@ -10,6 +11,7 @@ from app.api.deps import (
     CurrentUserContextDeps,
     DownloadCacheDeps,
     NamespaceDeps,
+    ThumbnailTypeDeps,
     UseCasesDeps,
     VerifiedCurrentUserDeps,
     WorkerDeps,
@@ -18,12 +20,13 @@ from app.app.blobs.domain import BlobMetadata
 from app.app.files.domain import File
 from app.app.infrastructure.worker import JobStatus
 from app.app.users.domain import Account
-from app.cache import disk_cache
 from app.toolkit import timezone
 
 from . import exceptions
 from .schemas import (
+    AsyncTaskCheckResponse,
     AsyncTaskID,
+    AsyncTaskProgress,
     AsyncTaskResult,
     AsyncTaskStatus,
     CreateFolderRequest,
@@ -35,6 +38,7 @@ from .schemas import (
     GetBatchResponse,
     GetContentMetadataResponse,
     GetDownloadUrlResponse,
+    GetThumbnailBatchRequest,
     IDRequest,
     LastModifiedParam,
     ListFolderResponse,
@@ -49,11 +53,65 @@ from .schemas import (
 
 router = APIRouter()
 
+# how long a task is watched before a client has to reconnect
+_WATCH_TIMEOUT = 60
 
-def _make_thumbnail_ttl(*args, size: ThumbnailSize, **kwargs) -> str:
-    if size.asint() == ThumbnailSize.xs.asint():
-        return "7d"
-    return "24h"
+
+def _format_event(event: str, data: str, *, id: str | None = None) -> str:
+    """Formats a Server-Sent Event."""
+    if id is None:
+        return f"event: {event}\ndata: {data}\n\n"
+    return f"id: {id}\nevent: {event}\ndata: {data}\n\n"
+
+
+@router.get("/async_tasks/{async_task_id}/events")
+async def watch_async_task(
+    request: Request,
+    async_task_id: str,
+    _: NamespaceDeps,
+    worker: WorkerDeps,
+    last_event_id: Annotated[str | None, Header(pattern=r"^\d+-\d+$")] = None,
+) -> StreamingResponse:
+    """
+    Stream progress of a batch task as Server-Sent Events.
+
+    A `progress` event is sent with an index and a result of each item as soon as
+    the item is processed, and a `completed` event with all results is sent when the
+    task completes. If the task takes too long, the stream is closed earlier, and
+    a client may reconnect with the `Last-Event-ID` header to continue from where it
+    left off.
+    """
+    async def events() -> AsyncIterator[str]:
+        progress = worker.watch(
+            async_task_id, last_id=last_event_id, timeout=_WATCH_TIMEOUT
+        )
+        async for item in progress:
+            index, result = item.item
+            data = AsyncTaskProgress(
+                index=index,
+                result=AsyncTaskResult.from_entity(result, request=request),
+            )
+            yield _format_event("progress", data.model_dump_json(), id=item.id)
+
+        if await worker.get_status(async_task_id) == JobStatus.complete:
+            results = await worker.get_result(async_task_id)
+            response = AsyncTaskCheckResponse(
+                status=AsyncTaskStatus.completed,
+                result=[
+                    AsyncTaskResult.from_entity(result, request=request)
+                    for result in results
+                ] if results is not None else None,
+            )
+            yield _format_event("completed", response.model_dump_json())
+
+    headers = {
+        "Cache-Control": "no-cache",
+        # tell nginx not to buffer events
+        "X-Accel-Buffering": "no",
+    }
+    return StreamingResponse(
+        events(), headers=headers, media_type="text/event-stream"
+    )
 
 
 @router.post("/create_folder")
@@ -276,21 +334,21 @@ async def get_content_metadata(
 
 
 @router.get("/get_thumbnail/{file_id}")
-@disk_cache(
-    key="{file_id}:{size}",
-    ttl=_make_thumbnail_ttl,
-    tags=["thumbnails:{file_id}"],
-)
 async def get_thumbnail(
     file_id: UUID,
     size: ThumbnailSize,
     namespace: NamespaceDeps,
     usecases: UseCasesDeps,
+    output_type: ThumbnailTypeDeps,
 ):
-    """Get thumbnail for an image file."""
+    """
+    Get thumbnail for an image file.
+
+    The thumbnail format is negotiated with the Accept header.
+    """
     try:
         file, thumbnail, mediatype = await usecases.namespace.get_file_thumbnail(
-            namespace.path, file_id, size=size.asint()
+            namespace.path, file_id, size=size.asint(), output_type=output_type
         )
     except File.ActionNotAllowed as exc:
         raise exceptions.FileActionNotAllowed() from exc
@@ -308,11 +366,35 @@ async def get_thumbnail(
         "Content-Length": str(len(thumbnail)),
         "Content-Type": mediatype.value,
         "Cache-Control": "private, max-age=31536000, no-transform",
+        "Vary": "Accept",
     }
 
     return Response(thumbnail, headers=headers)
 
 
+@router.post("/get_thumbnail_batch")
+async def get_thumbnail_batch(
+    payload: GetThumbnailBatchRequest,
+    namespace: NamespaceDeps,
+    usecases: UseCasesDeps,
+    output_type: ThumbnailTypeDeps,
+) -> StreamingResponse:
+    """
+    Get thumbnails for multiple files at once.
+
+    Thumbnails are streamed as a multipart/mixed body in the order they become
+    ready, with a file ID in the Content-ID header of each part. Files without
+    a thumbnail are omitted.
+    """
+    thumbnails = await usecases.namespace.get_file_thumbnail_batch(
+        namespace.path,
+        payload.ids,
+        size=payload.size.asint(),
+        output_type=output_type,
+    )
+    return shortcuts.make_thumbnail_batch_response(thumbnails)
+
+
 @router.post("/list_folder")
 async def list_folder(
     request: Request,
@@ -40,7 +40,7 @@ class Lifespan:
         async with self.ctx as ctx:
             yield {
                 "usecases": ctx.usecases,
-                "worker": ctx._infra.worker,
+                "worker": ctx.worker,
             }
 
 
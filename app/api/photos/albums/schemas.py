@@ -18,6 +18,7 @@ if TYPE_CHECKING:
 class AlbumCoverSchema(BaseModel):
     media_item_id: UUID
     thumbnail_url: str
+    placeholder: str | None
 
     @overload
     @classmethod
@@ -40,6 +41,7 @@ class AlbumCoverSchema(BaseModel):
                     media_item_id=entity.media_item_id,
                 )
             ),
+            placeholder=entity.placeholder,
         )
 
 
@@ -69,6 +71,7 @@ class AlbumItemSchema(BaseModel):
     size: int
     media_type: str
     thumbnail_url: str | None
+    placeholder: str | None
     taken_at: datetime | None
     created_at: datetime
     modified_at: datetime
@@ -82,6 +85,7 @@ class AlbumItemSchema(BaseModel):
             size=entity.size,
             media_type=entity.media_type,
             thumbnail_url=make_thumbnail_url(request, entity),
+            placeholder=entity.placeholder,
             taken_at=entity.taken_at,
             created_at=entity.created_at,
             modified_at=entity.modified_at,
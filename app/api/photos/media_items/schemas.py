@@ -7,6 +7,7 @@ from uuid import UUID
 from fastapi import Request, UploadFile
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.api.files.schemas import ThumbnailSize
 from app.api.photos.utils.urls import make_thumbnail_url
 from app.app.blobs.domain import BlobMetadata
 from app.app.photos.domain import MediaItem
@@ -19,6 +20,7 @@ class MediaItemSchema(BaseModel):
     size: int
     media_type: str
     thumbnail_url: str | None
+    placeholder: str | None
     taken_at: datetime | None
     created_at: datetime
     modified_at: datetime
@@ -32,6 +34,7 @@ class MediaItemSchema(BaseModel):
             size=entity.size,
             media_type=entity.media_type,
             thumbnail_url=make_thumbnail_url(request, entity),
+            placeholder=entity.placeholder,
             taken_at=entity.taken_at,
             created_at=entity.created_at,
             modified_at=entity.modified_at,
@@ -74,6 +77,11 @@ class GetDownloadUrlRequest(BaseModel):
     ids: Annotated[list[UUID], Field(min_length=1, max_length=1000)]
 
 
+class GetThumbnailBatchRequest(BaseModel):
+    ids: Annotated[list[UUID], Field(min_length=1, max_length=200)]
+    size: ThumbnailSize
+
+
 class GetDownloadUrlResponse(BaseModel):
     download_url: str
 
@@ -4,13 +4,13 @@ from uuid import UUID
 from fastapi import APIRouter, File, Query, Request
 from fastapi.responses import Response, StreamingResponse
 
-from app.api.deps import CurrentUserDeps, UseCasesDeps
+from app.api import shortcuts
+from app.api.deps import CurrentUserDeps, ThumbnailTypeDeps, UseCasesDeps
 from app.api.files.schemas import ThumbnailSize
 from app.api.paginator import Page, get_offset
 from app.api.photos import exceptions
 from app.app.blobs.domain import Blob, BlobMetadata
 from app.app.photos.domain import MediaItem
-from app.cache import disk_cache
 
 from .deps import DownloadMediaItemBatchCache, DownloadMediaItemCache
 from .schemas import (
@@ -21,6 +21,7 @@ from .schemas import (
     GetContentMetadataResponse,
     GetDownloadUrlRequest,
     GetDownloadUrlResponse,
+    GetThumbnailBatchRequest,
     ListFavouriteMediaItemsResponse,
     MediaItemIDRequest,
     MediaItemSchema,
@@ -32,13 +33,6 @@ from .schemas import (
 router = APIRouter()
 
 
-def _make_thumbnail_ttl(*args, size: ThumbnailSize, **kwargs) -> str:
-    size = ThumbnailSize(size)
-    if size.asint() == ThumbnailSize.xs.asint():
-        return "7d"
-    return "24h"
-
-
 @router.get("/count")
 async def count_media_items(
     usecases: UseCasesDeps,
@@ -185,24 +179,24 @@ async def unmark_favourite_batch(
     "/get_thumbnail/{media_item_id}",
     name="get_media_item_thumbnail",
 )
-@disk_cache(
-    key="{media_item_id}:{size}",
-    ttl=_make_thumbnail_ttl,
-    tags=["thumbnails:{media_item_id}"],
-)
 async def get_thumbnail(
     media_item_id: str,
     size: str,
     usecases: UseCasesDeps,
     user: CurrentUserDeps,
+    output_type: ThumbnailTypeDeps,
 ):
-    """Get thumbnail for an image media item."""
+    """
+    Get thumbnail for an image media item.
+
+    The thumbnail format is negotiated with the Accept header.
+    """
     item_id = UUID(media_item_id)
     thumbnail_size = ThumbnailSize(size)
 
     try:
         item, thumbnail, mediatype = await usecases.media_item.thumbnail(
-            user.id, item_id, thumbnail_size.asint()
+            user.id, item_id, thumbnail_size.asint(), output_type
         )
     except Blob.ThumbnailUnavailable as exc:
         raise exceptions.ThumbnailUnavailable() from exc
@@ -215,11 +209,32 @@ async def get_thumbnail(
         "Content-Length": str(len(thumbnail)),
         "Content-Type": mediatype.value,
         "Cache-Control": "private, max-age=31536000, no-transform",
+        "Vary": "Accept",
     }
 
     return Response(thumbnail, headers=headers)
 
 
+@router.post("/get_thumbnail_batch")
+async def get_thumbnail_batch(
+    payload: GetThumbnailBatchRequest,
+    usecases: UseCasesDeps,
+    user: CurrentUserDeps,
+    output_type: ThumbnailTypeDeps,
+) -> StreamingResponse:
+    """
+    Get thumbnails for multiple media items at once.
+
+    Thumbnails are streamed as a multipart/mixed body in the order they become
+    ready, with a media item ID in the Content-ID header of each part. Media items
+    without a thumbnail are omitted.
+    """
+    thumbnails = await usecases.media_item.thumbnail_batch(
+        user.id, payload.ids, payload.size.asint(), output_type
+    )
+    return shortcuts.make_thumbnail_batch_response(thumbnails)
+
+
 @router.get("/list")
 async def list_media_items(
     request: Request,
@@ -3,7 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Request, Response
 
 from app.api import shortcuts
-from app.api.deps import NamespaceDeps, UseCasesDeps
+from app.api.deps import NamespaceDeps, ThumbnailTypeDeps, UseCasesDeps
 from app.api.files.exceptions import FileActionNotAllowed, PathNotFound
 from app.api.files.schemas import ThumbnailSize
 from app.app.files.domain import File, SharedLink
@@ -100,21 +100,28 @@ async def get_shared_link_thumbnail(
     token: str,
     size: ThumbnailSize,
     usecases: UseCasesDeps,
+    output_type: ThumbnailTypeDeps,
 ):
-    """Get a thumbnail for a shared link file."""
+    """
+    Get a thumbnail for a shared link file.
+
+    The thumbnail format is negotiated with the Accept header.
+    """
     try:
         _, thumb, mediatype = await usecases.sharing.get_link_thumbnail(
-            token, size=size.asint()
+            token, size=size.asint(), output_type=output_type
         )
     except SharedLink.NotFound as exc:
         raise SharedLinkNotFound() from exc
 
-    filename = f"thumbnail-{size.value}.webp"
+    _, _, subtype = mediatype.value.partition("/")
+    filename = f"thumbnail-{size.value}.{subtype}"
     headers = {
         "Content-Disposition": f'inline; filename="{filename}"',
         "Content-Length": str(len(thumb)),
         "Content-Type": mediatype.value,
         "Cache-Control": "private, max-age=31536000, no-transform",
+        "Vary": "Accept",
     }
     return Response(thumb, headers=headers)
 
@@ -3,9 +3,15 @@ from __future__ import annotations
 import secrets
 from typing import TYPE_CHECKING
 
+from fastapi.responses import StreamingResponse
+
 from app.cache import cache
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from uuid import UUID
+
     from app.app.files.domain import File
 
 
@@ -23,3 +29,66 @@ async def pop_download_cache(token: str) -> File | None:
         return None
     await cache.delete(token)
     return value
+
+
+def negotiate_thumbnail_type(accept: str | None) -> MediaType:
+    """
+    Picks a thumbnail format for the Accept header. AVIF is served only to clients
+    that ask for it explicitly. WebP is served to clients that ask for it, accept
+    anything or send no header at all, and JPEG is served to everyone else.
+    """
+    if accept is None:
+        return MediaType.IMAGE_WEBP
+
+    weights: dict[str, float] = {}
+    for value in accept.split(","):
+        mediatype, *params = (part.strip() for part in value.split(";"))
+        weight = 1.0
+        for param in params:
+            name, _, q = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(q)
+                except ValueError:
+                    weight = 0.0
+        weights[mediatype.lower()] = weight
+
+    if weights.get(MediaType.IMAGE_AVIF, 0) > 0:
+        return MediaType.IMAGE_AVIF
+
+    webp = weights.get(MediaType.IMAGE_WEBP)
+    if webp is None:
+        webp = max(weights.get("image/*", 0), weights.get("*/*", 0))
+    if webp > 0:
+        return MediaType.IMAGE_WEBP
+    return MediaType.IMAGE_JPEG
+
+
+def make_thumbnail_batch_response(
+    thumbnails: AsyncIterator[tuple[UUID, bytes, MediaType]],
+) -> StreamingResponse:
+    """
+    Streams thumbnails as a multipart/mixed body. Every part has an ID of the item
+    in the Content-ID header and parts are sent as soon as thumbnails are ready.
+    """
+    boundary = secrets.token_hex(16)
+
+    async def _body() -> AsyncIterator[bytes]:
+        async for item_id, thumbnail, mediatype in thumbnails:
+            yield (
+                f"--{boundary}\r\n"
+                f"Content-Type: {mediatype.value}\r\n"
+                f"Content-ID: {item_id}\r\n"
+                f"Content-Length: {len(thumbnail)}\r\n"
+                "\r\n"
+            ).encode()
+            yield thumbnail
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode()
+
+    headers = {"Cache-Control": "private, no-store", "Vary": "Accept"}
+    return StreamingResponse(
+        _body(),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers=headers,
+    )
@@ -18,4 +18,5 @@ class BlobMetadata(BaseModel):
     NotFound: ClassVar[type[Exception]] = BlobMetadataNotFound
 
     blob_id: UUID
-    data: Exif
+    data: Exif | None
+    placeholder: str | None = None
@@ -5,7 +5,8 @@ from typing import TYPE_CHECKING, Protocol, TypedDict
 from app.app.blobs.domain import Blob
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Sequence
+    from datetime import datetime
     from uuid import UUID
 
 __all__ = ["IBlobRepository", "BlobUpdate"]
@@ -42,9 +43,25 @@ class IBlobRepository(Protocol):
     async def get_by_id_batch(self, blob_ids: Sequence[UUID]) -> list[Blob]:
         """Returns all blobs with target IDs."""
 
+    async def list_ids_without_metadata(
+        self,
+        created_after: datetime,
+        created_before: datetime,
+        media_types: Iterable[str],
+    ) -> list[UUID]:
+        """
+        Returns IDs of blobs of given media types created within a given period
+        that have no metadata, ordered by creation time.
+        """
+
     async def replace_storage_key_prefix(self, at: str, to: str) -> None:
         """Replaces the storage key prefix for all matching blobs."""
 
+    async def update_storage_key_batch(
+        self, items: Sequence[tuple[UUID, str]]
+    ) -> None:
+        """Sets storage keys for multiple blobs at once by (blob ID, key) pairs."""
+
     async def save(self, blob: Blob) -> Blob:
         """
         Save a new blob record.
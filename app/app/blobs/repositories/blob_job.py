@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING, Protocol
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
+    from datetime import datetime
     from uuid import UUID
 
     from app.app.blobs.domain.blob_job import BlobJob
@@ -18,5 +19,8 @@ class IBlobJobRepository(Protocol):
     async def get_by_id_batch(self, ids: Sequence[UUID]) -> list[BlobJob]:
         """Returns blob jobs with the given IDs."""
 
+    async def list_ids(self, *, created_before: datetime) -> list[UUID]:
+        """Returns IDs of blob jobs created before a given time, oldest first."""
+
     async def save_batch(self, jobs: Sequence[BlobJob]) -> list[BlobJob]:
         """Saves multiple blob jobs at once."""
@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Protocol
 from app.app.blobs.domain import BlobMetadata
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from uuid import UUID
 
 __all__ = ["IBlobMetadataRepository"]
@@ -19,5 +20,19 @@ class IBlobMetadataRepository(Protocol):
             BlobMetadata.NotFound: If metadata for the given blob ID does not exist.
         """
 
+    async def get_by_chash(self, chash: str, media_type: str) -> BlobMetadata:
+        """
+        Get metadata of any blob with the given content hash and media type.
+
+        Raises:
+            BlobMetadata.NotFound: If no such blob has metadata.
+        """
+
     async def save(self, metadata: BlobMetadata) -> BlobMetadata:
         """Save blob metadata."""
+
+    async def save_batch(self, metadata: Iterable[BlobMetadata]) -> None:
+        """
+        Saves multiple blob metadata at once. Metadata for blobs that don't exist
+        or already have metadata is skipped.
+        """
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 import os.path
-from typing import TYPE_CHECKING, Protocol
+from datetime import timedelta
+from typing import IO, TYPE_CHECKING, Protocol
 
 from app.app.blobs.domain import Blob, BlobJob
 from app.app.blobs.domain.blob_job import (
@@ -14,10 +16,13 @@ from app.app.blobs.domain.blob_job import (
 from app.app.infrastructure.database import SENTINEL_ID
 from app.app.infrastructure.storage import DownloadBatchItem
 from app.toolkit import chash as chash_mod
-from app.toolkit import mediatypes, timezone
+from app.toolkit import mediatypes, taskgroups, timezone
+from app.toolkit.debounce import Debouncer
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator, Iterable, Sequence
+    from contextlib import AbstractAsyncContextManager
+    from datetime import datetime
     from uuid import UUID
 
     from app.app.blobs.domain import IBlobContent
@@ -31,9 +36,19 @@ if TYPE_CHECKING:
 
 __all__ = ["BlobService"]
 
+# jobs are loaded and applied to the database in chunks of that size
+_JOB_BATCH_SIZE = 500
+# max number of storage operations running at the same time
+_STORAGE_CONCURRENCY = 16
+# jobs pending for longer than that are considered lost and applied by a cron job
+_PENDING_JOB_DELAY = timedelta(minutes=10)
+# blob jobs created within that window (in seconds) are enqueued together
+_ENQUEUE_WINDOW = 0.5
+_ENQUEUE_MAX_SIZE = 5000
+
 
 class BlobService:
-    __slots__ = ("db", "storage", "worker")
+    __slots__ = ("db", "storage", "worker", "_pending")
 
     def __init__(
         self,
@@ -44,6 +59,9 @@ class BlobService:
         self.db = database
         self.storage = storage
         self.worker = worker
+        self._pending = Debouncer(
+            self._enqueue_jobs, window=_ENQUEUE_WINDOW, max_size=_ENQUEUE_MAX_SIZE
+        )
 
     async def create(self, storage_key: str, content: IBlobContent) -> Blob:
         media_type = mediatypes.guess(content.file, name=storage_key)
@@ -67,7 +85,7 @@ class BlobService:
                 payload=BlobJobDeletePrefixPayload(storage_key_prefix=prefix),
             )
         ])
-        await self.worker.enqueue("process_blob_jobs", ids=[job.id for job in jobs])
+        await self._schedule(jobs)
 
     async def delete_batch(self, blob_ids: Sequence[UUID]) -> None:
         if not blob_ids:
@@ -87,7 +105,7 @@ class BlobService:
             )
             for blob in blobs
         ])
-        await self.worker.enqueue("process_blob_jobs", ids=[job.id for job in jobs])
+        await self._schedule(jobs)
 
     async def move(self, blob_id: UUID, storage_key: str) -> None:
         blob = await self.db.blob.get_by_id(blob_id)
@@ -107,7 +125,7 @@ class BlobService:
                 ),
             )
         ])
-        await self.worker.enqueue("process_blob_jobs", ids=[job.id for job in jobs])
+        await self._schedule(jobs)
 
     async def move_with_prefix(self, prefix: str, to_prefix: str) -> None:
         jobs = await self.db.blob_job.save_batch([
@@ -119,10 +137,12 @@ class BlobService:
                 ),
             )
         ])
-        await self.worker.enqueue("process_blob_jobs", ids=[job.id for job in jobs])
+        await self._schedule(jobs)
 
-    def download(self, storage_key: str) -> AsyncIterator[bytes]:
-        return self.storage.download(storage_key)
+    def download(
+        self, storage_key: str, *, length: int | None = None
+    ) -> AsyncIterator[bytes]:
+        return self.storage.download(storage_key, length=length)
 
     def download_batch(self, items: Iterable[DownloadBatchItem]) -> Iterable[bytes]:
         return self.storage.download_batch(items)
@@ -136,67 +156,194 @@ class BlobService:
     async def get_by_id_batch(self, blob_ids: Sequence[UUID]) -> list[Blob]:
         return await self.db.blob.get_by_id_batch(blob_ids)
 
+    async def list_ids_without_metadata(
+        self,
+        created_after: datetime,
+        created_before: datetime,
+        media_types: Iterable[str],
+    ) -> list[UUID]:
+        return await self.db.blob.list_ids_without_metadata(
+            created_after, created_before, media_types
+        )
+
+    def open_local(
+        self,
+        storage_key: str,
+        *,
+        length: int | None = None,
+        in_memory: bool = True,
+    ) -> AbstractAsyncContextManager[IO[bytes]]:
+        """
+        Opens blob content as a local file, that can be read directly by a path.
+        Content from remote storages is downloaded to a temporary file first.
+
+        Raises:
+            File.NotFound: If content at the storage key does not exist.
+        """
+        return self.storage.open_local(
+            storage_key, length=length, in_memory=in_memory
+        )
+
     async def process_blob_jobs(self, ids: Sequence[UUID]) -> None:
-        jobs = await self.db.blob_job.get_by_id_batch(ids)
-        if not jobs:
-            return
+        """
+        Applies blob jobs in chunks. Jobs are applied in the order they were
+        created, and only consecutive jobs of the same type are batched, since
+        a job may depend on an earlier one of another type. Storage operations
+        within a batch run concurrently, and database changes are applied in bulk.
+
+        Jobs that failed are kept, and the first failure is re-raised once all
+        other jobs are applied.
+        """
+        errors: list[Exception] = []
+        for i in range(0, len(ids), _JOB_BATCH_SIZE):
+            jobs = await self.db.blob_job.get_by_id_batch(ids[i:i + _JOB_BATCH_SIZE])
+            if not jobs:
+                continue
+
+            jobs.sort(key=lambda job: job.created_at)
+            semaphore = asyncio.Semaphore(_STORAGE_CONCURRENCY)
+            runs = itertools.groupby(jobs, key=lambda job: type(job.payload))
+            for payload_type, run in runs:
+                batch = list(run)
+                if payload_type is BlobJobDeletePayload:
+                    errors += await self._process_delete_jobs(batch)
+                elif payload_type is BlobJobDeletePrefixPayload:
+                    errors += await self._process_delete_prefix_jobs(batch, semaphore)
+                elif payload_type is BlobJobMovePayload:
+                    errors += await self._process_move_jobs(batch, semaphore)
+                elif payload_type is BlobJobMovePrefixPayload:
+                    errors += await self._process_move_prefix_jobs(batch)
 
-        await self._process_delete_jobs(jobs)
-        await self._process_delete_prefix_jobs(jobs)
-        await self._process_move_jobs(jobs)
-        await self._process_move_prefix_jobs(jobs)
+        if errors:
+            raise errors[0]
 
-    async def _process_delete_jobs(self, jobs: list[BlobJob]) -> None:
-        job_ids, blob_ids, storage_keys = [], [], []
+    async def process_pending_blob_jobs(self) -> int:
+        """
+        Applies blob jobs that have been pending for a while, because the worker job
+        enqueued for them was lost or has failed. Jobs are loaded in chunks.
+
+        Returns the number of pending jobs.
+        """
+        created_before = timezone.now() - _PENDING_JOB_DELAY
+        ids = await self.db.blob_job.list_ids(created_before=created_before)
+        await self.process_blob_jobs(ids)
+        return len(ids)
+
+    async def _schedule(self, jobs: Iterable[BlobJob]) -> None:
+        for job in jobs:
+            await self._pending.add(job.id)
+
+    async def _enqueue_jobs(self, ids: list[UUID]) -> None:
+        await self.worker.enqueue("process_blob_jobs", ids=ids)
+
+    async def _process_delete_jobs(self, jobs: list[BlobJob]) -> list[Exception]:
+        payloads: dict[UUID, BlobJobDeletePayload] = {}
         for job in jobs:
             if isinstance(job.payload, BlobJobDeletePayload):
-                job_ids.append(job.id)
-                blob_ids.append(job.payload.blob_id)
-                storage_keys.append(job.payload.storage_key)
+                payloads[job.id] = job.payload
 
-        if not job_ids:
-            return
+        if not payloads:
+            return []
 
-        await self.storage.delete_batch(storage_keys)
-        async with self.db.atomic():
-            await self.db.blob.delete_batch(blob_ids)
-            await self.db.blob_job.delete_by_id_batch(job_ids)
+        job_ids = list(payloads)
+        blob_ids = [payload.blob_id for payload in payloads.values()]
+        try:
+            # a blob may have been moved after the job was created
+            blobs = await self.db.blob.get_by_id_batch(blob_ids)
+            current = {blob.id: blob.storage_key for blob in blobs}
+            await self.storage.delete_batch([
+                current.get(payload.blob_id, payload.storage_key)
+                for payload in payloads.values()
+            ])
+            async with self.db.atomic():
+                await self.db.blob.delete_batch(blob_ids)
+                await self.db.blob_job.delete_by_id_batch(job_ids)
+        except Exception as exc:
+            return [exc]
+        return []
 
-    async def _process_delete_prefix_jobs(self, jobs: list[BlobJob]) -> None:
-        for job in jobs:
-            if isinstance(job.payload, BlobJobDeletePrefixPayload):
-                prefix = job.payload.storage_key_prefix
-                await self.storage.deletedir(prefix)
+    async def _process_delete_prefix_jobs(
+        self, jobs: list[BlobJob], semaphore: asyncio.Semaphore
+    ) -> list[Exception]:
+        async def _delete(job: BlobJob, prefix: str) -> Exception | None:
+            try:
+                async with semaphore:
+                    await self.storage.deletedir(prefix)
                 async with self.db.atomic():
                     await self.db.blob.delete_all_with_prefix(prefix)
                     await self.db.blob_job.delete_by_id_batch([job.id])
+            except Exception as exc:
+                return exc
+            return None
 
-    async def _process_move_jobs(self, jobs: list[BlobJob]) -> None:
+        results = await taskgroups.gather(*(
+            _delete(job, job.payload.storage_key_prefix)
+            for job in jobs
+            if isinstance(job.payload, BlobJobDeletePrefixPayload)
+        ))
+        return [exc for exc in results if exc is not None]
+
+    async def _process_move_jobs(
+        self, jobs: list[BlobJob], semaphore: asyncio.Semaphore
+    ) -> list[Exception]:
+        # moves of the same blob are applied in order, other blobs move concurrently
+        moves: dict[UUID, list[tuple[UUID, BlobJobMovePayload]]] = {}
         for job in jobs:
             if isinstance(job.payload, BlobJobMovePayload):
-                payload = job.payload
-                await self.storage.move(
-                    at=payload.at_storage_key,
-                    to=payload.to_storage_key,
-                )
-                async with self.db.atomic():
-                    await self.db.blob.update(
-                        payload.blob_id,
-                        fields={"storage_key": payload.to_storage_key},
-                    )
-                    await self.db.blob_job.delete_by_id_batch([job.id])
+                moves.setdefault(job.payload.blob_id, []).append((job.id, job.payload))
+
+        if not moves:
+            return []
+
+        async def _move(
+            items: list[tuple[UUID, BlobJobMovePayload]],
+        ) -> tuple[list[UUID], str | None, Exception | None]:
+            job_ids: list[UUID] = []
+            storage_key = None
+            async with semaphore:
+                for job_id, payload in items:
+                    try:
+                        await self.storage.move(
+                            at=payload.at_storage_key,
+                            to=payload.to_storage_key,
+                        )
+                    except Exception as exc:
+                        return job_ids, storage_key, exc
+                    job_ids.append(job_id)
+                    storage_key = payload.to_storage_key
+            return job_ids, storage_key, None
 
-    async def _process_move_prefix_jobs(self, jobs: list[BlobJob]) -> None:
+        results = await taskgroups.gather(*(_move(items) for items in moves.values()))
+        moved = [
+            (blob_id, storage_key)
+            for blob_id, (_, storage_key, _) in zip(moves, results, strict=True)
+            if storage_key is not None
+        ]
+        if moved:
+            async with self.db.atomic():
+                await self.db.blob.update_storage_key_batch(moved)
+                await self.db.blob_job.delete_by_id_batch([
+                    job_id for job_ids, _, _ in results for job_id in job_ids
+                ])
+        return [exc for _, _, exc in results if exc is not None]
+
+    async def _process_move_prefix_jobs(self, jobs: list[BlobJob]) -> list[Exception]:
+        # prefix moves are applied in order, since one may depend on another
+        errors: list[Exception] = []
         for job in jobs:
             if isinstance(job.payload, BlobJobMovePrefixPayload):
                 payload = job.payload
-                await self.storage.movedir(
-                    at=payload.at_storage_key_prefix,
-                    to=payload.to_storage_key_prefix,
-                )
-                async with self.db.atomic():
-                    await self.db.blob.replace_storage_key_prefix(
+                try:
+                    await self.storage.movedir(
                         at=payload.at_storage_key_prefix,
                         to=payload.to_storage_key_prefix,
                     )
-                    await self.db.blob_job.delete_by_id_batch([job.id])
+                    async with self.db.atomic():
+                        await self.db.blob.replace_storage_key_prefix(
+                            at=payload.at_storage_key_prefix,
+                            to=payload.to_storage_key_prefix,
+                        )
+                        await self.db.blob_job.delete_by_id_batch([job.id])
+                except Exception as exc:
+                    errors.append(exc)
+        return errors
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
-from tempfile import SpooledTemporaryFile
+import asyncio
+import itertools
+import logging
+import os
+from datetime import timedelta
 from typing import TYPE_CHECKING
 
-from app.config import config
+from app.app.blobs.domain import BlobMetadata
+from app.cache import cache
+from app.config import ThumbnailSize, config
+from app.toolkit import taskgroups, thumbnails, timezone
+from app.toolkit.debounce import Debouncer
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
     from uuid import UUID
 
+    from app.app.blobs.domain import Blob
     from app.app.blobs.services.blob import BlobService
     from app.app.blobs.services.metadata import BlobMetadataService
     from app.app.blobs.services.thumbnailer import BlobThumbnailService
@@ -15,9 +25,28 @@ if TYPE_CHECKING:
 
 __all__ = ["BlobContentProcessor"]
 
+logger = logging.getLogger(__name__)
+
+# a claim outlives a job that has crashed without releasing it
+_CLAIM_TTL = "1h"
+
+# blobs newer than that might still be waiting to be enqueued
+_MISSED_DELAY = timedelta(minutes=10)
+_MISSED_WINDOW = timedelta(hours=1)
+
+
+def _claim_key(blob_id: UUID) -> str:
+    return f"process_blob_content:{blob_id}"
+
 
 class BlobContentProcessor:
-    __slots__ = ("blob_service", "metadata_service", "thumbnail_service", "worker")
+    __slots__ = (
+        "blob_service",
+        "metadata_service",
+        "thumbnail_service",
+        "worker",
+        "_pending",
+    )
 
     def __init__(
         self,
@@ -30,23 +59,187 @@ class BlobContentProcessor:
         self.metadata_service = metadata_service
         self.thumbnail_service = thumbnail_service
         self.worker = worker
+        self._pending = Debouncer(
+            self._enqueue_batch,
+            window=config.features.content_processing_batch_window.total_seconds(),
+            max_size=config.features.content_processing_batch_size,
+        )
+
+    async def process(self, blob_id: UUID) -> int:
+        """
+        Generates thumbnails, and extracts metadata along with a low-quality image
+        placeholder for the blob content.
+
+        Only the content that is needed is fetched, based on the blob media type.
+        Content that has neither thumbnails nor metadata is not fetched at all.
+        When only metadata is needed, a header of the content might be enough.
+        Content from a local storage is read in place, and content from remote
+        storages is spilled to disk instead of memory if it is large.
+
+        Content that has already been processed for another blob with the same
+        content hash and media type is not fetched either, its metadata is copied.
 
-    async def process(self, blob_id: UUID) -> None:
-        """Downloads blob content, generates thumbnails, and extracts metadata."""
-        blob = await self.blob_service.get_by_id(blob_id)
-        chunks = self.blob_service.download(blob.storage_key)
-        with SpooledTemporaryFile() as content:
-            async for chunk in chunks:
-                content.write(chunk)
-
-            await self.thumbnail_service.generate(
-                blob.chash,
-                content,
-                sizes=config.features.pre_generated_thumbnail_sizes,
+        Returns the number of bytes fetched to process the content.
+        """
+        try:
+            blob = await self.blob_service.get_by_id(blob_id)
+            size, meta = await self._process(blob)
+            if meta is not None:
+                await self.metadata_service.track_batch([meta])
+        finally:
+            await cache.delete(_claim_key(blob_id))
+        return size
+
+    async def process_batch(self, blob_ids: Sequence[UUID]) -> int:
+        """
+        Processes content of multiple blobs concurrently, and saves their metadata
+        at once. Blobs that don't exist are skipped, and a failure to process one
+        blob doesn't affect the others.
+
+        Returns the total number of bytes fetched to process the content.
+        """
+        blobs = await self.blob_service.get_by_id_batch(blob_ids)
+        semaphore = asyncio.Semaphore(config.features.content_processing_concurrency)
+
+        async def _process(blob: Blob) -> tuple[int, BlobMetadata | None]:
+            async with semaphore:
+                try:
+                    return await self._process(blob)
+                except Exception:
+                    logger.exception("Failed to process content of blob %s", blob.id)
+                    return 0, None
+
+        try:
+            results = await taskgroups.gather(*(_process(blob) for blob in blobs))
+            await self.metadata_service.track_batch(
+                meta for _, meta in results if meta is not None
             )
+        finally:
+            await cache.delete_many(*(_claim_key(blob_id) for blob_id in blob_ids))
+        return sum(size for size, _ in results)
+
+    async def _process(self, blob: Blob) -> tuple[int, BlobMetadata | None]:
+        media_type = blob.media_type
+        thumbnailable = (
+            self.thumbnail_service.is_supported(media_type)
+            and blob.size <= self.thumbnail_service.max_file_size
+        )
+        if not thumbnailable and not self.metadata_service.is_supported(media_type):
+            return 0, None
+
+        if (memo := await self._get_memo(blob, thumbnailable)) is not None:
+            return 0, memo
+
+        length = None
+        if not thumbnailable:
+            header_size = self.metadata_service.get_header_size(media_type)
+            if header_size is not None and header_size < blob.size:
+                length = header_size
+
+        size = blob.size if length is None else length
+        in_memory = size <= config.process_pool.in_memory_content_max_size
+        opened = self.blob_service.open_local(
+            blob.storage_key, length=length, in_memory=in_memory
+        )
+        async with opened as content:
+            # the content is as large as it has been fetched, a file read in place
+            # is only read up to `length`
+            fetched = content.seek(0, os.SEEK_END)
+            if length is not None:
+                fetched = min(fetched, length)
+            content.seek(0)
+
+            placeholder = None
+            if thumbnailable:
+                thumbs = await self.thumbnail_service.generate(
+                    blob.chash,
+                    content,
+                    sizes=config.features.pre_generated_thumbnail_sizes,
+                )
+                # the placeholder is made from the smallest thumbnail right away,
+                # unless it has been generated before
+                if (thumb := thumbs.get(ThumbnailSize.xs)) is not None:
+                    placeholder = thumbnails.placeholder(thumb)
+                else:
+                    placeholder = await self.thumbnail_service.placeholder(
+                        blob.id, blob.chash
+                    )
+
             content.seek(0)
-            await self.metadata_service.track(blob.id, content)
+            meta = await self.metadata_service.extract(
+                blob.id, content, placeholder=placeholder
+            )
+        return fetched, meta
+
+    async def _get_memo(self, blob: Blob, thumbnailable: bool) -> BlobMetadata | None:
+        """
+        Returns a copy of metadata tracked for the same content, or None if content
+        has to be processed, because it's new or some of its thumbnails are missing.
+        """
+        if not blob.chash:
+            return None
+
+        try:
+            meta = await self.metadata_service.get_by_chash(
+                blob.chash, blob.media_type
+            )
+        except BlobMetadata.NotFound:
+            return None
+
+        if thumbnailable:
+            sizes = config.features.pre_generated_thumbnail_sizes
+            if not await self.thumbnail_service.exists(blob.chash, sizes):
+                return None
+
+        return BlobMetadata(
+            blob_id=blob.id, data=meta.data, placeholder=meta.placeholder
+        )
 
     async def process_async(self, blob_id: UUID) -> None:
-        """Schedules blob content processing in a worker."""
-        await self.worker.enqueue("process_blob_content", blob_id=blob_id)
+        """
+        Schedules blob content processing in a worker. Blobs scheduled within a short
+        window are grouped and processed by a single job. A blob that is already
+        waiting to be processed is skipped.
+        """
+        await self._pending.add(blob_id)
+
+    async def process_missed(self) -> int:
+        """
+        Schedules processing of recently created blobs that have no metadata yet.
+        Only blobs of media types that have thumbnails or metadata are checked,
+        other blobs never get metadata.
+
+        Blobs are grouped in memory before they are enqueued, so they are lost if
+        the process stops in between. Blobs that are still queued are skipped.
+
+        Returns the number of blobs checked.
+        """
+        created_before = timezone.now() - _MISSED_DELAY
+        media_types = (
+            self.thumbnail_service.supported_types()
+            | self.metadata_service.supported_types()
+        )
+        blob_ids = await self.blob_service.list_ids_without_metadata(
+            created_after=created_before - _MISSED_WINDOW,
+            created_before=created_before,
+            media_types=media_types,
+        )
+        batch_size = config.features.content_processing_batch_size
+        for batch in itertools.batched(blob_ids, batch_size, strict=False):
+            await self._enqueue_batch(list(batch))
+        return len(blob_ids)
+
+    async def _enqueue_batch(self, blob_ids: list[UUID]) -> None:
+        # a blob is claimed until it has been processed, so a blob that is already
+        # queued in another batch is not enqueued again
+        blob_ids = list(dict.fromkeys(blob_ids))
+        claimed = await taskgroups.gather(*(
+            cache.set(_claim_key(blob_id), 1, expire=_CLAIM_TTL, exist=False)
+            for blob_id in blob_ids
+        ))
+        blob_ids = [
+            blob_id for blob_id, ok in zip(blob_ids, claimed, strict=True) if ok
+        ]
+        if not blob_ids:
+            return
+        await self.worker.enqueue("process_blob_content_batch", blob_ids=blob_ids)
@@ -5,9 +5,13 @@ from uuid import UUID
 
 from app.app.blobs.domain import BlobMetadata
 from app.toolkit import metadata
+from app.toolkit.processpool import TaskFailed
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from app.app.blobs.repositories.metadata import IBlobMetadataRepository
+    from app.toolkit.processpool import ProcessPool
 
     class IServiceDatabase(Protocol):
         blob_metadata: IBlobMetadataRepository
@@ -16,10 +20,29 @@ if TYPE_CHECKING:
 class BlobMetadataService:
     """A service to track and retrieve file content metadata."""
 
-    __slots__ = ["db"]
+    __slots__ = ["db", "pool"]
 
-    def __init__(self, database: IServiceDatabase):
+    def __init__(self, database: IServiceDatabase, pool: ProcessPool):
         self.db = database
+        self.pool = pool
+
+    @staticmethod
+    def is_supported(mediatype: str) -> bool:
+        """True if metadata can be tracked for a given mediatype, otherwise False."""
+        return metadata.is_supported(mediatype)
+
+    @staticmethod
+    def supported_types() -> frozenset[str]:
+        """Returns mediatypes metadata can be tracked for."""
+        return frozenset(metadata.SUPPORTED_TYPES)
+
+    @staticmethod
+    def get_header_size(mediatype: str) -> int | None:
+        """
+        Returns how many first bytes of the content are enough to track metadata,
+        or None if the whole content is required.
+        """
+        return metadata.get_header_size(mediatype)
 
     async def get_by_blob_id(self, blob_id: UUID) -> BlobMetadata:
         """
@@ -28,19 +51,54 @@ class BlobMetadataService:
         Raises:
             BlobMetadata.NotFound: If BlobMetadata for a given file ID does not exist.
         """
-        return await self.db.blob_metadata.get_by_blob_id(blob_id)
+        meta = await self.db.blob_metadata.get_by_blob_id(blob_id)
+        # a placeholder can be tracked for content without any metadata
+        if meta.data is None:
+            raise BlobMetadata.NotFound()
+        return meta
 
-    async def track(self, blob_id: UUID, content: IO[bytes]) -> None:
+    async def get_by_chash(self, chash: str, media_type: str) -> BlobMetadata:
         """
-        Tracks file content metadata.
+        Get metadata tracked for any blob with the same content hash and media type,
+        including a placeholder-only one, so it can be reused for identical content.
+
+        Raises:
+            BlobMetadata.NotFound: If content hasn't been tracked yet.
+        """
+        return await self.db.blob_metadata.get_by_chash(chash, media_type)
+
+    async def extract(
+        self, blob_id: UUID, content: IO[bytes], *, placeholder: str | None = None
+    ) -> BlobMetadata | None:
+        """
+        Extracts file content metadata without saving it. Returns None if there is
+        neither metadata nor a placeholder to track.
+        """
+        try:
+            data = await metadata.load(content, pool=self.pool)
+        except TaskFailed:
+            data = None
+
+        if data is None and placeholder is None:
+            return None
+        return BlobMetadata(blob_id=blob_id, data=data, placeholder=placeholder)
+
+    async def track(
+        self, blob_id: UUID, content: IO[bytes], *, placeholder: str | None = None
+    ) -> None:
+        """
+        Tracks file content metadata and a low-quality image placeholder.
 
         Raises:
             Blob.NotFound: If a blob with specified ID doesn't exist.
         """
-        data = await metadata.load(content)
-        if data is None:
-            return
+        meta = await self.extract(blob_id, content, placeholder=placeholder)
+        if meta is not None:
+            await self.db.blob_metadata.save(meta)
 
-        await self.db.blob_metadata.save(
-            BlobMetadata(blob_id=blob_id, data=data)
-        )
+    async def track_batch(self, items: Iterable[BlobMetadata]) -> None:
+        """
+        Saves previously extracted metadata in one go. Metadata for blobs that
+        don't exist anymore is skipped.
+        """
+        await self.db.blob_metadata.save_batch(items)
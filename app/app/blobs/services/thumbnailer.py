@@ -1,44 +1,96 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os.path
+from collections import Counter
 from io import BytesIO
 from typing import IO, TYPE_CHECKING
 
 from app.app.blobs.domain import Blob
 from app.app.blobs.domain.content import InMemoryBlobContent
-from app.cache import cache
-from app.toolkit import mediatypes, thumbnails
+from app.cache import cache, disk_cache
+from app.config import ThumbnailSize
+from app.toolkit import mediatypes, taskgroups, thumbnails
+from app.toolkit.lru import LRUCache
 from app.toolkit.mediatypes import MediaType
+from app.toolkit.processpool import TaskFailed
+from app.toolkit.singleflight import SingleFlight
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import AsyncIterator, Iterable
     from uuid import UUID
 
     from app.app.blobs.services.blob import BlobService
     from app.app.infrastructure import IStorage
+    from app.toolkit.processpool import ProcessPool
 
 __all__ = ["BlobThumbnailService"]
 
-_LOCK_KEY = "generate_thumbnails:{content_hash}:{size}"
+logger = logging.getLogger(__name__)
+
+_LOCK_KEY = "generate_thumbnails:{content_hash}:{size}:{ext}"
+_GENERATE_LOCK_KEY = "generate_thumbnails:{content_hash}"
 _PREFIX = "thumbnails"
+_DISK_CACHE_KEY = "thumbnails:{content_hash}:{size}:{ext}"
+# a short-lived copy of a thumbnail for the nodes waiting on the same lock
+_HANDOFF_KEY = "thumbnails_handoff:{content_hash}:{size}:{ext}"
+_HANDOFF_TTL = 30
+_EXTENSIONS = {
+    MediaType.IMAGE_WEBP: "webp",
+    MediaType.IMAGE_AVIF: "avif",
+    MediaType.IMAGE_JPEG: "jpg",
+}
+# how many thumbnails of a batch are fetched at once
+_BATCH_CONCURRENCY = 16
+# stats are logged once per that many thumbnail lookups
+_STATS_LOG_INTERVAL = 1000
+
+
+type _Key = tuple[str, int, MediaType]
+
+
+def _sizeof(value: tuple[bytes, MediaType]) -> int:
+    return len(value[0])
 
 
 class BlobThumbnailService:
-    __slots__ = ("blob_service", "storage", "max_file_size")
+    __slots__ = (
+        "blob_service",
+        "storage",
+        "max_file_size",
+        "max_animation_frames",
+        "max_animation_duration",
+        "pool",
+        "memory_cache",
+        "_inflight",
+        "served",
+        "bytes_served",
+    )
 
     def __init__(
         self,
         blob_service: BlobService,
         storage: IStorage,
         max_file_size: int,
+        pool: ProcessPool,
+        memory_cache_max_size: int,
+        max_animation_frames: int = thumbnails.MAX_ANIMATION_FRAMES,
+        max_animation_duration: int = thumbnails.MAX_ANIMATION_DURATION,
     ) -> None:
         self.blob_service = blob_service
         self.storage = storage
         self.max_file_size = max_file_size
-
-    @staticmethod
-    def _lock_id(content_hash: str, size: int) -> str:
-        return _LOCK_KEY.format(content_hash=content_hash, size=size)
+        self.max_animation_frames = max_animation_frames
+        self.max_animation_duration = max_animation_duration
+        self.pool = pool
+        self.memory_cache: LRUCache[_Key, tuple[bytes, MediaType]] = LRUCache(
+            memory_cache_max_size, sizeof=_sizeof
+        )
+        self._inflight: SingleFlight[_Key, tuple[bytes, MediaType]] = SingleFlight()
+        # thumbnails served and their total size in bytes, by media type
+        self.served: Counter[str] = Counter()
+        self.bytes_served: Counter[str] = Counter()
 
     @staticmethod
     def is_supported(mediatype: str) -> bool:
@@ -46,66 +98,214 @@ class BlobThumbnailService:
         return thumbnails.is_supported(mediatype)
 
     @staticmethod
-    def get_storage_key(content_hash: str, size: int) -> str:
+    def supported_types() -> frozenset[str]:
+        """Returns mediatypes thumbnails are available for."""
+        return frozenset(thumbnails.SUPPORTED_TYPES)
+
+    @staticmethod
+    def get_storage_key(
+        content_hash: str, size: int, output_type: MediaType = MediaType.IMAGE_WEBP
+    ) -> str:
         parts = [
             _PREFIX,
             content_hash[:2],
             content_hash[2:4],
             content_hash[4:6],
-            f"{content_hash}_{size}.webp"
+            f"{content_hash}_{size}.{_EXTENSIONS[output_type]}"
         ]
         return os.path.join(*parts)
 
+    async def exists(self, chash: str, sizes: Iterable[int]) -> bool:
+        """True if default thumbnails of all the specified sizes are in the storage."""
+        exists = await taskgroups.gather(*(
+            self.storage.exists(self.get_storage_key(chash, size)) for size in sizes
+        ))
+        return all(exists)
+
     async def generate(
         self, chash: str, content: IO[bytes], sizes: Iterable[int]
-    ) -> None:
-        """Generates a set of thumbnails for the specified sizes."""
+    ) -> dict[int, bytes]:
+        """
+        Generates a set of thumbnails for the specified sizes. The content is
+        decoded once for all the sizes that are missing in the storage.
+
+        Only the default WebP thumbnails are generated ahead of time, other formats
+        are generated on the first request.
+
+        Returns the thumbnails that have been generated by size, thumbnails that
+        already exist are not included.
+        """
         content_size = content.seek(0, os.SEEK_END)
         if content_size > self.max_file_size:
-            return
+            return {}
 
         content.seek(0)
         media_type = mediatypes.guess(content)
         if not thumbnails.is_supported(media_type):
-            return
+            return {}
 
         if not chash:
-            return
+            return {}
 
-        for size in sizes:
-            path = self.get_storage_key(chash, size)
-            lock_id = self._lock_id(chash, size)
+        keys = {size: self.get_storage_key(chash, size) for size in sizes}
+        lock_id = _GENERATE_LOCK_KEY.format(content_hash=chash)
 
-            async with cache.lock(lock_id, expire=30, wait=True):
-                if await self.storage.exists(path):
-                    continue
+        async with cache.lock(lock_id, expire=30, wait=True):
+            exists = await taskgroups.gather(*(
+                self.storage.exists(key) for key in keys.values()
+            ))
+            missing = [
+                size for size, found in zip(keys, exists, strict=True) if not found
+            ]
+            if not missing:
+                return {}
 
-                content.seek(0)
-                try:
-                    thumbnail, _ = await thumbnails.thumbnail(content, size=size)
-                except thumbnails.ThumbnailUnavailable:
-                    return
+            content.seek(0)
+            try:
+                thumbs = await thumbnails.thumbnail_many(
+                    content,
+                    sizes=missing,
+                    max_frames=self.max_animation_frames,
+                    max_duration=self.max_animation_duration,
+                    pool=self.pool,
+                )
+            except (thumbnails.ThumbnailUnavailable, TaskFailed):
+                return {}
 
-                await self.storage.makedirs(os.path.dirname(path))
-                await self.storage.save(path, InMemoryBlobContent(thumbnail))
+            await self.storage.makedirs(os.path.dirname(keys[missing[0]]))
+            await taskgroups.gather(*(
+                self.storage.save(keys[size], InMemoryBlobContent(thumb))
+                for size, (thumb, _) in thumbs.items()
+            ))
+        return {size: thumb for size, (thumb, _) in thumbs.items()}
+
+    async def placeholder(self, blob_id: UUID, content_hash: str) -> str | None:
+        """
+        Returns a low-quality image placeholder made from the smallest thumbnail
+        or None if a blob has no thumbnail.
+        """
+        try:
+            thumb, _ = await self.thumbnail(blob_id, content_hash, ThumbnailSize.xs)
+        except (Blob.NotFound, Blob.ThumbnailUnavailable):
+            return None
+        return thumbnails.placeholder(thumb)
 
-    @cache.locked(key=_LOCK_KEY, ttl=30)
     async def thumbnail(
-        self, blob_id: UUID, content_hash: str, size: int
+        self,
+        blob_id: UUID,
+        content_hash: str,
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
     ) -> tuple[bytes, MediaType]:
         """
         Returns a thumbnail for a given blob ID. If thumbnail doesn't exist,
         it will be created and put to storage.
 
+        Thumbnails are looked up in the in-process memory cache first, then in
+        the disk cache and only then in the storage. Both caches are keyed by
+        the content hash, so the same content shares the cached thumbnail.
+        Concurrent calls for the same thumbnail are coalesced into one.
+
+        The `output_type` is a preferred format, it is ignored for thumbnails that
+        can only be stored in their own format, such as animated GIFs.
+
         Raises:
             Blob.NotFound: If blob with this ID does not exist.
             Blob.ThumbnailUnavailable: If thumbnail can't be generated for a blob.
         """
-
-        storage_key = self.get_storage_key(content_hash, size)
         if not content_hash:
             raise Blob.ThumbnailUnavailable() from None
 
+        key = (content_hash, size, output_type)
+        memory_cache = self.memory_cache
+        result = memory_cache.get(key)
+        lookups = memory_cache.hits + memory_cache.misses
+        if result is None:
+            result = await self._inflight.run(key, self._load, blob_id, *key)
+
+        thumb, mediatype = result
+        self.served[mediatype] += 1
+        self.bytes_served[mediatype] += len(thumb)
+        if lookups % _STATS_LOG_INTERVAL == 0:
+            self._log_stats()
+        return result
+
+    async def thumbnail_batch[K](
+        self,
+        items: Iterable[tuple[K, UUID, str]],
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
+    ) -> AsyncIterator[tuple[K, bytes, MediaType]]:
+        """
+        Yields thumbnails for the (key, blob ID, content hash) items in the order
+        they become ready. Thumbnails are fetched concurrently and items without
+        a thumbnail are skipped.
+        """
+        semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+        async def _thumbnail(
+            key: K, blob_id: UUID, content_hash: str
+        ) -> tuple[K, tuple[bytes, MediaType] | None]:
+            async with semaphore:
+                try:
+                    return key, await self.thumbnail(
+                        blob_id, content_hash, size, output_type
+                    )
+                except (Blob.NotFound, Blob.ThumbnailUnavailable):
+                    return key, None
+
+        tasks = [asyncio.create_task(_thumbnail(*item)) for item in items]
+        try:
+            for next_ in asyncio.as_completed(tasks):
+                key, result = await next_
+                if result is not None:
+                    yield key, *result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _load(
+        self, blob_id: UUID, content_hash: str, size: int, output_type: MediaType
+    ) -> tuple[bytes, MediaType]:
+        ext = _EXTENSIONS[output_type]
+        disk_key = _DISK_CACHE_KEY.format(content_hash=content_hash, size=size, ext=ext)
+        if (thumb := await disk_cache.get(disk_key)) is not None:
+            result = thumb, MediaType(mediatypes.guess(BytesIO(thumb)))
+        else:
+            result = await self._fetch(blob_id, content_hash, size, output_type)
+            ttl = "7d" if size <= ThumbnailSize.xs else "24h"
+            await disk_cache.set(disk_key, result[0], expire=ttl)
+
+        self.memory_cache.set((content_hash, size, output_type), result)
+        return result
+
+    async def _fetch(
+        self, blob_id: UUID, content_hash: str, size: int, output_type: MediaType
+    ) -> tuple[bytes, MediaType]:
+        """
+        Fetches a thumbnail from the storage or generates it under a lock shared
+        by all nodes. The lock holder hands the result over to the nodes waiting
+        on the lock, so they don't have to fetch it again.
+        """
+        ext = _EXTENSIONS[output_type]
+        lock_key = _LOCK_KEY.format(content_hash=content_hash, size=size, ext=ext)
+        handoff_key = _HANDOFF_KEY.format(
+            content_hash=content_hash, size=size, ext=ext
+        )
+        async with cache.lock(lock_key, expire=30, check_interval=0.05):
+            if (thumb := await cache.get(handoff_key)) is not None:
+                return thumb, MediaType(mediatypes.guess(BytesIO(thumb)))
+
+            result = await self._fetch_or_generate(
+                blob_id, content_hash, size, output_type
+            )
+            await cache.set(handoff_key, result[0], expire=_HANDOFF_TTL)
+            return result
+
+    async def _fetch_or_generate(
+        self, blob_id: UUID, content_hash: str, size: int, output_type: MediaType
+    ) -> tuple[bytes, MediaType]:
+        storage_key = self.get_storage_key(content_hash, size, output_type)
         if await self.storage.exists(storage_key):
             chunks = self.storage.download(storage_key)
             thumb = b"".join([chunk async for chunk in chunks])
@@ -115,13 +315,38 @@ class BlobThumbnailService:
         if blob.size > self.max_file_size:
             raise Blob.ThumbnailUnavailable() from None
 
-        chunks = self.blob_service.download(blob.storage_key)
-        content = BytesIO(b"".join([chunk async for chunk in chunks]))
-        try:
-            thumb, mediatype = await thumbnails.thumbnail(content, size=size)
-        except thumbnails.ThumbnailUnavailable as exc:
-            raise Blob.ThumbnailUnavailable() from exc
+        async with self.blob_service.open_local(blob.storage_key) as content:
+            try:
+                thumb, mediatype = await thumbnails.thumbnail(
+                    content,
+                    size=size,
+                    output_type=output_type,
+                    max_frames=self.max_animation_frames,
+                    max_duration=self.max_animation_duration,
+                    pool=self.pool,
+                )
+            except (thumbnails.ThumbnailUnavailable, TaskFailed) as exc:
+                raise Blob.ThumbnailUnavailable() from exc
 
         await self.storage.makedirs(os.path.dirname(storage_key))
         await self.storage.save(storage_key, InMemoryBlobContent(thumb))
         return thumb, mediatype
+
+    def _log_stats(self) -> None:
+        memory_cache = self.memory_cache
+        logger.info(
+            "Thumbnail memory cache: %s hits, %s misses, %s evictions, "
+            "%s of %s bytes used",
+            memory_cache.hits,
+            memory_cache.misses,
+            memory_cache.evictions,
+            memory_cache.size,
+            memory_cache.max_size,
+        )
+        for mediatype, served in sorted(self.served.items()):
+            logger.info(
+                "Thumbnails served as %s: %s, %s bytes",
+                mediatype,
+                served,
+                self.bytes_served[mediatype],
+            )
@@ -77,6 +77,8 @@ class File(BaseModel):
     modified_at: datetime = Field(default_factory=timezone.now)
     mediatype: str
     shared: bool = False
+    # a low-quality image placeholder, loaded only when files are fetched in bulk
+    placeholder: str | None = None
 
     def is_folder(self) -> bool:
         """True if file is a folder, False otherwise."""
@@ -10,9 +10,10 @@ from app.app.files.domain import File
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Mapping, Sequence
+    from datetime import datetime
     from uuid import UUID
 
-    from app.app.files.domain import AnyPath, File
+    from app.app.files.domain import AnyPath, File, Path
 
 __all__ = ["IFileRepository", "FileUpdate"]
 
@@ -22,6 +23,7 @@ class FileUpdate(TypedDict, total=False):
     name: str
     path: str
     size: int
+    trashed_at: datetime | None
 
 
 class IFileRepository(Protocol):
@@ -51,14 +53,34 @@ class IFileRepository(Protocol):
     ) -> None:
         """Deletes files with given paths in the specified namespace."""
 
+    async def delete_by_id_batch(self, ids: Sequence[UUID]) -> None:
+        """Deletes files with given IDs, including files marked as deleted."""
+
+    async def delete_chunk_with_prefix(
+        self, ns_path: AnyPath, prefix: AnyPath, limit: int
+    ) -> list[File]:
+        """
+        Deletes at most `limit` files with path starting with a given prefix, and
+        returns deleted files.
+        """
+
     async def exists_at_path(self, ns_path: AnyPath, path: AnyPath) -> bool:
-        """Checks whether a file or a folder exists at path in a target namespace."""
+        """
+        Checks whether a file or a folder exists at path in a target namespace.
+        Files hidden as deleted don't exist, see `set_deleted_at_batch`.
+        """
 
     async def exists_with_id(self, ns_path: AnyPath, file_id: UUID) -> bool:
         """
         Checks whether a file or a folder with a given ID exists in a target namespace.
         """
 
+    async def get_available_path(self, ns_path: AnyPath, path: AnyPath) -> Path:
+        """
+        Returns a path with modified name if the current one is already taken, otherwise
+        returns path unchanged.
+        """
+
     async def get_by_id(self, file_id: UUID) -> File:
         """
         Return a file by ID.
@@ -88,6 +110,18 @@ class IFileRepository(Protocol):
     ) -> None:
         """Increments size for specified paths."""
 
+    async def list_deleted(self, limit: int) -> list[File]:
+        """
+        Lists files marked as deleted, which still have to be purged, in the order
+        they were deleted.
+        """
+
+    async def list_trashed(self, before: datetime, limit: int) -> list[File]:
+        """
+        Lists files put in the Trash before a given time, in the order they were
+        trashed.
+        """
+
     async def list_with_prefix(self, ns_path: AnyPath, prefix: AnyPath) -> list[File]:
         """Lists all files with a path starting with a given prefix one-level deep."""
 
@@ -107,15 +141,25 @@ class IFileRepository(Protocol):
 
         Raises:
             File.AlreadyExists: If a file in a target path already exists.
+            Namespace.NotFound: If a namespace with a target path does not exist.
         """
 
     async def save_batch(self, files: Iterable[File]) -> None:
         """Save multiple files at once."""
 
+    async def set_deleted_at_batch(
+        self, ids: Sequence[UUID], deleted_at: datetime
+    ) -> None:
+        """
+        Marks files with given IDs as deleted. Such files are hidden along with
+        everything inside them until they are purged.
+        """
+
     async def update(self, file: File, fields: FileUpdate) -> File:
         """
         Updates a file with provided set of fields.
 
         Raises:
+            File.AlreadyExists: If a file at a new path already exists.
             File.NotFound: if a file with given ID does not exists.
         """
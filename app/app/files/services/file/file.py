@@ -6,6 +6,7 @@ from app.app.files.domain import File, Path
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator, Iterable
+    from contextlib import AbstractAsyncContextManager
     from datetime import datetime
     from uuid import UUID
 
@@ -49,6 +50,13 @@ class FileService:
         """
         return await self.filecore.create_folder(ns_path, path)
 
+    def defer_size_updates(self) -> AbstractAsyncContextManager[None]:
+        """
+        Merges folder size changes made within the context and applies them once
+        on exit.
+        """
+        return self.filecore.defer_size_updates()
+
     async def delete(self, ns_path: AnyPath, path: AnyPath) -> File:
         """
         Permanently deletes a file. If path is a folder deletes a folder with all of its
@@ -113,6 +121,10 @@ class FileService:
         """
         return await self.filecore.list_folder(ns_path, path)
 
+    async def list_trashed(self, before: datetime, limit: int) -> list[File]:
+        """Lists files of all namespaces put in the Trash before a given time."""
+        return await self.filecore.list_trashed(before, limit)
+
     async def move(
         self, ns_path: AnyPath, at_path: AnyPath, to_path: AnyPath
     ) -> File:
@@ -124,3 +136,7 @@ class FileService:
             at=(ns_path, at_path),
             to=(ns_path, to_path),
         )
+
+    async def purge_deleted(self) -> None:
+        """Purges contents of deleted folders, which are hidden but not gone yet."""
+        await self.filecore.purge_deleted()
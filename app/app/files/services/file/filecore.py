@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import contextlib
 import os.path
+from contextvars import ContextVar
 from typing import TYPE_CHECKING, Protocol
+from uuid import uuid7
 
 from app.app.files.domain import File, Path
 from app.app.files.repositories.file import FileUpdate
 from app.app.infrastructure.database import SENTINEL_ID
 from app.app.infrastructure.storage import DownloadBatchItem
+from app.cache import cache
 from app.toolkit import timezone
 from app.toolkit.chash import EMPTY_CONTENT_HASH
 from app.toolkit.mediatypes import MediaType
@@ -23,7 +27,8 @@ if TYPE_CHECKING:
     from app.app.blobs.services import BlobService
     from app.app.files.domain import AnyPath, File
     from app.app.files.repositories import IFileRepository, INamespaceRepository
-    from app.app.infrastructure import IDatabase, IStorage
+    from app.app.infrastructure import IDatabase, IStorage, IWorker
+    from app.typedefs import StrOrUUID
 
     class IServiceDatabase(IDatabase, Protocol):
         file: IFileRepository
@@ -31,6 +36,40 @@ if TYPE_CHECKING:
 
 __all__ = ["FileCoreService", "DownloadBatchItem"]
 
+# cached counters expire periodically, so they are recomputed from the database
+# even if some update was lost
+_SPACE_USED_TTL = "6h"
+# reservations are released right after an upload, so they only expire if a process
+# stopped before releasing them
+_SPACE_RESERVED_TTL = "1h"
+
+# contents of a deleted folder are deleted in chunks of that size, a folder that
+# doesn't fit in one chunk is marked as deleted and purged in the background
+_DELETE_CHUNK_SIZE = 1000
+# files marked as deleted are moved under that folder, which users can't reach,
+# so their paths are free again right away
+_DELETED_PATH = Path("~deleted")
+# max number of files marked as deleted to load at once
+_PURGE_BATCH_SIZE = 100
+# purge runs one at a time, so the job is enqueued under a fixed ID
+_PURGE_JOB_ID = "purge_deleted_files"
+
+# items moved right in that folder remember when, so they expire after retention
+_TRASH_PATH = Path("Trash")
+
+# folder size changes collected by `defer_size_updates`, by namespace and path
+_size_deltas: ContextVar[dict[tuple[str, Path], int] | None] = ContextVar(
+    "size_deltas", default=None
+)
+
+
+def _space_used_key(owner_id: StrOrUUID) -> str:
+    return f"space_used:{owner_id}"
+
+
+def _space_reserved_key(owner_id: StrOrUUID) -> str:
+    return f"space_reserved:{owner_id}"
+
 
 def _storage_key(owner_id: UUID, path: AnyPath) -> str:
     return os.path.join(str(owner_id), "files", str(path))
@@ -43,17 +82,19 @@ class FileCoreService:
     That service operates only with a real file path.
     """
 
-    __slots__ = ("blob_service", "db", "storage")
+    __slots__ = ("blob_service", "db", "storage", "worker")
 
     def __init__(
         self,
         database: IServiceDatabase,
         blob_service: BlobService,
         storage: IStorage,
+        worker: IWorker,
     ):
         self.db = database
         self.blob_service = blob_service
         self.storage = storage
+        self.worker = worker
 
     async def create_file(
         self,
@@ -77,24 +118,23 @@ class FileCoreService:
         try:
             parent = await self.db.file.get_by_path(ns_path, path.parent)
         except File.NotFound:
-            await self.create_folder(ns_path, str(path.parent))
+            parent = await self.create_folder(ns_path, str(path.parent))
         else:
             if not parent.is_folder():
                 raise File.NotADirectory()
 
         next_path = await self.get_available_path(ns_path, path)
-        namespace = await self.db.namespace.get_by_path(ns_path)
         blob = await self.blob_service.create(
-            _storage_key(namespace.owner_id, next_path),
+            _storage_key(parent.owner_id, next_path),
             content,
         )
 
-        async with self.db.atomic():
+        async with self._atomic():
             file = await self.db.file.save(
                 File(
                     id=SENTINEL_ID,
                     ns_path=str(ns_path),
-                    owner_id=namespace.owner_id,
+                    owner_id=parent.owner_id,
                     name=next_path.name,
                     path=next_path,
                     blob_id=blob.id,
@@ -104,8 +144,9 @@ class FileCoreService:
                     mediatype=blob.media_type,
                 ),
             )
-            await self.db.file.incr_size_batch(ns_path, next_path.parents, file.size)
+            await self._incr_size_batch(ns_path, next_path.parents, file.size)
 
+        await self._incr_space_used(file.owner_id, file.size)
         return file
 
     async def create_folder(self, ns_path: AnyPath, path: AnyPath) -> File:
@@ -150,28 +191,55 @@ class FileCoreService:
         )
         return await self.db.file.get_by_path(ns_path, path)
 
+    @contextlib.asynccontextmanager
+    async def defer_size_updates(self) -> AsyncIterator[None]:
+        """
+        Collects folder size changes made within the context, including concurrent
+        tasks started in it, and applies them on exit. Changes to the same folder
+        are merged, so each folder is updated once, and operations running
+        concurrently don't contend for the same ancestor rows.
+
+        A change is collected only once the transaction it was made in commits, so
+        an operation that fails halfway doesn't leave its changes behind.
+        """
+        deltas: dict[tuple[str, Path], int] = {}
+        token = _size_deltas.set(deltas)
+        try:
+            yield
+        finally:
+            _size_deltas.reset(token)
+            paths_by_delta: dict[tuple[str, int], list[Path]] = {}
+            for (ns_path, path), value in deltas.items():
+                if value:
+                    paths_by_delta.setdefault((ns_path, value), []).append(path)
+            async with self.db.atomic():
+                for (ns_path, value), paths in paths_by_delta.items():
+                    await self.db.file.incr_size_batch(ns_path, paths, value=value)
+
     async def delete(self, ns_path: AnyPath, path: AnyPath) -> File:
         """
         Permanently deletes a file. If path is a folder deletes a folder with all of its
         contents.
 
+        A large folder is hidden, and its path and space are released right away,
+        but the contents are purged in the background.
+
         Raises:
             File.NotFound: If a file/folder with a given path does not exists.
         """
-        async with self.db.atomic():
-            file = await self.db.file.delete(ns_path, path)
-            if file.is_folder():
-                namespace = await self.db.namespace.get_by_path(file.ns_path)
-                prefix = f"{path}/"
-                await self.db.file.delete_all_with_prefix(ns_path, prefix=prefix)
-                await self.blob_service.delete_all_with_prefix(
-                    f"{_storage_key(namespace.owner_id, file.path)}/"
-                )
-            if file.blob_id is not None:
-                await self.blob_service.delete_batch([file.blob_id])
+        async with self._atomic():
+            file = await self.db.file.get_by_path(ns_path, path)
+            purged = not file.is_folder() or await self._delete_contents_chunk(file)
+            if purged:
+                await self._delete_purged(file)
+            else:
+                await self._bury(file)
             parents = file.path.parents
-            await self.db.file.incr_size_batch(ns_path, parents, value=-file.size)
+            await self._incr_size_batch(ns_path, parents, value=-file.size)
 
+        if not purged:
+            await self.worker.enqueue("purge_deleted_files", job_id=_PURGE_JOB_ID)
+        await self._incr_space_used(file.owner_id, -file.size)
         return file
 
     async def download(self, file_id: UUID) -> tuple[File, AsyncIterator[bytes]]:
@@ -207,6 +275,9 @@ class FileCoreService:
         """
         Delete all files and folder at a given folder.
 
+        Files are hidden, and their paths and space are released right away, but they
+        are purged in the background.
+
         Raises:
             File.NotFound: If a file at a target path does not exist.
         """
@@ -215,12 +286,27 @@ class FileCoreService:
             return
 
         paths = [*file.path.parents, path]
-        namespace = await self.db.namespace.get_by_path(file.ns_path)
-        storage_key_prefix = f"{_storage_key(namespace.owner_id, file.path)}/"
-        async with self.db.atomic():
-            await self.db.file.delete_all_with_prefix(ns_path, f"{path}/")
-            await self.db.file.incr_size_batch(ns_path, paths, value=-file.size)
-            await self.blob_service.delete_all_with_prefix(storage_key_prefix)
+        async with self._atomic():
+            # contents are moved to a new folder, which is buried instead
+            tomb_path = _DELETED_PATH / str(uuid7())
+            tomb = await self.db.file.save(
+                File(
+                    id=SENTINEL_ID,
+                    ns_path=file.ns_path,
+                    owner_id=file.owner_id,
+                    name=tomb_path.name,
+                    path=tomb_path,
+                    chash=EMPTY_CONTENT_HASH,
+                    size=file.size,
+                    mediatype=MediaType.FOLDER,
+                )
+            )
+            await self._move_contents(file, tomb.path)
+            await self._bury(tomb)
+            await self._incr_size_batch(ns_path, paths, value=-file.size)
+
+        await self.worker.enqueue("purge_deleted_files", job_id=_PURGE_JOB_ID)
+        await self._incr_space_used(file.owner_id, -file.size)
 
     async def exists_with_id(self, ns_path: AnyPath, file_id: UUID) -> bool:
         """Returns True if file exists with a given ID, False otherwise"""
@@ -238,13 +324,7 @@ class FileCoreService:
         For example, if path 'a/f.tar.gz' exists, then the next path will be as follows
         'a/f (1).tar.gz'.
         """
-        path = Path(path)
-        if not await self.db.file.exists_at_path(ns_path, path):
-            return path
-
-        pattern = f"{path.stem} \\(\\d+\\){path.suffix}$"
-        count = await self.db.file.count_by_path_pattern(ns_path, pattern)
-        return path.with_stem(f"{path.stem} ({count + 1})")
+        return await self.db.file.get_available_path(ns_path, path)
 
     async def get_by_id(self, file_id: UUID) -> File:
         """
@@ -268,6 +348,22 @@ class FileCoreService:
         """
         return await self.db.file.get_by_path(ns_path, path)
 
+    async def get_space_used(self, owner_id: StrOrUUID) -> int:
+        """
+        Returns total space used by all namespaces owned by a given `owner_id`.
+
+        The value is served from a cached counter. On a cache miss the counter is
+        seeded from the database.
+        """
+        key = _space_used_key(owner_id)
+        used = await cache.get(key)
+        if used is not None:
+            return int(used)
+
+        used = await self.db.namespace.get_space_used_by_owner_id(owner_id)
+        await cache.set(key, used, expire=_SPACE_USED_TTL, exist=False)
+        return used
+
     async def list_folder(self, ns_path: AnyPath, path: AnyPath) -> list[File]:
         """
         Lists all files in the folder at a given path. Use "." to list top-level files
@@ -284,6 +380,10 @@ class FileCoreService:
         prefix = "" if path == "." else f"{path}/"
         return await self.db.file.list_with_prefix(ns_path, prefix)
 
+    async def list_trashed(self, before: datetime, limit: int) -> list[File]:
+        """Lists files of all namespaces put in the Trash before a given time."""
+        return await self.db.file.list_trashed(before, limit)
+
     async def move(
         self, at: tuple[AnyPath, AnyPath], to: tuple[AnyPath, AnyPath]
     ) -> File:
@@ -329,6 +429,154 @@ class FileCoreService:
         to_path = next_parent.path / to_path.name
         return await self._move(file, to_ns_path, to_path)
 
+    async def purge_deleted(self) -> None:
+        """
+        Purges files marked as deleted along with their contents.
+
+        Contents are deleted in chunks, each in its own transaction, so a purge
+        interrupted at any point continues from where it stopped on the next run.
+        """
+        while files := await self.db.file.list_deleted(limit=_PURGE_BATCH_SIZE):
+            for file in files:
+                async with self.db.atomic():
+                    if not file.is_folder() or await self._delete_contents_chunk(file):
+                        await self._delete_purged(file)
+
+    async def reconcile_space_used(self) -> None:
+        """
+        Recomputes all cached space usage counters from the database. Space reserved
+        for uploads in progress is counted separately, so it is kept.
+        """
+        async for key in cache.scan(_space_used_key("*")):
+            owner_id = key.rsplit(":", maxsplit=1)[-1]
+            used = await self.db.namespace.get_space_used_by_owner_id(owner_id)
+            await cache.set(key, used, expire=_SPACE_USED_TTL)
+
+    async def release_space(self, owner_id: StrOrUUID, size: int) -> None:
+        """Releases space previously reserved with the `reserve_space`."""
+        key = _space_reserved_key(owner_id)
+        if await cache.incr(key, -size) == -size:
+            # reservations have expired, don't let the counter go below zero
+            await cache.delete(key)
+
+    async def reserve_space(self, owner_id: StrOrUUID, size: int, quota: int) -> bool:
+        """
+        Atomically reserves `size` bytes of the owner space until it is released.
+
+        Reservations are kept in their own counter next to the space usage counter.
+        A reservation is added before the usage is read, so concurrent reservations
+        always see each other, and a file that has just been saved is never counted
+        twice in the usage.
+
+        Returns:
+            bool: True if space was reserved, False if reservation exceeds the quota.
+        """
+        key = _space_reserved_key(owner_id)
+        reserved = await cache.incr(key, size)
+        await cache.expire(key, _SPACE_RESERVED_TTL)
+        used = await self.get_space_used(owner_id)
+        if used + reserved > quota:
+            await self.release_space(owner_id, size)
+            return False
+        return True
+
+    async def _delete_contents_chunk(self, folder: File) -> bool:
+        """
+        Deletes a chunk of folder contents and returns whether it was the last one.
+
+        Blobs of the last chunk are left for `_delete_purged`, which deletes all
+        blobs stored under the folder at once.
+        """
+        prefix = f"{folder.path}/"
+        limit = _DELETE_CHUNK_SIZE
+        files = await self.db.file.delete_chunk_with_prefix(
+            folder.ns_path, prefix, limit
+        )
+        if len(files) < limit:
+            return True
+        await self.blob_service.delete_batch([
+            file.blob_id for file in files if file.blob_id is not None
+        ])
+        return False
+
+    @contextlib.asynccontextmanager
+    async def _atomic(self) -> AsyncIterator[None]:
+        """
+        Starts a transaction. Folder size changes deferred within it are held
+        aside and collected only if the transaction commits.
+        """
+        deltas = _size_deltas.get()
+        if deltas is None:
+            async with self.db.atomic():
+                yield
+            return
+
+        pending: dict[tuple[str, Path], int] = {}
+        token = _size_deltas.set(pending)
+        try:
+            async with self.db.atomic():
+                yield
+        finally:
+            _size_deltas.reset(token)
+        for key, value in pending.items():
+            deltas[key] = deltas.get(key, 0) + value
+
+    async def _bury(self, file: File) -> None:
+        """
+        Marks a folder as deleted and moves it with its contents under the
+        `_DELETED_PATH`, where it waits to be purged.
+        """
+        if not file.path.is_relative_to(_DELETED_PATH):
+            to_path = _DELETED_PATH / str(uuid7())
+            file_update = FileUpdate(name=to_path.name, path=str(to_path))
+            await self.db.file.update(file, file_update)
+            await self._move_contents(file, to_path)
+        await self.db.file.set_deleted_at_batch([file.id], timezone.now())
+
+    async def _delete_purged(self, file: File) -> None:
+        """Deletes a file, which content has been purged, and its blobs."""
+        await self.db.file.delete_by_id_batch([file.id])
+        if file.is_folder():
+            await self.blob_service.delete_all_with_prefix(
+                f"{_storage_key(file.owner_id, file.path)}/"
+            )
+        if file.blob_id is not None:
+            await self.blob_service.delete_batch([file.blob_id])
+
+    async def _incr_size_batch(
+        self, ns_path: AnyPath, paths: Iterable[AnyPath], value: int
+    ) -> None:
+        """Increments size of the folders, unless updates are deferred."""
+        deltas = _size_deltas.get()
+        if deltas is None:
+            await self.db.file.incr_size_batch(ns_path, paths, value=value)
+            return
+
+        for path in paths:
+            key = (str(ns_path), Path(path))
+            deltas[key] = deltas.get(key, 0) + value
+
+    async def _incr_space_used(self, owner_id: StrOrUUID, value: int) -> None:
+        """Adjusts cached space usage counter of an owner, if it is cached."""
+        if value == 0:
+            return
+        key = _space_used_key(owner_id)
+        if await cache.incr(key, value) == value:
+            # counter wasn't cached and has just been created from scratch,
+            # drop it, so the next read is seeded from the database
+            await cache.delete(key)
+
+    async def _move_contents(self, folder: File, to_path: AnyPath) -> None:
+        """Moves folder contents to another folder in the same namespace."""
+        await self.blob_service.move_with_prefix(
+            prefix=f"{_storage_key(folder.owner_id, folder.path)}/",
+            to_prefix=f"{_storage_key(folder.owner_id, to_path)}/",
+        )
+        await self.db.file.replace_path_prefix(
+            at=(folder.ns_path, folder.path),
+            to=(folder.ns_path, to_path),
+        )
+
     async def _move(self, file: File, to_ns_path: AnyPath, to_path: AnyPath) -> File:
         """Actually moves a file or a folder in the storage and in the database."""
         at_ns_path, at_path, size = file.ns_path, file.path, file.size
@@ -344,13 +592,14 @@ class FileCoreService:
             ns_path=str(to_ns_path),
             name=to_path.name,
             path=str(to_path),
+            trashed_at=timezone.now() if to_path.parent == _TRASH_PATH else None,
         )
         to_namespace = await self.db.namespace.get_by_path(to_ns_path)
         at_namespace = to_namespace
         if file.is_folder() and at_ns_path != to_ns_path:
             at_namespace = await self.db.namespace.get_by_path(at_ns_path)
 
-        async with self.db.atomic():
+        async with self._atomic():
             updated_file = await self.db.file.update(file, file_update)
             if file.blob_id is not None:
                 await self.blob_service.move(
@@ -366,6 +615,10 @@ class FileCoreService:
                     at=(at_ns_path, at_path),
                     to=(to_ns_path, to_path),
                 )
-            await self.db.file.incr_size_batch(at_ns_path, to_decrease, value=-size)
-            await self.db.file.incr_size_batch(to_ns_path, to_increase, value=size)
+            await self._incr_size_batch(at_ns_path, to_decrease, value=-size)
+            await self._incr_size_batch(to_ns_path, to_increase, value=size)
+
+        if file.owner_id != to_namespace.owner_id:
+            await self._incr_space_used(file.owner_id, -size)
+            await self._incr_space_used(to_namespace.owner_id, size)
         return updated_file
@@ -89,4 +89,33 @@ class NamespaceService:
         Returns:
             int: Space used by all namespaces by a given `owner_id`.
         """
-        return await self.db.namespace.get_space_used_by_owner_id(owner_id)
+        return await self.filecore.get_space_used(owner_id)
+
+    async def reconcile_space_used(self) -> None:
+        """Recomputes cached space usage of all owners from the database."""
+        await self.filecore.reconcile_space_used()
+
+    async def release_space(self, owner_id: StrOrUUID, size: int) -> None:
+        """
+        Releases space previously reserved with the `reserve_space`.
+
+        Args:
+            owner_id (StrOrUUID): Namespaces owner ID.
+            size (int): Reserved size in bytes.
+        """
+        await self.filecore.release_space(owner_id, size)
+
+    async def reserve_space(self, owner_id: StrOrUUID, size: int, quota: int) -> bool:
+        """
+        Atomically reserves space for an owner, so concurrent uploads can't exceed
+        the quota.
+
+        Args:
+            owner_id (StrOrUUID): Namespaces owner ID.
+            size (int): Size in bytes to reserve.
+            quota (int): Maximum space an owner can use.
+
+        Returns:
+            bool: True if space was reserved, False if the quota is exceeded.
+        """
+        return await self.filecore.reserve_space(owner_id, size, quota)
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import logging
 from typing import TYPE_CHECKING, Protocol
 
 from app.app.files.domain import File, Path
 from app.app.users.domain import Account
 from app.config import config
 from app.toolkit import taskgroups, timezone
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncIterator, Iterable
+    from collections.abc import (
+        AsyncIterator,
+        Awaitable,
+        Callable,
+        Iterable,
+        Sequence,
+    )
     from datetime import datetime
     from uuid import UUID
 
@@ -23,7 +33,6 @@ if TYPE_CHECKING:
     from app.app.files.services import FileService, NamespaceService
     from app.app.infrastructure.database import IAtomic
     from app.app.users.services import UserService
-    from app.toolkit.mediatypes import MediaType
 
     class IUseCaseServices(IAtomic, Protocol):
         audit_trail: AuditTrailService
@@ -36,6 +45,48 @@ if TYPE_CHECKING:
 
 __all__ = ["NamespaceUseCase"]
 
+logger = logging.getLogger(__name__)
+
+# max number of independent items of a batch processed at the same time
+_BATCH_CONCURRENCY = 8
+
+type _BatchItem = tuple[Sequence[AnyPath], Callable[[], Awaitable[File]]]
+type BatchResultCallback = Callable[[int, File | Exception], Awaitable[None]]
+
+
+def _group_conflicting(keys: Sequence[Iterable[AnyPath]]) -> list[list[int]]:
+    """
+    Groups items by paths they touch. Items touching the same path, or a path
+    inside another one, end up in the same group, so groups are independent from
+    each other. Items within a group keep their order.
+    """
+    parents = list(range(len(keys)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    # sorting by path parts puts every path right before its descendants
+    entries = sorted(
+        (tuple(str(Path(path)).lower().split("/")), i)
+        for i, paths in enumerate(keys)
+        for path in paths
+    )
+    ancestors: list[tuple[tuple[str, ...], int]] = []
+    for parts, i in entries:
+        while ancestors and parts[:len(ancestors[-1][0])] != ancestors[-1][0]:
+            ancestors.pop()
+        if ancestors:
+            parents[find(i)] = find(ancestors[-1][1])
+        ancestors.append((parts, i))
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(keys)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
 
 class NamespaceUseCase:
     __slots__ = [
@@ -98,12 +149,18 @@ class NamespaceUseCase:
 
         ns = await self.namespace.get_by_path(str(ns_path))
         account = await self.user.get_account(ns.owner_id)
-        if account.storage_quota is not None:
-            used = await self.namespace.get_space_used_by_owner_id(ns.owner_id)
-            if (used + content.size) > account.storage_quota:
+        quota = account.storage_quota
+        if quota is not None:
+            if not await self.namespace.reserve_space(ns.owner_id, content.size, quota):
                 raise Account.StorageQuotaExceeded()
 
-        file = await self.file.create_file(ns_path, path, content, modified_at)
+        try:
+            file = await self.file.create_file(ns_path, path, content, modified_at)
+        finally:
+            # space usage is updated once the file is saved
+            if quota is not None:
+                await self.namespace.release_space(ns.owner_id, content.size)
+
         assert file.blob_id is not None
         await self.blob_processor.process_async(file.blob_id)
 
@@ -138,6 +195,25 @@ class NamespaceUseCase:
         )
         return await self.file.delete(ns_path, path)
 
+    async def delete_item_batch(
+        self,
+        ns_path: AnyPath,
+        paths: Sequence[AnyPath],
+        *,
+        on_result: BatchResultCallback | None = None,
+    ) -> list[File | Exception]:
+        """
+        Permanently deletes multiple files and folders. Returns a deleted file or
+        an error for each path, in the same order.
+
+        The `on_result` callback is called with an index and a result of each path,
+        as soon as it is processed.
+        """
+        return await self._run_batch([
+            ((path,), functools.partial(self.delete_item, ns_path, path))
+            for path in paths
+        ], on_result=on_result)
+
     async def download(
         self, ns_path: AnyPath, path: AnyPath
     ) -> tuple[File, AsyncIterator[bytes]]:
@@ -187,10 +263,15 @@ class NamespaceUseCase:
         return await self.blob_metadata.get_by_blob_id(file.blob_id)
 
     async def get_file_thumbnail(
-        self, ns_path: AnyPath, file_id: UUID, size: int
+        self,
+        ns_path: AnyPath,
+        file_id: UUID,
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
     ) -> tuple[File, bytes, MediaType]:
         """
-        Generates in-memory thumbnail with preserved aspect ratio.
+        Generates in-memory thumbnail with preserved aspect ratio in the preferred
+        output format.
 
         Raises:
             File.ActionNotAllowed: If thumbnailing a file is not allowed.
@@ -200,9 +281,34 @@ class NamespaceUseCase:
         """
         file = await self.file.get_by_id(ns_path, file_id)
         assert file.blob_id is not None
-        thumb = await self.thumbnailer.thumbnail(file.blob_id, file.chash, size)
+        thumb = await self.thumbnailer.thumbnail(
+            file.blob_id, file.chash, size, output_type
+        )
         return file, *thumb
 
+    async def get_file_thumbnail_batch(
+        self,
+        ns_path: AnyPath,
+        ids: Iterable[UUID],
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
+    ) -> AsyncIterator[tuple[UUID, bytes, MediaType]]:
+        """
+        Returns an iterator over thumbnails of the files with target IDs in the
+        order they become ready. Folders, files from other namespaces and files
+        without a thumbnail are skipped.
+        """
+        files = await self.file.get_by_id_batch(ns_path, ids)
+        return self.thumbnailer.thumbnail_batch(
+            [
+                (file.id, file.blob_id, file.chash)
+                for file in files
+                if file.blob_id is not None
+            ],
+            size,
+            output_type,
+        )
+
     async def get_item_at_path(self, ns_path: AnyPath, path: AnyPath) -> File:
         """
         Returns a file at a given path.
@@ -263,6 +369,28 @@ class NamespaceUseCase:
         taskgroups.schedule(self.audit_trail.file_moved(file))
         return file
 
+    async def move_item_batch(
+        self,
+        ns_path: AnyPath,
+        relocations: Sequence[tuple[AnyPath, AnyPath]],
+        *,
+        on_result: BatchResultCallback | None = None,
+    ) -> list[File | Exception]:
+        """
+        Moves multiple files and folders to different locations. Returns a moved
+        file or an error for each relocation, in the same order.
+
+        The `on_result` callback is called with an index and a result of each
+        relocation, as soon as it is processed.
+        """
+        return await self._run_batch([
+            (
+                (path, next_path),
+                functools.partial(self.move_item, ns_path, path, next_path),
+            )
+            for path, next_path in relocations
+        ], on_result=on_result)
+
     async def move_item_to_trash(self, ns_path: AnyPath, path: AnyPath) -> File:
         """
         Moves a file or folder to the Trash folder in the target Namespace.
@@ -282,3 +410,113 @@ class NamespaceUseCase:
         file = await self.file.move(ns_path, path, next_path)
         taskgroups.schedule(self.audit_trail.file_trashed(file))
         return file
+
+    async def move_item_to_trash_batch(
+        self,
+        ns_path: AnyPath,
+        paths: Sequence[AnyPath],
+        *,
+        on_result: BatchResultCallback | None = None,
+    ) -> list[File | Exception]:
+        """
+        Moves multiple files and folders to the Trash folder. Returns a trashed file
+        or an error for each path, in the same order.
+
+        The `on_result` callback is called with an index and a result of each path,
+        as soon as it is processed.
+        """
+        return await self._run_batch([
+            (
+                (path, Path("Trash") / Path(path).name),
+                functools.partial(self.move_item_to_trash, ns_path, path),
+            )
+            for path in paths
+        ], on_result=on_result)
+
+    async def purge_deleted_files(self) -> None:
+        """Purges contents of deleted folders, which are hidden but not gone yet."""
+        await self.file.purge_deleted()
+
+    async def purge_expired_trash(self) -> None:
+        """
+        Permanently deletes items that have been in the Trash for longer than the
+        retention period.
+
+        Items are deleted in batches, one namespace at a time, with a pause between
+        batches, and a single call deletes a limited number of batches, the rest is
+        left to the next one. An item that fails to be deleted is logged and retried
+        on the next call.
+        """
+        before = timezone.now() - config.features.trash_retention
+        limit = config.features.trash_purge_batch_size
+        pause = config.features.trash_purge_pause.total_seconds()
+        for i in range(config.features.trash_purge_max_batches):
+            if i > 0:
+                await asyncio.sleep(pause)
+            files = await self.file.list_trashed(before, limit=limit)
+            files_by_ns_path: dict[str, list[File]] = {}
+            for file in files:
+                files_by_ns_path.setdefault(file.ns_path, []).append(file)
+
+            for ns_path, ns_files in files_by_ns_path.items():
+                async with self.file.defer_size_updates():
+                    for file in ns_files:
+                        try:
+                            await self.file.delete(ns_path, file.path)
+                        except File.NotFound:
+                            # the item might have been restored in the meantime
+                            pass
+                        except Exception:
+                            logger.exception(
+                                "Failed to purge %s from the Trash of %s",
+                                file.path,
+                                ns_path,
+                            )
+
+            if len(files) < limit:
+                return
+
+    async def reconcile_space_usage(self) -> None:
+        """Recomputes cached space usage counters from the database."""
+        await self.namespace.reconcile_space_used()
+
+    async def _run_batch(
+        self,
+        items: Sequence[_BatchItem],
+        *,
+        on_result: BatchResultCallback | None = None,
+    ) -> list[File | Exception]:
+        """
+        Runs batch items, each touching a set of paths, and collects their results.
+
+        Independent items run concurrently, and folder size changes they make are
+        merged and applied at once. Items touching the same paths depend on each
+        other, so they run one by one in the original order afterwards.
+        """
+        results: dict[int, File | Exception] = {}
+        semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+        async def _run(index: int) -> None:
+            _, call = items[index]
+            try:
+                results[index] = await call()
+            except Exception as exc:
+                results[index] = exc
+            if on_result is not None:
+                await on_result(index, results[index])
+
+        async def _run_bounded(index: int) -> None:
+            async with semaphore:
+                await _run(index)
+
+        groups = _group_conflicting([paths for paths, _ in items])
+        async with self.file.defer_size_updates():
+            await taskgroups.gather(*(
+                _run_bounded(group[0]) for group in groups if len(group) == 1
+            ))
+
+        for group in groups:
+            if len(group) > 1:
+                for index in group:
+                    await _run(index)
+        return [results[index] for index in range(len(items))]
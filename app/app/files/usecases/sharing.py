@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING, Protocol
 
 from app.app.files.domain import File
 from app.config import config
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -13,7 +14,6 @@ if TYPE_CHECKING:
     from app.app.files.services import FileService, SharingService
     from app.app.infrastructure.database import IAtomic
     from app.app.users.services import UserService
-    from app.toolkit.mediatypes import MediaType
 
     class IUseCaseServices(IAtomic, Protocol):
         file: FileService
@@ -55,12 +55,18 @@ class SharingUseCase:
         return await self.sharing.get_link_by_file_id(file.id)
 
     async def get_link_thumbnail(
-        self, token: str, *, size: int
+        self,
+        token: str,
+        *,
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
     ) -> tuple[File, bytes, MediaType]:
         link = await self.sharing.get_link_by_token(token)
         file = await self.file.filecore.get_by_id(link.file_id)
         assert file.blob_id is not None
-        thumb = await self.thumbnailer.thumbnail(file.blob_id, file.chash, size)
+        thumb = await self.thumbnailer.thumbnail(
+            file.blob_id, file.chash, size, output_type
+        )
         return file, *thumb
 
     async def get_shared_item(self, token: str) -> File:
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import abc
-from typing import TYPE_CHECKING, NamedTuple, Protocol, Self
+import contextlib
+from typing import IO, TYPE_CHECKING, NamedTuple, Protocol, Self
+
+from app.toolkit import processpool
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator, Collection, Iterable
@@ -95,9 +98,12 @@ class IStorage(Protocol):
         """
 
     @abc.abstractmethod
-    def download(self, key: str) -> AsyncIterator[bytes]:
+    def download(
+        self, key: str, *, length: int | None = None
+    ) -> AsyncIterator[bytes]:
         """
-        Return an iterator over a file content.
+        Return an iterator over a file content. If `length` is provided, only that
+        many first bytes of the content are returned.
 
         Raises:
             File.NotFound: If key not found or key is a directory.
@@ -172,6 +178,29 @@ class IStorage(Protocol):
             File.NotADirectory: If some parent of the destination is not a directory.
         """
 
+    @contextlib.asynccontextmanager
+    async def open_local(
+        self, key: str, *, length: int | None = None, in_memory: bool = True
+    ) -> AsyncIterator[IO[bytes]]:
+        """
+        Open a file content as a local file with a path in the `name`, so it can be
+        read directly or passed to a process pool without making a copy.
+
+        Storages that keep files on a local disk open the file itself. Others
+        download the content to a temporary file first, only `length` first bytes
+        if it is provided. The temporary file is kept in memory unless `in_memory`
+        is False.
+
+        Raises:
+            File.NotFound: If key not found or key is a directory.
+        """
+        with processpool.temporary_file(in_memory=in_memory) as content:
+            async for chunk in self.download(key, length=length):
+                content.write(chunk)
+            content.flush()
+            content.seek(0)
+            yield content
+
     @abc.abstractmethod
     async def save(self, key: str, content: IBlobContent) -> StorageFile:
         """
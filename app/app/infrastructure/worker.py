@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import enum
-from typing import Protocol, Self
+from typing import TYPE_CHECKING, Any, Protocol, Self
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
 
 __all__ = [
     "Job",
+    "JobProgress",
     "JobStatus",
     "IWorker",
 ]
@@ -22,6 +26,16 @@ class Job:
         self.id = id
 
 
+class JobProgress:
+    """An intermediate result published by a running job."""
+
+    __slots__ = ("id", "item")
+
+    def __init__(self, id: str, item: Any):
+        self.id = id
+        self.item = item
+
+
 class IWorker(Protocol):
     async def __aenter__(self) -> Self:
         ...  # pragma: no cover
@@ -29,11 +43,28 @@ class IWorker(Protocol):
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         ...  # pragma: no cover
 
-    async def enqueue(self, job_name: str, *args, **kwargs) -> Job:
-        """Enqueue a job."""
+    async def enqueue(
+        self, job_name: str, *args, job_id: str | None = None, **kwargs
+    ) -> Job:
+        """
+        Enqueue a job. A job with the given ID is enqueued only once, until it
+        completes and its result expires.
+        """
 
     async def get_status(self, job_id: str) -> JobStatus:
         """Returns status for a given job_id."""
 
     async def get_result(self, job_id: str):
         """Returns result for a given job_id."""
+
+    async def publish_progress(self, job_id: str, item: Any) -> None:
+        """Publishes an intermediate result for a given job_id."""
+
+    def watch(
+        self, job_id: str, *, last_id: str | None = None, timeout: float = 60
+    ) -> AsyncIterator[JobProgress]:
+        """
+        Yields intermediate results for a given job_id as they are published,
+        starting after the `last_id`. Stops when the job completes or after the
+        timeout, whichever happens first.
+        """
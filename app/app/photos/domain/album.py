@@ -22,6 +22,7 @@ class AlbumNotFound(AlbumError):
 
 class AlbumCover(BaseModel):
     media_item_id: UUID
+    placeholder: str | None = None
 
 
 class Album(BaseModel):
@@ -35,6 +35,7 @@ class MediaItem(BaseModel):
     media_type: str
     size: int
     chash: str
+    placeholder: str | None = None
     taken_at: datetime | None = None
     created_at: datetime = Field(default_factory=timezone.now)
     modified_at: datetime = Field(default_factory=timezone.now)
@@ -56,6 +56,14 @@ class IMediaItemRepository(Protocol):
     ) -> list[MediaItem]:
         """Lists deleted media items."""
 
+    async def list_deleted_before(
+        self, before: datetime, limit: int
+    ) -> list[MediaItem]:
+        """
+        Lists media items of all owners deleted before a given time, in the order
+        they were deleted.
+        """
+
     async def save(self, item: MediaItem) -> MediaItem:
         """Saves a new media item."""
 
@@ -230,6 +230,12 @@ class MediaItemService:
             owner_id, offset=offset, limit=limit
         )
 
+    async def list_deleted_before(
+        self, before: datetime, limit: int
+    ) -> list[MediaItem]:
+        """Lists media items of all owners deleted before a given time."""
+        return await self.db.media_item.list_deleted_before(before, limit)
+
     async def list_favourite_ids(self, user_id: UUID) -> list[UUID]:
         """Lists favourite media item IDs for the specified user."""
         return await self.db.media_item_favourite.list_ids(user_id)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 from typing import TYPE_CHECKING, Protocol
 
 from app.app.infrastructure.database import IAtomic
 from app.app.photos.domain import MediaItem
+from app.config import config
+from app.toolkit import timezone
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator, Iterable, Sequence
@@ -22,7 +26,6 @@ if TYPE_CHECKING:
         DownloadMediaItemSession,
         DownloadSessionInfo,
     )
-    from app.toolkit.mediatypes import MediaType
 
     class IUseCaseServices(IAtomic, Protocol):
         album: AlbumService
@@ -138,6 +141,24 @@ class MediaItemUseCase:
             ids = [item.id for item in items]
             await self.media_item.delete_permanently(ids)
 
+    async def purge_expired(self) -> None:
+        """
+        Permanently deletes media items that have been deleted for longer than the
+        retention period. Items are deleted in batches with a pause between them,
+        and a single call deletes a limited number of batches.
+        """
+        before = timezone.now() - config.features.trash_retention
+        limit = config.features.trash_purge_batch_size
+        pause = config.features.trash_purge_pause.total_seconds()
+        for i in range(config.features.trash_purge_max_batches):
+            if i > 0:
+                await asyncio.sleep(pause)
+            items = await self.media_item.list_deleted_before(before, limit=limit)
+            if items:
+                await self.media_item.delete_permanently([item.id for item in items])
+            if len(items) < limit:
+                return
+
     async def restore_batch(
         self, owner_id: UUID, ids: Sequence[UUID]
     ) -> list[MediaItem]:
@@ -145,7 +166,11 @@ class MediaItemUseCase:
         return await self.media_item.restore_batch(owner_id, ids)
 
     async def thumbnail(
-        self, owner_id: UUID, media_item_id: UUID, size: int
+        self,
+        owner_id: UUID,
+        media_item_id: UUID,
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
     ) -> tuple[MediaItem, bytes, MediaType]:
         """
         Returns a thumbnail for the specified owner's media item.
@@ -155,9 +180,33 @@ class MediaItemUseCase:
             Blob.ThumbnailUnavailable: If thumbnail can't be generated.
         """
         item = await self.media_item.get_for_owner(owner_id, media_item_id)
-        thumbnail = await self.thumbnailer.thumbnail(item.blob_id, item.chash, size)
+        thumbnail = await self.thumbnailer.thumbnail(
+            item.blob_id, item.chash, size, output_type
+        )
         return item, *thumbnail
 
+    async def thumbnail_batch(
+        self,
+        owner_id: UUID,
+        media_item_ids: Sequence[UUID],
+        size: int,
+        output_type: MediaType = MediaType.IMAGE_WEBP,
+    ) -> AsyncIterator[tuple[UUID, bytes, MediaType]]:
+        """
+        Returns an iterator over thumbnails of the specified owner's media items
+        in the order they become ready. Items without a thumbnail are skipped.
+        """
+        items = await self.media_item.get_by_id_batch(media_item_ids)
+        return self.thumbnailer.thumbnail_batch(
+            [
+                (item.id, item.blob_id, item.chash)
+                for item in items
+                if item.owner_id == owner_id
+            ],
+            size,
+            output_type,
+        )
+
     async def unmark_favourite_batch(
         self, user_id: UUID, ids: Sequence[UUID]
     ) -> None:
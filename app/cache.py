@@ -7,3 +7,12 @@ cache.setup(str(config.cache.backend_dsn))
 
 disk_cache = Cache(name="disk")
 disk_cache.setup("disk://", size_limit=config.cache.disk_cache_max_size)
+
+# Two-tier cache for small, rarely changing values, such as users and namespaces.
+# Values are kept in the process memory and in Redis. Every change in Redis is
+# broadcasted to other processes, so their in-memory copies are invalidated.
+local_cache = Cache(name="local")
+if config.cache.backend_dsn == "mem://":
+    local_cache.setup("mem://")
+else:
+    local_cache.setup(str(config.cache.backend_dsn), client_side=True)
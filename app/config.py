@@ -143,6 +143,9 @@ class DatabaseDSN(str):
 class ARQWorkerConfig(BaseModel):
     type: Literal[WorkerType.arq] = WorkerType.arq
     broker_dsn: Annotated[str, RedisDsn]
+    # jobs are routed to lanes only when enabled, otherwise all of them are
+    # enqueued to the default one
+    lanes: bool = False
 
 
 class AuthConfig(BaseModel):
@@ -154,6 +157,7 @@ class AuthConfig(BaseModel):
 class CacheConfig(BaseModel):
     backend_dsn: Literal["mem://"] | RedisDsn = "mem://"
     disk_cache_max_size: BytesSize = BytesSizeMultipliers.gb
+    thumbnails_max_size: BytesSize = 64 * BytesSizeMultipliers.mb
 
 
 class CORSConfig(BaseModel):
@@ -168,9 +172,16 @@ class TortoiseConfig(BaseModel):
         f"sqlite:///{_BASE_DIR / 'db.sqlite3'}"
         "?install_regexp_functions=true"
     )
+    replica_dsns: list[DatabaseDSN] = []
+    replica_read_your_writes_window: TTL = TTL(seconds=5)
 
 
 class FeatureConfig(BaseModel):
+    content_processing_batch_size: int = 100
+    content_processing_batch_window: TTL = TTL(seconds=1)
+    content_processing_concurrency: int = 4
+    max_animation_duration: TTL = TTL(seconds=10)
+    max_animation_frames: int = 48
     max_file_size_to_thumbnail: BytesSize = 20 * BytesSizeMultipliers.mb
     max_image_pixels: int = 89_478_485
     pre_generated_thumbnail_sizes: set[ThumbnailSize] = {
@@ -182,6 +193,10 @@ class FeatureConfig(BaseModel):
     quota: BytesSize | None = None
     sign_up_enabled: bool = True
     shared_links_enabled: bool = True
+    trash_purge_batch_size: int = 100
+    trash_purge_max_batches: int = 10
+    trash_purge_pause: TTL = TTL(seconds=1)
+    trash_retention: TTL = TTL(days=30)
     upload_file_max_size: BytesSize = 100 * BytesSizeMultipliers.mb
     verification_required: bool = False
 
@@ -201,6 +216,14 @@ class MailSMTPConfig(BaseModel):
     smtp_use_tls: bool = False
 
 
+class ProcessPoolConfig(BaseModel):
+    in_memory_content_max_size: BytesSize = 32 * BytesSizeMultipliers.mb
+    max_workers: int = 2
+    max_tasks_per_worker: int = 100
+    memory_limit: BytesSize | None = 2 * BytesSizeMultipliers.gb
+    task_timeout: TTL = TTL(minutes=1)
+
+
 class S3StorageConfig(BaseModel):
     type: Literal[StorageType.s3] = StorageType.s3
     s3_location: AnyHttpUrl
@@ -267,6 +290,7 @@ class AppConfig(BaseSettings):
     database: DatabaseConfig
     features: FeatureConfig = FeatureConfig()
     mail: MailConfig
+    process_pool: ProcessPoolConfig = ProcessPoolConfig()
     sentry: SentryConfig = SentryConfig()
     storages: StoragesConfig
     worker: WorkerConfig
@@ -40,14 +40,17 @@ from app.infrastructure.mail import SMTPEmailBackend
 from app.infrastructure.storage import FileSystemStorage, S3Storage
 from app.infrastructure.worker import ARQWorker
 from app.toolkit import taskgroups
+from app.toolkit.processpool import ProcessPool
 
 if TYPE_CHECKING:
     from app.app.infrastructure import IStorage, IWorker
     from app.app.infrastructure.database import ITransaction
     from app.config import (
         AppConfig,
+        CacheConfig,
         DatabaseConfig,
         FeatureConfig,
+        ProcessPoolConfig,
         StorageConfig,
         WorkerConfig,
     )
@@ -64,7 +67,9 @@ class AppContext:
     def __init__(self, config: AppConfig):
         self._stack = AsyncExitStack()
         self._infra = Infrastructure(config)
-        services = Services(self._infra, features=config.features)
+        services = Services(
+            self._infra, features=config.features, caches=config.cache
+        )
         self.usecases = UseCases(services)
 
     async def __aenter__(self) -> Self:
@@ -75,11 +80,17 @@ class AppContext:
         await taskgroups.wait_background_tasks(timeout=30)
         await self._stack.aclose()
 
+    @property
+    def worker(self) -> IWorker:
+        """A worker to enqueue background jobs with."""
+        return self._infra.worker
+
 
 class Infrastructure:
     __slots__ = [
         "database",
         "mail",
+        "process_pool",
         "storage_media",
         "storage_default",
         "worker",
@@ -89,6 +100,7 @@ class Infrastructure:
     def __init__(self, config: AppConfig):
         self.database = self._get_database(config.database)
         self.mail = self._get_mail_backend(config.mail)
+        self.process_pool = self._get_process_pool(config.process_pool)
         assert config.storages.media is not None
         self.storage_default = self._get_storage(config.storages.default)
         self.storage_media = self._get_storage(config.storages.media)
@@ -98,6 +110,7 @@ class Infrastructure:
     async def __aenter__(self) -> Self:
         ctx = [
             self._stack.enter_async_context(self.database),
+            self._stack.enter_async_context(self.process_pool),
             self._stack.enter_async_context(self.storage_default),
             self._stack.enter_async_context(self.storage_media),
             self._stack.enter_async_context(self.worker),
@@ -121,6 +134,15 @@ class Infrastructure:
             return SMTPEmailBackend(mail_config)
         assert_never(mail_config)
 
+    @staticmethod
+    def _get_process_pool(pool_config: ProcessPoolConfig) -> ProcessPool:
+        return ProcessPool(
+            pool_config.max_workers,
+            max_tasks_per_worker=pool_config.max_tasks_per_worker,
+            memory_limit=pool_config.memory_limit,
+            timeout=pool_config.task_timeout.total_seconds(),
+        )
+
     @staticmethod
     def _get_storage(storage_config: StorageConfig) -> IStorage:
         if isinstance(storage_config, S3StorageConfig):
@@ -155,12 +177,15 @@ class Services:
         "user",
     ]
 
-    def __init__(self, infra: Infrastructure, features: FeatureConfig):
+    def __init__(
+        self, infra: Infrastructure, features: FeatureConfig, caches: CacheConfig
+    ):
         database = infra.database
         mail = infra.mail
         storage_default = infra.storage_default
         storage_media = infra.storage_media
         worker = infra.worker
+        process_pool = infra.process_pool
 
         self._database = database
 
@@ -169,11 +194,17 @@ class Services:
             storage=storage_default,
             worker=worker,
         )
-        self.blob_metadata = BlobMetadataService(database=database)
+        self.blob_metadata = BlobMetadataService(database=database, pool=process_pool)
         self.blob_thumbnailer = self.thumbnailer = BlobThumbnailService(
             blob_service=self.blob,
             storage=storage_media,
             max_file_size=features.max_file_size_to_thumbnail,
+            pool=process_pool,
+            memory_cache_max_size=caches.thumbnails_max_size,
+            max_animation_frames=features.max_animation_frames,
+            max_animation_duration=int(
+                features.max_animation_duration.total_seconds() * 1000
+            ),
         )
         self.blob_processor = BlobContentProcessor(
             blob_service=self.blob,
@@ -189,6 +220,7 @@ class Services:
             database=database,
             blob_service=self.blob,
             storage=storage_default,
+            worker=worker,
         )
         self.file = FileService(
             filecore=self.filecore,
@@ -23,6 +23,7 @@ from .repositories import (
     SharedLinkRepository,
     UserRepository,
 )
+from .routers import PRIMARY, REPLICA_PREFIX, ReplicaRouter, pin_to_primary
 
 if TYPE_CHECKING:
     from app.app.audit.repositories import IAuditTrailRepository
@@ -56,11 +57,12 @@ TORTOISE_MIGRATIONS = "app.infrastructure.database.tortoise.migrations"
 class Transaction:
     __slots__ = ("_connection_name", "_tx_ctx")
 
-    def __init__(self, connection_name: str | None = None) -> None:
+    def __init__(self, connection_name: str = PRIMARY) -> None:
         self._connection_name = connection_name
         self._tx_ctx = transactions.in_transaction(self._connection_name)
 
     async def __aenter__(self) -> Self:
+        pin_to_primary()
         await self._tx_ctx.__aenter__()
         return self
 
@@ -100,16 +102,20 @@ class TortoiseDatabase(IDatabase):
         self.user = UserRepository()
 
     def _tortoise_config(self) -> TortoiseORMConfig:
+        connections = {PRIMARY: DBUrlConfig(self.config.dsn)}
+        for idx, dsn in enumerate(self.config.replica_dsns):
+            connections[f"{REPLICA_PREFIX}{idx}"] = DBUrlConfig(dsn)
+
         return TortoiseORMConfig(
-            connections={
-                "default": DBUrlConfig(self.config.dsn),
-            },
+            connections=connections,
             apps={
                 "models": AppConfig(
                     models=TORTOISE_MODELS,
                     migrations=TORTOISE_MIGRATIONS,
+                    default_connection=PRIMARY,
                 ),
             },
+            routers=[ReplicaRouter] if self.config.replica_dsns else None,
         )
 
     async def __aenter__(self) -> Self:
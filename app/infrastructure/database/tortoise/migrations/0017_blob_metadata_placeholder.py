@@ -0,0 +1,23 @@
+from orjson import loads
+from tortoise import fields, migrations
+from tortoise.fields.data import JSON_DUMPS
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies = [("models", "0016_auto_20260515_1949")]
+
+    initial = False
+
+    operations = [
+        ops.AlterField(
+            model_name="BlobMetadata",
+            name="data",
+            field=fields.JSONField(null=True, encoder=JSON_DUMPS, decoder=loads),
+        ),
+        ops.AddField(
+            model_name="BlobMetadata",
+            name="placeholder",
+            field=fields.TextField(null=True),
+        ),
+    ]
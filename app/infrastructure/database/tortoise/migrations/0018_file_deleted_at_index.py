@@ -0,0 +1,18 @@
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies = [("models", "0017_blob_metadata_placeholder")]
+
+    initial = False
+
+    operations = [
+        ops.AlterField(
+            model_name="File",
+            name="deleted_at",
+            field=fields.DatetimeField(
+                null=True, db_index=True, auto_now=False, auto_now_add=False
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from tortoise import fields, migrations
+from tortoise.migrations import operations as ops
+
+
+class Migration(migrations.Migration):
+    dependencies = [("models", "0018_file_deleted_at_index")]
+
+    initial = False
+
+    operations = [
+        ops.AddField(
+            model_name="File",
+            name="trashed_at",
+            field=fields.DatetimeField(
+                null=True, db_index=True, auto_now=False, auto_now_add=False
+            ),
+        ),
+        ops.AlterField(
+            model_name="MediaItem",
+            name="deleted_at",
+            field=fields.DatetimeField(
+                null=True, db_index=True, auto_now=False, auto_now_add=False
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from tortoise import migrations
+from tortoise.migrations import operations as ops
+
+from app.toolkit import timezone
+
+
+async def backfill_file_trashed_at(apps, _schema_editor) -> None:
+    # items put in the Trash before `trashed_at` was added never expire otherwise,
+    # their retention period starts now
+    FileModel = apps.get_model("models.File")
+    await (
+        FileModel
+        .filter(
+            path__iposix_regex=r"^Trash/[^/]+$",
+            trashed_at__isnull=True,
+        )
+        .update(trashed_at=timezone.now())
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [("models", "0019_file_trashed_at")]
+
+    initial = False
+
+    operations = [
+        ops.RunPython(
+            backfill_file_trashed_at,
+            reverse_code=ops.RunPython.noop,
+        ),
+    ]
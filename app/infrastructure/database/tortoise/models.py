@@ -83,7 +83,8 @@ class BlobJob(models.Model):
 
 class BlobMetadata(models.Model):
     id = fields.UUIDField(primary_key=True, default=uuid7)
-    data = fields.JSONField()  # type: ignore[var-annotated]
+    data = fields.JSONField(null=True)  # type: ignore[var-annotated]
+    placeholder = fields.TextField(null=True)
     blob: fields.ForeignKeyRelation[Blob] = fields.OneToOneField(
         "models.Blob", related_name="metadata", on_delete=fields.CASCADE,
     )
@@ -119,7 +120,10 @@ class File(models.Model):
         "models.Blob", related_name="files", on_delete=fields.RESTRICT,
         null=True,
     )
-    deleted_at = fields.DatetimeField(null=True)
+    # files are marked as deleted until their contents are purged
+    deleted_at = fields.DatetimeField(null=True, db_index=True)
+    # set for items right in the Trash folder, so they expire after retention
+    trashed_at = fields.DatetimeField(null=True, db_index=True)
 
     class Meta:
         unique_together = (("path", "namespace"),)
@@ -144,7 +148,7 @@ class MediaItem(models.Model):
     name = fields.CharField(max_length=1024)
     created_at = fields.DatetimeField()
     modified_at = fields.DatetimeField()
-    deleted_at = fields.DatetimeField(null=True)
+    deleted_at = fields.DatetimeField(null=True, db_index=True)
 
 
 class MediaItemFavourite(models.Model):
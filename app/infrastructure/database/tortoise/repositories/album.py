@@ -4,7 +4,6 @@ from typing import TYPE_CHECKING, Any, Unpack, cast
 
 from pypika_tortoise.enums import Order
 from pypika_tortoise.queries import Table
-from tortoise import connections
 from tortoise.exceptions import DoesNotExist
 from tortoise.fields.relational import ManyToManyFieldInstance
 
@@ -13,7 +12,10 @@ from app.app.photos.repositories import IAlbumRepository
 from app.app.photos.repositories.album import AlbumUpdate
 from app.infrastructure.database.tortoise import models
 from app.infrastructure.database.tortoise.repositories.media_item import (
-    _from_db as _media_item_from_db,
+    _FIELDS as _MEDIA_ITEM_FIELDS,
+)
+from app.infrastructure.database.tortoise.repositories.media_item import (
+    _from_row as _media_item_from_row,
 )
 
 if TYPE_CHECKING:
@@ -23,8 +25,11 @@ if TYPE_CHECKING:
 __all__ = ["AlbumRepository"]
 
 
-def _from_db(obj: models.Album) -> Album:
-    cover = Album.Cover(media_item_id=obj.cover_id) if obj.cover_id else None  # type: ignore[attr-defined]
+def _from_db(obj: models.Album, placeholders: dict[UUID, str] | None = None) -> Album:
+    cover = None
+    if cover_id := obj.cover_id:  # type: ignore[attr-defined]
+        placeholder = placeholders.get(cover_id) if placeholders else None
+        cover = Album.Cover(media_item_id=cover_id, placeholder=placeholder)
     return Album(
         id=obj.id,
         owner_id=obj.owner_id,  # type: ignore[attr-defined]
@@ -36,6 +41,19 @@ def _from_db(obj: models.Album) -> Album:
     )
 
 
+async def _get_cover_placeholders(objs: Sequence[models.Album]) -> dict[UUID, str]:
+    """Returns low-quality image placeholders of album covers by media item ID."""
+    cover_ids = [obj.cover_id for obj in objs if obj.cover_id]  # type: ignore[attr-defined]
+    if not cover_ids:
+        return {}
+    rows = await (
+        models.MediaItem
+        .filter(id__in=cover_ids, blob__metadata__placeholder__isnull=False)
+        .values_list("id", "blob__metadata__placeholder")
+    )
+    return dict(rows)  # type: ignore[arg-type]
+
+
 class AlbumRepository(IAlbumRepository):
     async def add_items(
         self, owner_id: UUID, slug: str, media_item_ids: list[UUID]
@@ -79,7 +97,7 @@ class AlbumRepository(IAlbumRepository):
             obj = await models.Album.get(owner_id=owner_id, slug=slug)
         except DoesNotExist as exc:
             raise Album.NotFound() from exc
-        return _from_db(obj)
+        return _from_db(obj, await _get_cover_placeholders([obj]))
 
     async def list_by_owner_id(
         self, owner_id: UUID, *, offset: int, limit: int = 25
@@ -91,7 +109,8 @@ class AlbumRepository(IAlbumRepository):
             .offset(offset)
             .limit(limit)
         )
-        return [_from_db(obj) for obj in objs]
+        placeholders = await _get_cover_placeholders(objs)
+        return [_from_db(obj, placeholders) for obj in objs]
 
     async def list_cover_candidates(
         self, album_ids: Sequence[UUID]
@@ -113,7 +132,7 @@ class AlbumRepository(IAlbumRepository):
         # >>>     .values_list('id', 'media_item_id')
         # >>> )
 
-        connection = connections.get("default")
+        connection = models.Album._choose_db()
         items_field = cast(
             ManyToManyFieldInstance[Any],
             models.Album._meta.fields_map["items"],
@@ -174,20 +193,19 @@ class AlbumRepository(IAlbumRepository):
         offset: int,
         limit: int = 25,
     ) -> list[MediaItem]:
-        items = await (
+        rows = await (
             models.MediaItem
             .filter(
                 albums__owner_id=owner_id,
                 albums__slug=slug,
                 deleted_at__isnull=True,
             )
-            .select_related("blob")
-            .prefetch_related("blob__metadata")
             .order_by("-modified_at")
             .offset(offset)
             .limit(limit)
+            .values(*_MEDIA_ITEM_FIELDS)
         )
-        return [_media_item_from_db(item) for item in items]
+        return [_media_item_from_row(row) for row in rows]
 
     async def remove_items(
         self, owner_id: UUID, slug: str, media_item_ids: list[UUID]
@@ -223,7 +241,7 @@ class AlbumRepository(IAlbumRepository):
 
         obj.cover_id = media_item_id
         await obj.save(update_fields=["cover_id"])
-        return _from_db(obj)
+        return _from_db(obj, await _get_cover_placeholders([obj]))
 
     async def set_cover_batch(
         self, covers: Sequence[tuple[UUID, UUID | None]]
@@ -12,7 +12,8 @@ from app.app.blobs.repositories.blob import BlobUpdate
 from app.infrastructure.database.tortoise import models
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Sequence
+    from datetime import datetime
     from uuid import UUID
 
 __all__ = ["BlobRepository"]
@@ -61,6 +62,24 @@ class BlobRepository(IBlobRepository):
         objs = await models.Blob.filter(id__in=list(blob_ids))
         return [_from_db(obj) for obj in objs]
 
+    async def list_ids_without_metadata(
+        self,
+        created_after: datetime,
+        created_before: datetime,
+        media_types: Iterable[str],
+    ) -> list[UUID]:
+        return await (  # type: ignore[return-value]
+            models.Blob
+            .filter(
+                created_at__gte=created_after,
+                created_at__lt=created_before,
+                media_type__in=list(media_types),
+                metadata=None,
+            )
+            .order_by("created_at")
+            .values_list("id", flat=True)
+        )
+
     async def replace_storage_key_prefix(self, at: str, to: str) -> None:
         await models.Blob.filter(storage_key__startswith=at).update(
             storage_key=_Replace(F("storage_key"), at, to)
@@ -76,6 +95,22 @@ class BlobRepository(IBlobRepository):
         )
         return _from_db(obj)
 
+    async def update_storage_key_batch(
+        self, items: Sequence[tuple[UUID, str]]
+    ) -> None:
+        if not items:
+            return
+
+        key_by_id = dict(items)
+        objs = await models.Blob.filter(id__in=list(key_by_id))
+        if not objs:
+            return
+
+        for obj in objs:
+            obj.storage_key = key_by_id[obj.id]
+
+        await models.Blob.bulk_update(objs, fields=["storage_key"])
+
     async def update(self, blob_id: UUID, fields: BlobUpdate) -> None:
         assert fields, "At least one field must be provided for update"
         await models.Blob.filter(id=blob_id).update(**fields)
@@ -10,6 +10,7 @@ from app.infrastructure.database.tortoise import models
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
+    from datetime import datetime
     from uuid import UUID
 
 __all__ = ["BlobJobRepository"]
@@ -34,6 +35,14 @@ class BlobJobRepository(IBlobJobRepository):
         objs = await models.BlobJob.filter(id__in=list(ids))
         return [_from_db(obj) for obj in objs]
 
+    async def list_ids(self, *, created_before: datetime) -> list[UUID]:
+        return await (  # type: ignore[return-value]
+            models.BlobJob
+            .filter(created_at__lt=created_before)
+            .order_by("created_at")
+            .values_list("id", flat=True)
+        )
+
     async def save_batch(self, jobs: Sequence[BlobJob]) -> list[BlobJob]:
         db_objs = [
             models.BlobJob(
@@ -9,6 +9,7 @@ from app.app.blobs.repositories import IBlobMetadataRepository
 from app.infrastructure.database.tortoise import models
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from uuid import UUID
 
 __all__ = ["BlobMetadataRepository"]
@@ -18,6 +19,7 @@ def _from_db(obj: models.BlobMetadata) -> BlobMetadata:
     return BlobMetadata(
         blob_id=obj.blob_id,  # type: ignore[attr-defined]
         data=obj.data,
+        placeholder=obj.placeholder,
     )
 
 
@@ -29,12 +31,43 @@ class BlobMetadataRepository(IBlobMetadataRepository):
             raise BlobMetadata.NotFound() from exc
         return _from_db(obj)
 
+    async def get_by_chash(self, chash: str, media_type: str) -> BlobMetadata:
+        obj = await models.BlobMetadata.filter(
+            blob__chash=chash, blob__media_type=media_type
+        ).first()
+        if obj is None:
+            raise BlobMetadata.NotFound()
+        return _from_db(obj)
+
     async def save(self, metadata: BlobMetadata) -> BlobMetadata:
         try:
             await models.BlobMetadata.create(
                 blob_id=metadata.blob_id,
                 data=metadata.data,
+                placeholder=metadata.placeholder,
             )
         except IntegrityError as exc:
             raise Blob.NotFound() from exc
         return metadata
+
+    async def save_batch(self, metadata: Iterable[BlobMetadata]) -> None:
+        items = list(metadata)
+        if not items:
+            return
+
+        blob_ids = await models.Blob.filter(
+            id__in=[item.blob_id for item in items]
+        ).values_list("id", flat=True)
+        existing = set(blob_ids)
+        await models.BlobMetadata.bulk_create(
+            [
+                models.BlobMetadata(
+                    blob_id=item.blob_id,
+                    data=item.data,
+                    placeholder=item.placeholder,
+                )
+                for item in items
+                if item.blob_id in existing
+            ],
+            ignore_conflicts=True,
+        )
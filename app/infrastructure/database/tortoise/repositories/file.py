@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+from pypika_tortoise.queries import Table
+from pypika_tortoise.terms import Bracket, ValueWrapper
 from tortoise.exceptions import DoesNotExist, IntegrityError
 from tortoise.expressions import F, Q
 from tortoise.functions import Lower
@@ -12,13 +14,19 @@ from app.app.files.domain.path import Path
 from app.app.files.repositories import IFileRepository
 from app.app.files.repositories.file import FileUpdate
 from app.infrastructure.database.tortoise import models
+from app.infrastructure.database.tortoise.repositories.namespace import (
+    get_namespace_by_path,
+)
 from app.toolkit import chash
 from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Mapping, Sequence
+    from datetime import datetime
     from uuid import UUID
 
+    from tortoise.queryset import QuerySet
+
     from app.app.files.domain import AnyPath
     from app.typedefs import StrOrUUID
 
@@ -51,6 +59,117 @@ def _from_db(ns_path: str | None, obj: models.File) -> File:
     )
 
 
+# fields to fetch a file as a plain row, see `_from_row`
+_FIELDS = (
+    "id",
+    "blob_id",
+    "owner_id",
+    "name",
+    "path",
+    "size",
+    "modified_at",
+    "blob__chash",
+    "blob__media_type",
+    "blob__metadata__placeholder",
+    "namespace__path",
+)
+
+
+def _from_row(row: dict[str, Any]) -> File:
+    """
+    Builds a file from a row fetched with `_FIELDS`. Rows come straight from the
+    database, so validation is skipped.
+    """
+    if row["blob_id"] is None:
+        chash_, mediatype = chash.EMPTY_CONTENT_HASH, MediaType.FOLDER
+    else:
+        chash_, mediatype = row["blob__chash"], row["blob__media_type"]
+
+    return File.model_construct(
+        id=row["id"],
+        blob_id=row["blob_id"],
+        owner_id=row["owner_id"],
+        ns_path=row["namespace__path"],
+        name=row["name"],
+        path=Path(row["path"]),
+        chash=chash_,
+        size=row["size"],
+        modified_at=row["modified_at"],
+        mediatype=mediatype,
+        placeholder=row["blob__metadata__placeholder"],
+    )
+
+
+def _parents(paths: Iterable[AnyPath]) -> list[str]:
+    """Returns lowercased parents of given paths."""
+    return list({str(parent).lower() for p in paths for parent in Path(p).parents})
+
+
+def _filter_at_paths(ns_path: AnyPath, paths: Iterable[AnyPath]) -> QuerySet:
+    """
+    Filters files at given paths along with folders marked as deleted above them,
+    see `_visible`.
+    """
+    paths = [str(p).lower() for p in paths]
+    return (
+        models.File
+        .filter(namespace__path=str(ns_path))
+        .annotate(lower_path=Lower("path"))
+        .filter(
+            Q(lower_path__in=paths, deleted_at__isnull=True)
+            | Q(lower_path__in=_parents(paths), deleted_at__isnull=False)
+        )
+    )
+
+
+def _visible(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Drops rows of files marked as deleted and of files inside folders marked as
+    deleted, which are hidden together with their contents until purged. Folders
+    marked as deleted are looked up among the rows, so they should be fetched
+    along.
+    """
+    deleted = {
+        (row["namespace__path"], row["path"].lower())
+        for row in rows
+        if row["deleted_at"] is not None
+    }
+    return [
+        row
+        for row in rows
+        if row["deleted_at"] is None and not any(
+            (row["namespace__path"], str(parent).lower()) in deleted
+            for parent in Path(row["path"]).parents
+        )
+    ]
+
+
+async def _exclude_hidden(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Fetches folders marked as deleted above given rows and drops hidden rows."""
+    if not rows:
+        return rows
+
+    parents_by_ns_path: dict[str, list[str]] = {}
+    for row in rows:
+        ns_parents = parents_by_ns_path.setdefault(row["namespace__path"], [])
+        ns_parents.append(row["path"])
+
+    q = Q()
+    for ns_path, paths in parents_by_ns_path.items():
+        q |= Q(namespace__path=ns_path, lower_path__in=_parents(paths))
+
+    deleted = await (
+        models.File
+        .filter(deleted_at__isnull=False)
+        .annotate(lower_path=Lower("path"))
+        .filter(q)
+        .values("path", "deleted_at", "namespace__path")
+    )
+    if not deleted:
+        return rows
+    return _visible([*rows, *deleted])
+
+
 class FileRepository(IFileRepository):
     async def count_by_path_pattern(
         self, ns_path: AnyPath, pattern: str
@@ -71,6 +190,7 @@ class FileRepository(IFileRepository):
                 .get(
                     namespace__path=str(ns_path),
                     path__iexact=str(path),
+                    deleted_at__isnull=True,
                 )
                 .select_related("namespace", "blob")
             )
@@ -84,11 +204,11 @@ class FileRepository(IFileRepository):
     async def delete_all_with_prefix(
         self, ns_path: AnyPath, prefix: AnyPath
     ) -> None:
-        namespace = await models.Namespace.get(path=str(ns_path))
+        namespace = await get_namespace_by_path(str(ns_path))
         await (
             models.File
             .filter(
-                namespace=namespace,
+                namespace_id=namespace.id,
                 path__istartswith=str(prefix),
             )
             .delete()
@@ -100,19 +220,12 @@ class FileRepository(IFileRepository):
         if not items:
             return
 
-        namespaces = {
-            ns.path: ns
-            for ns in await models.Namespace.filter(
-                path__in=list(items.keys())
-            )
-        }
-
         q = Q()
         for ns_path, prefixes in items.items():
-            ns = namespaces[ns_path]
+            ns = await get_namespace_by_path(ns_path)
             for prefix in prefixes:
                 q |= Q(
-                    namespace=ns,
+                    namespace_id=ns.id,
                     path__istartswith=str(prefix),
                 )
 
@@ -121,93 +234,122 @@ class FileRepository(IFileRepository):
     async def delete_batch(
         self, ns_path: AnyPath, paths: Sequence[AnyPath]
     ) -> None:
-        namespace = await models.Namespace.get(path=str(ns_path))
+        namespace = await get_namespace_by_path(str(ns_path))
         await (
             models.File
             .filter(
-                namespace=namespace,
+                namespace_id=namespace.id,
                 path__in=[str(p) for p in paths],
             )
             .delete()
         )
 
-    async def exists_at_path(
-        self, ns_path: AnyPath, path: AnyPath
-    ) -> bool:
-        return await (
+    async def delete_by_id_batch(self, ids: Sequence[UUID]) -> None:
+        await models.File.filter(id__in=list(ids)).delete()
+
+    async def delete_chunk_with_prefix(
+        self, ns_path: AnyPath, prefix: AnyPath, limit: int
+    ) -> list[File]:
+        rows = await (
             models.File
             .filter(
                 namespace__path=str(ns_path),
-                path__iexact=str(path),
+                path__istartswith=str(prefix),
             )
-            .exists()
+            .limit(limit)
+            .values(*_FIELDS)
         )
+        if rows:
+            await models.File.filter(id__in=[row["id"] for row in rows]).delete()
+        return [_from_row(row) for row in rows]
+
+    async def exists_at_path(
+        self, ns_path: AnyPath, path: AnyPath
+    ) -> bool:
+        rows = await (
+            _filter_at_paths(ns_path, [path])
+            .values("path", "deleted_at", "namespace__path")
+        )
+        return bool(_visible(rows))
 
     async def exists_with_id(
         self, ns_path: AnyPath, file_id: UUID
     ) -> bool:
-        return await (
+        rows = await (
             models.File
             .filter(
                 namespace__path=str(ns_path),
                 id=file_id,
+                deleted_at__isnull=True,
             )
-            .exists()
+            .values("path", "deleted_at", "namespace__path")
         )
+        return bool(await _exclude_hidden(rows))
 
-    async def get_by_id(self, file_id: UUID) -> File:
-        try:
-            obj = await (
-                models.File
-                .get(id=file_id)
-                .select_related("blob", "namespace")
+    async def get_available_path(self, ns_path: AnyPath, path: AnyPath) -> Path:
+        path = Path(path)
+        # most paths are free, scan for taken names only on a collision
+        if not await self.exists_at_path(ns_path, path):
+            return path
+
+        base = str(path)[:len(str(path)) - len(path.suffix)]
+        pattern = f"^{re.escape(base)}( \\(\\d+\\))?{re.escape(path.suffix)}$"
+        candidates: list[str] = await (  # type: ignore[assignment]
+            models.File
+            .filter(
+                namespace__path=str(ns_path),
+                path__iposix_regex=pattern,
             )
-        except DoesNotExist as exc:
-            raise File.NotFound() from exc
-        return _from_db(obj.namespace.path, obj)
+            .values_list("path", flat=True)
+        )
+
+        last = 0
+        for candidate in candidates:
+            counter = candidate[len(base):len(candidate) - len(path.suffix)]
+            if match := re.fullmatch(r" \((\d+)\)", counter):
+                last = max(last, int(match.group(1)))
+        return path.with_stem(f"{path.stem} ({last + 1})")
+
+    async def get_by_id(self, file_id: UUID) -> File:
+        rows = await (
+            models.File
+            .filter(id=file_id, deleted_at__isnull=True)
+            .values(*_FIELDS, "deleted_at")
+        )
+        rows = await _exclude_hidden(rows)
+        if not rows:
+            raise File.NotFound()
+        return _from_row(rows[0])
 
     async def get_by_id_batch(
         self, ids: Iterable[StrOrUUID]
     ) -> list[File]:
-        objs = await (
+        rows = await (
             models.File
-            .filter(id__in=list(ids))
-            .select_related("blob", "namespace")
+            .filter(id__in=list(ids), deleted_at__isnull=True)
             .annotate(lower_path=Lower("path"))
             .order_by("lower_path")
+            .values(*_FIELDS, "deleted_at")
         )
-        return [_from_db(None, obj) for obj in objs]
+        return [_from_row(row) for row in await _exclude_hidden(rows)]
 
     async def get_by_path(
         self, ns_path: AnyPath, path: AnyPath
     ) -> File:
-        try:
-            obj = await (
-                models.File
-                .get(
-                    namespace__path=str(ns_path),
-                    path__iexact=str(path),
-                )
-                .select_related("blob", "namespace")
-            )
-        except DoesNotExist as exc:
-            raise File.NotFound() from exc
-        return _from_db(str(ns_path), obj)
+        files = await self.get_by_path_batch(ns_path, [path])
+        if not files:
+            raise File.NotFound()
+        return files[0]
 
     async def get_by_path_batch(
         self, ns_path: AnyPath, paths: Iterable[AnyPath],
     ) -> list[File]:
-        objs = await (
-            models.File
-            .filter(
-                namespace__path=str(ns_path),
-            )
-            .annotate(lower_path=Lower("path"))
-            .filter(lower_path__in=[str(p).lower() for p in paths])
-            .select_related("blob", "namespace")
+        rows = await (
+            _filter_at_paths(ns_path, paths)
             .order_by("lower_path")
+            .values(*_FIELDS, "deleted_at")
         )
-        return [_from_db(str(ns_path), obj) for obj in objs]
+        return [_from_row(row) for row in _visible(rows)]
 
     async def incr_size_batch(
         self, ns_path: AnyPath, paths: Iterable[AnyPath], value: int
@@ -215,28 +357,52 @@ class FileRepository(IFileRepository):
         if not value:
             return
 
-        namespace = await models.Namespace.get(path=str(ns_path))
+        namespace = await get_namespace_by_path(str(ns_path))
         await (
             models.File
             .filter(
-                namespace=namespace,
+                namespace_id=namespace.id,
                 path__in=[str(p) for p in paths],
             )
             .update(size=F("size") + value)
         )
 
+    async def list_deleted(self, limit: int) -> list[File]:
+        rows = await (
+            models.File
+            .filter(deleted_at__isnull=False)
+            .order_by("deleted_at")
+            .limit(limit)
+            .values(*_FIELDS)
+        )
+        return [_from_row(row) for row in rows]
+
+    async def list_trashed(self, before: datetime, limit: int) -> list[File]:
+        rows = await (
+            models.File
+            .filter(trashed_at__lt=before, deleted_at__isnull=True)
+            .order_by("trashed_at")
+            .limit(limit)
+            .values(*_FIELDS)
+        )
+        return [_from_row(row) for row in rows]
+
     async def list_with_prefix(self, ns_path: AnyPath, prefix: AnyPath) -> list[File]:
         prefix_str = str(prefix)
         pattern = f"^{re.escape(prefix_str)}[^/]+$"
-        objs = await (
+        folder = prefix_str.rstrip("/").lower() or "."
+        folders = [folder, *_parents([folder])]
+        rows = await (
             models.File
+            .filter(namespace__path=str(ns_path))
+            .annotate(lower_path=Lower("path"))
             .filter(
-                namespace__path=str(ns_path),
-                path__iposix_regex=pattern,
+                Q(path__iposix_regex=pattern, deleted_at__isnull=True)
+                | Q(lower_path__in=folders, deleted_at__isnull=False)
             )
-            .select_related("blob", "namespace")
+            .values(*_FIELDS, "deleted_at")
         )
-        results = [_from_db(str(ns_path), obj) for obj in objs]
+        results = [_from_row(row) for row in _visible(rows)]
 
         # Sort: folders first, then alphabetically by name (case-insensitive)
         results.sort(
@@ -261,12 +427,8 @@ class FileRepository(IFileRepository):
                     path__istartswith=str(prefix),
                 )
 
-        objs = await (
-            models.File
-            .filter(q)
-            .select_related("blob", "namespace")
-        )
-        return [_from_db(None, obj) for obj in objs]
+        rows = await models.File.filter(q).values(*_FIELDS)
+        return [_from_row(row) for row in rows]
 
     async def replace_path_prefix(
         self, at: tuple[AnyPath, AnyPath], to: tuple[AnyPath, AnyPath]
@@ -276,7 +438,7 @@ class FileRepository(IFileRepository):
         to_ns = None
 
         if str(at_ns_path) != str(to_ns_path):
-            to_ns = await models.Namespace.get(path=str(to_ns_path))
+            to_ns = await get_namespace_by_path(str(to_ns_path))
 
         objs = await (
             models.File
@@ -290,7 +452,7 @@ class FileRepository(IFileRepository):
             obj.path = to_path
             obj.name = Path(to_path).name
             if to_ns is not None:
-                obj.namespace = to_ns
+                obj.namespace_id = to_ns.id  # type: ignore[attr-defined]
                 obj.owner_id = to_ns.owner_id  # type: ignore[attr-defined]
 
         await models.File.bulk_update(
@@ -299,30 +461,82 @@ class FileRepository(IFileRepository):
         )
 
     async def save(self, file: File) -> File:
-        namespace = await models.Namespace.get(path=file.ns_path)
-        try:
-            obj = await models.File.create(
-                name=file.name,
-                path=str(file.path),
-                size=file.size,
-                modified_at=file.modified_at,
-                owner_id=namespace.owner_id,  # type: ignore[attr-defined]
-                namespace=namespace,
-                blob_id=file.blob_id,
+        # insert a file in a single round trip, namespace, owner, content hash and
+        # media type are resolved inside the statement, and either a missing
+        # namespace or a unique path violation results in no rows
+        connection = models.File._choose_db(for_write=True)
+        meta = models.File._meta
+        files, namespaces = Table(meta.db_table), Table(models.Namespace._meta.db_table)
+        blobs = Table(models.Blob._meta.db_table)
+
+        obj_id = meta.pk.default()  # type: ignore[misc]
+        values: dict[str, Any] = {
+            name: meta.fields_map[name].to_db_value(value, models.File)
+            for name, value in {
+                "id": obj_id,
+                "name": file.name,
+                "path": str(file.path),
+                "size": file.size,
+                "modified_at": file.modified_at,
+                "blob_id": file.blob_id,
+            }.items()
+        }
+        query = (
+            connection.query_class
+            .into(files)
+            .columns(*values.keys(), "namespace_id", "owner_id")
+            .from_(namespaces)
+            .select(
+                *(ValueWrapper(value) for value in values.values()),
+                namespaces.id,
+                namespaces.owner_id,
             )
-        except IntegrityError as exc:
-            raise File.AlreadyExists() from exc
-        return await self.get_by_id(obj.id)
+            .where(namespaces.path == str(file.ns_path))
+            .on_conflict()
+            .do_nothing()
+            .returning(files.owner_id)  # type: ignore[attr-defined]
+        )
+        if file.blob_id is not None:
+            blob = (
+                connection.query_class
+                .from_(blobs)
+                .where(blobs.id == ValueWrapper(values["blob_id"]))
+            )
+            query = query.returning(  # type: ignore[attr-defined]
+                Bracket(blob.select(blobs.chash)).as_("chash"),
+                Bracket(blob.select(blobs.media_type)).as_("media_type"),
+            )
+        sql, params = query.get_parameterized_sql()
+        _, rows = await connection.execute_query(sql, params)
+        if not rows:
+            # tell a missing namespace from a taken path
+            await get_namespace_by_path(file.ns_path)
+            raise File.AlreadyExists()
+
+        if file.blob_id is None:
+            chash_, mediatype = chash.EMPTY_CONTENT_HASH, MediaType.FOLDER
+        else:
+            chash_, mediatype = rows[0]["chash"], rows[0]["media_type"]
+        return file.model_copy(
+            update={
+                "id": obj_id,
+                "owner_id": meta.fields_map["owner_id"].to_python_value(
+                    rows[0]["owner_id"]
+                ),
+                "ns_path": str(file.ns_path),
+                "chash": chash_,
+                "mediatype": mediatype,
+            },
+        )
 
     async def save_batch(self, files: Iterable[File]) -> None:
         files = list(files)
         if not files:
             return
 
-        ns_paths = {f.ns_path for f in files}
         namespaces = {
-            ns.path: ns
-            for ns in await models.Namespace.filter(path__in=ns_paths)
+            ns_path: await get_namespace_by_path(ns_path)
+            for ns_path in {f.ns_path for f in files}
         }
 
         objs = [
@@ -331,26 +545,34 @@ class FileRepository(IFileRepository):
                 path=str(f.path),
                 size=f.size,
                 modified_at=f.modified_at,
-                owner_id=namespaces[f.ns_path].owner_id,  # type: ignore[attr-defined]
-                namespace=namespaces[f.ns_path],
+                owner_id=namespaces[f.ns_path].owner_id,
+                namespace_id=namespaces[f.ns_path].id,
                 blob_id=f.blob_id,
             )
             for f in files
         ]
         await models.File.bulk_create(objs, ignore_conflicts=True)
 
+    async def set_deleted_at_batch(
+        self, ids: Sequence[UUID], deleted_at: datetime
+    ) -> None:
+        await models.File.filter(id__in=list(ids)).update(deleted_at=deleted_at)
+
     async def update(self, file: File, fields: FileUpdate) -> File:
         update_kwargs: dict[str, object] = {}
         ns_path = fields.pop("ns_path", file.ns_path)
         if ns_path != file.ns_path:
-            namespace = await models.Namespace.get(path=ns_path)
-            update_kwargs["namespace"] = namespace
-            update_kwargs["owner_id"] = namespace.owner_id  # type: ignore[attr-defined]
+            namespace = await get_namespace_by_path(ns_path)
+            update_kwargs["namespace_id"] = namespace.id
+            update_kwargs["owner_id"] = namespace.owner_id
 
         for key, value in fields.items():
             update_kwargs[key] = str(value) if key == "path" else value
 
-        await models.File.filter(id=file.id).update(**update_kwargs)
+        try:
+            await models.File.filter(id=file.id).update(**update_kwargs)
+        except IntegrityError as exc:
+            raise File.AlreadyExists() from exc
 
         obj = await (
             models.File
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from tortoise.exceptions import DoesNotExist
 
@@ -25,11 +25,13 @@ def _from_db(obj: models.MediaItem) -> MediaItem:
         metadata = BlobMetadata(
             blob_id=raw_metadata.blob_id,
             data=raw_metadata.data,
+            placeholder=raw_metadata.placeholder,
         )
 
     taken_at = None
-    if metadata is not None and metadata.data.dt_original is not None:
-        taken_at = timezone.fromtimestamp(metadata.data.dt_original)
+    data = metadata.data if metadata is not None else None
+    if data is not None and data.dt_original is not None:
+        taken_at = timezone.fromtimestamp(data.dt_original)
 
     return MediaItem(
         id=obj.id,
@@ -39,6 +41,7 @@ def _from_db(obj: models.MediaItem) -> MediaItem:
         media_type=blob.media_type,
         size=blob.size,
         chash=blob.chash,
+        placeholder=metadata.placeholder if metadata is not None else None,
         taken_at=taken_at,
         created_at=obj.created_at,
         modified_at=obj.modified_at,
@@ -46,6 +49,50 @@ def _from_db(obj: models.MediaItem) -> MediaItem:
     )
 
 
+# fields to fetch a media item as a plain row, see `_from_row`
+_FIELDS = (
+    "id",
+    "owner_id",
+    "blob_id",
+    "name",
+    "created_at",
+    "modified_at",
+    "deleted_at",
+    "blob__media_type",
+    "blob__size",
+    "blob__chash",
+    "blob__metadata__data",
+    "blob__metadata__placeholder",
+)
+
+
+def _from_row(row: dict[str, Any]) -> MediaItem:
+    """
+    Builds a media item from a row fetched with `_FIELDS`.
+
+    Rows come straight from the database, so validation is skipped and metadata
+    is not parsed beyond the one field a media item needs.
+    """
+    taken_at = None
+    if (data := row["blob__metadata__data"]) and data.get("dt_original") is not None:
+        taken_at = timezone.fromtimestamp(data["dt_original"])
+
+    return MediaItem.model_construct(
+        id=row["id"],
+        owner_id=row["owner_id"],
+        blob_id=row["blob_id"],
+        name=row["name"],
+        media_type=row["blob__media_type"],
+        size=row["blob__size"],
+        chash=row["blob__chash"],
+        placeholder=row["blob__metadata__placeholder"],
+        taken_at=taken_at,
+        created_at=row["created_at"],
+        modified_at=row["modified_at"],
+        deleted_at=row["deleted_at"],
+    )
+
+
 def _base_qs():
     """Base queryset with Blob and BlobMetadata JOINs."""
     return (
@@ -76,12 +123,13 @@ class MediaItemRepository:
     async def get_by_id_batch(
         self, media_item_ids: Sequence[UUID]
     ) -> list[MediaItem]:
-        objs = await (
-            _base_qs()
+        rows = await (
+            models.MediaItem
             .filter(id__in=list(media_item_ids))
             .order_by("-modified_at")
+            .values(*_FIELDS)
         )
-        return [_from_db(obj) for obj in objs]
+        return [_from_row(row) for row in rows]
 
     async def get_for_owner(
         self, owner_id: UUID, media_item_id: UUID
@@ -100,10 +148,7 @@ class MediaItemRepository:
         offset: int,
         limit: int = 25,
     ) -> list[MediaItem]:
-        qs = (
-            _base_qs()
-            .filter(owner_id=owner_id, deleted_at__isnull=True)
-        )
+        qs = models.MediaItem.filter(owner_id=owner_id, deleted_at__isnull=True)
         if only_favourites:
             favourite_ids: list[UUID] = await (  # type: ignore[assignment]
                 models.MediaItemFavourite
@@ -112,20 +157,39 @@ class MediaItemRepository:
             )
             qs = qs.filter(id__in=list(favourite_ids))
 
-        objs = await qs.order_by("-modified_at").offset(offset).limit(limit)
-        return [_from_db(obj) for obj in objs]
+        rows = await (
+            qs
+            .order_by("-modified_at")
+            .offset(offset)
+            .limit(limit)
+            .values(*_FIELDS)
+        )
+        return [_from_row(row) for row in rows]
 
     async def list_deleted(
         self, owner_id: UUID, *, offset: int, limit: int = 25
     ) -> list[MediaItem]:
-        objs = await (
-            _base_qs()
+        rows = await (
+            models.MediaItem
             .filter(owner_id=owner_id, deleted_at__isnull=False)
             .order_by("-deleted_at")
             .offset(offset)
             .limit(limit)
+            .values(*_FIELDS)
         )
-        return [_from_db(obj) for obj in objs]
+        return [_from_row(row) for row in rows]
+
+    async def list_deleted_before(
+        self, before: datetime, limit: int
+    ) -> list[MediaItem]:
+        rows = await (
+            models.MediaItem
+            .filter(deleted_at__lt=before)
+            .order_by("deleted_at")
+            .limit(limit)
+            .values(*_FIELDS)
+        )
+        return [_from_row(row) for row in rows]
 
     async def save(self, item: MediaItem) -> MediaItem:
         obj = await models.MediaItem.create(
@@ -150,9 +214,10 @@ class MediaItemRepository:
             deleted_at=deleted_at
         )
 
-        objs = await (
-            _base_qs()
+        rows = await (
+            models.MediaItem
             .filter(id__in=list(ids), owner_id=owner_id)
             .order_by("-modified_at")
+            .values(*_FIELDS)
         )
-        return [_from_db(obj) for obj in objs]
+        return [_from_row(row) for row in rows]
@@ -6,39 +6,88 @@ from tortoise.exceptions import DoesNotExist
 
 from app.app.files.domain import Namespace
 from app.app.files.repositories import INamespaceRepository
+from app.cache import local_cache
 from app.infrastructure.database.tortoise import models
+from app.infrastructure.database.tortoise.routers import in_transaction
 
 if TYPE_CHECKING:
     from app.app.files.domain import AnyPath
     from app.typedefs import StrOrUUID
 
-__all__ = ["NamespaceRepository"]
+__all__ = [
+    "NamespaceRepository",
+    "get_namespace_by_path",
+]
+
+
+def _owner_key(owner_id: StrOrUUID) -> str:
+    return f"namespace:owner:{owner_id}"
+
+
+def _path_key(path: AnyPath) -> str:
+    return f"namespace:path:{path}"
+
+
+def _from_model(obj: models.Namespace) -> Namespace:
+    return Namespace(
+        id=obj.id,
+        path=obj.path,
+        owner_id=obj.owner_id  # type: ignore[attr-defined]
+    )
+
+
+async def _cache(namespace: Namespace) -> None:
+    # a namespace read inside a transaction might be rolled back with it
+    if in_transaction():
+        return
+    await local_cache.set_many(
+        {
+            _owner_key(namespace.owner_id): namespace,
+            _path_key(namespace.path): namespace,
+        },
+        expire="1h",
+    )
+
+
+async def get_namespace_by_path(path: AnyPath) -> Namespace:
+    """
+    Returns a namespace with a given path. Namespaces never change once created,
+    so most of the time it is a memory lookup.
+
+    Raises:
+        Namespace.NotFound: If namespace with a given path does not exist.
+    """
+    if (namespace := await local_cache.get(_path_key(path))) is not None:
+        return namespace
+
+    try:
+        obj = await models.Namespace.get(path=str(path))
+    except DoesNotExist as exc:
+        msg = f"Namespace with path={path} does not exist"
+        raise Namespace.NotFound(msg) from exc
+
+    namespace = _from_model(obj)
+    await _cache(namespace)
+    return namespace
 
 
 class NamespaceRepository(INamespaceRepository):
     async def get_by_owner_id(self, owner_id: StrOrUUID) -> Namespace:
+        if (namespace := await local_cache.get(_owner_key(owner_id))) is not None:
+            return namespace
+
         try:
             obj = await models.Namespace.get(owner_id=owner_id)
         except DoesNotExist as exc:
             msg = f"Namespace with owner_id={owner_id} does not exist"
             raise Namespace.NotFound(msg) from exc
-        return Namespace(
-            id=obj.id,
-            path=obj.path,
-            owner_id=obj.owner_id  # type: ignore[attr-defined]
-        )
+
+        namespace = _from_model(obj)
+        await _cache(namespace)
+        return namespace
 
     async def get_by_path(self, path: AnyPath) -> Namespace:
-        try:
-            obj = await models.Namespace.get(path=str(path))
-        except DoesNotExist as exc:
-            msg = f"Namespace with path={path} does not exist"
-            raise Namespace.NotFound(msg) from exc
-        return Namespace(
-            id=obj.id,
-            path=obj.path,
-            owner_id=obj.owner_id  # type: ignore[attr-defined]
-        )
+        return await get_namespace_by_path(path)
 
     async def get_space_used_by_owner_id(self, owner_id: StrOrUUID) -> int:
         sizes: list[int] = await (  # type: ignore[assignment]
@@ -56,4 +105,8 @@ class NamespaceRepository(INamespaceRepository):
             owner_id=namespace.owner_id,
         )
         await obj.save()
+        # a namespace that used to have the same path or owner might still be cached
+        await local_cache.delete_many(
+            _owner_key(namespace.owner_id), _path_key(namespace.path)
+        )
         return namespace.model_copy(update={"id": obj.id})
@@ -7,14 +7,22 @@ from tortoise.exceptions import DoesNotExist, IntegrityError
 from app.app.users.domain import User
 from app.app.users.repositories import IUserRepository
 from app.app.users.repositories.user import GetKwargs, UserUpdate
+from app.cache import local_cache
 from app.infrastructure.database.tortoise import models
+from app.infrastructure.database.tortoise.routers import in_transaction
 
 if TYPE_CHECKING:
     from uuid import UUID
 
+    from app.typedefs import StrOrUUID
+
 __all__ = ["UserRepository"]
 
 
+def _user_key(user_id: StrOrUUID) -> str:
+    return f"user:{user_id}"
+
+
 def _from_db(obj: models.User) -> User:
     return User(
         id=obj.id,
@@ -36,11 +44,21 @@ class UserRepository(IUserRepository):
 
     async def get(self, **fields: Unpack[GetKwargs]) -> User:
         assert fields, "One of the fields must be provided"
+        # lookups by ID are the most frequent ones, so they are cached
+        key = _user_key(fields["id"]) if fields.keys() == {"id"} else None
+        if key is not None and (user := await local_cache.get(key)) is not None:
+            return user
+
         try:
             obj = await models.User.get(**fields)
         except DoesNotExist as exc:
             raise User.NotFound() from exc
-        return _from_db(obj)
+
+        user = _from_db(obj)
+        # a user read inside a transaction might be rolled back with it
+        if key is not None and not in_transaction():
+            await local_cache.set(key, user, expire="1h")
+        return user
 
     async def save(self, user: User) -> User:
         obj = models.User(
@@ -66,5 +84,6 @@ class UserRepository(IUserRepository):
     async def update(self, user_id: UUID, **fields: Unpack[UserUpdate]) -> User:
         assert fields, "`fields` must have at least one value"
         await models.User.filter(id=user_id).update(**fields)
+        await local_cache.delete(_user_key(user_id))
         obj = await models.User.get(id=user_id)
         return _from_db(obj)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import contextlib
+import random
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+from tortoise.backends.base.client import TransactionalDBClient
+from tortoise.connection import connections
+
+from app.cache import cache
+from app.toolkit import taskgroups
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from datetime import timedelta
+
+    from tortoise import Model
+
+    from app.typedefs import StrOrUUID
+
+__all__ = [
+    "PRIMARY",
+    "REPLICA_PREFIX",
+    "ReplicaRouter",
+    "in_transaction",
+    "pin_to_primary",
+    "read_your_writes",
+]
+
+PRIMARY = "default"
+REPLICA_PREFIX = "replica_"
+
+# Set once the current context has written to the primary. Every request and
+# every worker job runs in its own context, so the pin lasts exactly until the
+# end of the unit of work that made the write (read-your-writes).
+_pinned_to_primary: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+
+# A user the current context works for, see `read_your_writes`.
+_writer: ContextVar[_Writer | None] = ContextVar("writer", default=None)
+
+
+def _recent_write_key(user_id: StrOrUUID) -> str:
+    return f"recent_write:{user_id}"
+
+
+def _replicas() -> list[str]:
+    return [name for name in connections.db_config if name.startswith(REPLICA_PREFIX)]
+
+
+class _Writer:
+    __slots__ = ("key", "window", "wrote")
+
+    def __init__(self, key: str, window: timedelta) -> None:
+        self.key = key
+        self.window = window
+        self.wrote = False
+
+
+@contextlib.asynccontextmanager
+async def read_your_writes(
+    user_id: StrOrUUID, window: timedelta
+) -> AsyncIterator[None]:
+    """
+    Extends read-your-writes to the next requests of the same user. Once the user
+    writes something, all of their reads stay on the primary for the `window`, so
+    the changes are visible even if replicas lag behind.
+    """
+    key = _recent_write_key(user_id)
+    if await cache.get(key) is not None:
+        pin_to_primary()
+    token = _writer.set(_Writer(key, window))
+    try:
+        yield
+    finally:
+        _writer.reset(token)
+
+
+def pin_to_primary() -> None:
+    """Route all subsequent reads in the current context to the primary."""
+    _pinned_to_primary.set(True)
+
+
+def in_transaction() -> bool:
+    """Whether the current context has an open transaction on the primary."""
+    return isinstance(connections.get(PRIMARY), TransactionalDBClient)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random read replica and everything else to the primary.
+
+    Reads stay on the primary when the current context has already written
+    something or when there is an open transaction.
+    """
+
+    def db_for_read(self, model: type[Model]) -> str | None:
+        if _pinned_to_primary.get():
+            return None
+        if in_transaction():
+            return None
+        replicas = _replicas()
+        if not replicas:
+            return None
+        return random.choice(replicas)  # noqa: S311
+
+    def db_for_write(self, model: type[Model]) -> str | None:
+        pin_to_primary()
+        writer = _writer.get()
+        if writer is not None and not writer.wrote:
+            writer.wrote = True
+            expire = writer.window
+            taskgroups.schedule(cache.set(writer.key, True, expire=expire))
+        return PRIMARY
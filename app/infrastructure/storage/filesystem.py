@@ -7,7 +7,7 @@ import glob
 import os
 import os.path
 import shutil
-from typing import TYPE_CHECKING, Self
+from typing import IO, TYPE_CHECKING, Self
 
 import stream_zip
 
@@ -99,7 +99,9 @@ class FileSystemStorage(IStorage):
                     else:
                         tg.create_task(asyncio.to_thread(os.unlink, entry.path))
 
-    async def download(self, key: str) -> AsyncIterator[bytes]:
+    async def download(
+        self, key: str, *, length: int | None = None
+    ) -> AsyncIterator[bytes]:
         fullpath = self._fullpath(key)
 
         try:
@@ -111,8 +113,11 @@ class FileSystemStorage(IStorage):
             raise File.NotFound()
 
         with open(fullpath, "rb", buffering=4096) as f:
-            for chunk in f:
-                yield chunk
+            if length is None:
+                for chunk in f:
+                    yield chunk
+            else:
+                yield f.read(length)
 
     def download_batch(self, items: Iterable[DownloadBatchItem]) -> Iterable[bytes]:
         return stream_zip.stream_zip(
@@ -229,6 +234,19 @@ class FileSystemStorage(IStorage):
 
         await self._move(at, to)
 
+    @contextlib.asynccontextmanager
+    async def open_local(
+        self, key: str, *, length: int | None = None, in_memory: bool = True
+    ) -> AsyncIterator[IO[bytes]]:
+        fullpath = self._fullpath(key)
+        try:
+            file = open(fullpath, "rb")  # noqa: SIM115
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError) as exc:
+            raise File.NotFound() from exc
+
+        with file:
+            yield file
+
     async def _move(self, at: str, to: str) -> None:
         source = self._fullpath(at)
         destination = self._fullpath(to)
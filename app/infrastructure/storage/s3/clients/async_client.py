@@ -175,9 +175,18 @@ class AsyncS3Client:
             etag=r.headers["ETag"],
         )
 
-    async def iter_download(self, bucket: str, key: str) -> AsyncIterator[bytes]:
+    async def iter_download(
+        self, bucket: str, key: str, *, length: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Iterates over an object content. If `length` is provided, only that many
+        first bytes are requested with a ranged GET.
+
+        https://docs.aws.amazon.com/AmazonS3/latest/API/API_GetObject.html
+        """
         url = self._url(f"{bucket}/{key}")
-        async with self.client.stream("GET", url) as r:
+        headers = {} if length is None else {"Range": f"bytes=0-{length - 1}"}
+        async with self.client.stream("GET", url, headers=headers) as r:
             async for chunk in r.aiter_bytes():
                 yield chunk
 
@@ -89,10 +89,12 @@ class S3Storage(IStorage):
             return False
         return True
 
-    async def download(self, key: str) -> AsyncIterator[bytes]:
+    async def download(
+        self, key: str, *, length: int | None = None
+    ) -> AsyncIterator[bytes]:
         key = os.path.normpath(key)
         try:
-            async for chunk in self.s3.iter_download(self.bucket, key):
+            async for chunk in self.s3.iter_download(self.bucket, key, length=length):
                 yield chunk
         except NoSuchKey as exc:
             raise File.NotFound() from exc
@@ -1,23 +1,80 @@
 from __future__ import annotations
 
+import asyncio
+import enum
+import pickle
 from contextlib import AsyncExitStack
-from typing import TYPE_CHECKING, Self, assert_never
+from typing import TYPE_CHECKING, Any, Self, assert_never
 
 from arq.connections import ArqRedis
+from arq.constants import default_queue_name
 from arq.jobs import Job as ArqJob
 from arq.jobs import JobStatus as ArqJobStatus
 
-from app.app.infrastructure.worker import Job, JobStatus
+from app.app.infrastructure.worker import Job, JobProgress, JobStatus
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from app.config import ARQWorkerConfig
 
+__all__ = [
+    "ARQWorker",
+    "Lane",
+    "QUEUE_NAMES",
+    "get_queue_name",
+]
+
+
+class Lane(enum.StrEnum):
+    """
+    A queue served by its own pool of jobs, so a burst of jobs in one lane doesn't
+    delay jobs in others.
+    """
+
+    # short jobs a user is waiting for
+    interactive = "interactive"
+    default = "default"
+    # long-running background work, such as processing of uploaded media
+    bulk = "bulk"
+
+
+QUEUE_NAMES = {
+    Lane.interactive: f"{default_queue_name}:interactive",
+    Lane.default: default_queue_name,
+    Lane.bulk: f"{default_queue_name}:bulk",
+}
+
+_ROUTES = {
+    "delete_immediately_batch": Lane.interactive,
+    "empty_trash": Lane.interactive,
+    "move_batch": Lane.interactive,
+    "move_to_trash_batch": Lane.interactive,
+    "process_blob_content": Lane.bulk,
+    "process_blob_content_batch": Lane.bulk,
+    "process_blob_jobs": Lane.bulk,
+    "purge_deleted_files": Lane.bulk,
+}
+
+
+_PROGRESS_KEY_PREFIX = "arq:progress:"
+# progress is only useful while a client waits for a job
+_PROGRESS_TTL = 3600
+# how long to wait for new progress before checking whether a job is complete
+_WATCH_INTERVAL = 1.0
+
+
+def get_queue_name(job_name: str) -> str:
+    """Returns a queue name of the lane a job is routed to."""
+    return QUEUE_NAMES[_ROUTES.get(job_name, Lane.default)]
+
 
 class ARQWorker:
-    __slots__ = ("pool", "_stack")
+    __slots__ = ("pool", "lanes", "_stack")
 
     def __init__(self, worker_config: ARQWorkerConfig):
         self.pool: ArqRedis = ArqRedis.from_url(str(worker_config.broker_dsn))
+        self.lanes = worker_config.lanes
         self._stack = AsyncExitStack()
 
     async def __aenter__(self) -> Self:
@@ -27,15 +84,60 @@ class ARQWorker:
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         await self._stack.aclose()
 
-    async def enqueue(self, job_name: str, *args, **kwargs) -> Job:
-        job = await self.pool.enqueue_job(job_name, *args, **kwargs)
-        assert job is not None
+    async def enqueue(
+        self, job_name: str, *args, job_id: str | None = None, **kwargs
+    ) -> Job:
+        job = await self.pool.enqueue_job(
+            job_name,
+            *args,
+            _job_id=job_id,
+            _queue_name=self._get_queue_name(job_name),
+            **kwargs,
+        )
+        if job is None:
+            # a job with the same ID already exists
+            assert job_id is not None
+            return Job(id=job_id)
         return Job(id=job.job_id)
 
     async def get_result(self, job_id: str, *, timeout: int | float | None = 5):
-        job = ArqJob(job_id=job_id, redis=self.pool)
+        # a queue is needed to wait for the result, it's resolved by the job name
+        info = await ArqJob(job_id=job_id, redis=self.pool).info()
+        queue_name = default_queue_name
+        if info is not None:
+            queue_name = self._get_queue_name(info.function)
+        job = ArqJob(job_id=job_id, redis=self.pool, _queue_name=queue_name)
         return await job.result(timeout=timeout)
 
+    async def publish_progress(self, job_id: str, item: Any) -> None:
+        key = f"{_PROGRESS_KEY_PREFIX}{job_id}"
+        async with self.pool.pipeline(transaction=False) as pipe:
+            pipe.xadd(key, {"item": pickle.dumps(item)})
+            pipe.expire(key, _PROGRESS_TTL)
+            await pipe.execute()
+
+    async def watch(
+        self, job_id: str, *, last_id: str | None = None, timeout: float = 60
+    ) -> AsyncIterator[JobProgress]:
+        key = f"{_PROGRESS_KEY_PREFIX}{job_id}"
+        last_id = last_id or "0"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            # the status is checked before reading, so everything published before
+            # the job completed is read on the last iteration
+            complete = await self.get_status(job_id) == JobStatus.complete
+            # zero blocks forever, so wait at least a millisecond
+            block_ms = max(int(min(remaining, _WATCH_INTERVAL) * 1000), 1)
+            block = None if complete else block_ms
+            response = await self.pool.xread({key: last_id}, block=block)
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id.decode()
+                    yield JobProgress(id=last_id, item=pickle.loads(fields[b"item"]))
+            if complete:
+                return
+
     async def get_status(self, job_id: str) -> JobStatus:
         job = ArqJob(job_id=job_id, redis=self.pool)
         status = await job.status()
@@ -49,3 +151,8 @@ class ARQWorker:
                 return JobStatus.complete
             case _:  # pragma: no cover
                 assert_never(status)
+
+    def _get_queue_name(self, job_name: str) -> str:
+        if not self.lanes:
+            return default_queue_name
+        return get_queue_name(job_name)
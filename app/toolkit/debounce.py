@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from app.toolkit import taskgroups
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+__all__ = ["Debouncer"]
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer[T]:
+    """
+    Groups items added within a short window and hands them over in one batch.
+
+    The first item starts the window, and the batch is flushed in the background
+    when the window ends or right away when it reaches the max size. A zero window
+    flushes every item on its own. Pending items are flushed on shutdown along with
+    other background tasks.
+    """
+
+    __slots__ = ("window", "max_size", "_flush", "_items", "_scheduled")
+
+    def __init__(
+        self,
+        flush: Callable[[list[T]], Coroutine[object, object, None]],
+        *,
+        window: float,
+        max_size: int,
+    ) -> None:
+        self.window = window
+        self.max_size = max_size
+        self._flush = flush
+        self._items: list[T] = []
+        self._scheduled = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def add(self, item: T) -> None:
+        """Adds an item to the current batch."""
+        self._items.append(item)
+        if self.window <= 0 or len(self._items) >= self.max_size:
+            await self.flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            taskgroups.schedule(self._flush_later())
+
+    async def flush(self) -> None:
+        """Hands over pending items right away."""
+        items, self._items = self._items, []
+        if items:
+            await self._flush(items)
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self._scheduled = False
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to flush a batch")
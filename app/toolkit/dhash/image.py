@@ -7,6 +7,9 @@ from PIL import Image, UnidentifiedImageError
 if TYPE_CHECKING:
     pass
 
+# the least number of times a draft-decoded image is larger than the hash grid,
+# so the final resampling still has enough pixels to average over
+_DRAFT_GAP = 4
 
 
 def dhash_image(content: IO[bytes], size: int = 8) -> int | None:
@@ -42,6 +45,8 @@ def _dhash_image_prepare_data(
     """
     Converts an image to greyscale and downscale.
 
+    JPEGs are decoded straight to greyscale at a reduced scale (up to 1/8).
+
     Args:
         content: Image content.
         width: Width to downscale image to.
@@ -51,6 +56,7 @@ def _dhash_image_prepare_data(
         Downscaled greyscale image data.
     """
     with Image.open(content) as im:
+        im.draft("L", (width * _DRAFT_GAP, height * _DRAFT_GAP))
         return (
             im
             .convert("L")
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = ["LRUCache"]
+
+
+class LRUCache[K, V]:
+    """
+    An in-memory LRU cache limited by the total size of its values rather than
+    by the number of entries. Least recently used entries are evicted first.
+    """
+
+    __slots__ = (
+        "max_size",
+        "size",
+        "hits",
+        "misses",
+        "evictions",
+        "_sizeof",
+        "_data",
+    )
+
+    def __init__(self, max_size: int, sizeof: Callable[[V], int]) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sizeof = sizeof
+        self._data: OrderedDict[K, tuple[V, int]] = OrderedDict()
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        """Removes all entries, counters are kept."""
+        self._data.clear()
+        self.size = 0
+
+    def get(self, key: K) -> V | None:
+        """Returns a value for the key and marks it as recently used."""
+        try:
+            value, _ = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """
+        Puts a value to the cache, evicting least recently used entries until the
+        value fits. Values larger than the whole cache are not stored at all.
+        """
+        size = self._sizeof(value)
+        if size > self.max_size:
+            return
+
+        if key in self._data:
+            _, old_size = self._data.pop(key)
+            self.size -= old_size
+
+        while self._data and self.size + size > self.max_size:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+        self._data[key] = (value, size)
+        self.size += size
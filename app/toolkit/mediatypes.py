@@ -54,6 +54,7 @@ class MediaType(enum.StrEnum):
     PDF = "application/pdf"
 
     # image
+    IMAGE_AVIF = "image/avif"
     IMAGE_BMP = "image/bmp"
     IMAGE_GIF = "image/gif"
     IMAGE_HEIC = "image/heic"
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import asyncio
-from typing import IO
+from typing import IO, TYPE_CHECKING
 
 from app.toolkit import mediatypes
 from app.toolkit.mediatypes import MediaType
 
 from .image import Exif, load_image_data
 
+if TYPE_CHECKING:
+    from app.toolkit.processpool import ProcessPool
+
 __all__ = [
     "SUPPORTED_TYPES",
     "Exif",
+    "get_header_size",
+    "is_supported",
     "load",
 ]
 
@@ -26,9 +31,33 @@ _SUPPORTED_IMAGES = {
 
 SUPPORTED_TYPES = _SUPPORTED_IMAGES
 
+# JPEG keeps EXIF in an APP1 segment before the image data, and segments are
+# limited to 64KB, so the metadata of a typical photo fits in the first bytes
+_HEADER_SIZES = {
+    MediaType.IMAGE_JPEG: 256 * 1024,
+}
+
+
+def is_supported(mediatype: str) -> bool:
+    """True if metadata can be loaded for a given mediatype, otherwise False."""
+    return mediatype in SUPPORTED_TYPES
+
+
+def get_header_size(mediatype: str) -> int | None:
+    """
+    Returns how many first bytes of the content are enough to load metadata for
+    a given mediatype, or None if the whole content is required.
+    """
+    return _HEADER_SIZES.get(mediatype)
+
 
-async def load(content: IO[bytes]) -> Exif | None:
-    """Loads metadata for a given content based on its mediatype."""
+async def load(content: IO[bytes], *, pool: ProcessPool | None = None) -> Exif | None:
+    """
+    Loads metadata for a given content based on its mediatype. If a pool is
+    provided, metadata is loaded there.
+    """
+    if pool is not None:
+        return await pool.run(_load, content)
     return await asyncio.to_thread(_load, content)
 
 
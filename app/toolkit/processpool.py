@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import resource
+import shutil
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, TYPE_CHECKING, Any, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = [
+    "ProcessPool",
+    "TaskFailed",
+    "temporary_file",
+]
+
+# content is handed over to workers through a file, prefer tmpfs when available
+_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# a task stuck where the alarm can't interrupt it, such as a C extension, gets
+# that much time (in seconds) on top of its limit before its worker is killed
+_KILL_GRACE_PERIOD = 5
+
+
+class TaskFailed(Exception):
+    """If a task exceeded its limits or a worker process died while running it."""
+
+
+class ProcessPool:
+    """
+    A pool of worker processes for CPU-bound work, such as media decoding.
+
+    Each task runs with a time and address space limit, and workers are replaced
+    with fresh ones after a number of tasks. Task content is passed by a file path,
+    so it is never pickled. A pool with zero workers runs tasks in a thread without
+    any limits.
+
+    When a worker dies, every task of the pool fails, so it's not known which task
+    has killed it. Such tasks are run again one by one in a separate worker, and
+    only the one that kills it again fails.
+    """
+
+    __slots__ = (
+        "max_workers",
+        "max_tasks_per_worker",
+        "memory_limit",
+        "timeout",
+        "_executor",
+        "_retry_executor",
+        "_retry_lock",
+    )
+
+    def __init__(
+        self,
+        max_workers: int,
+        *,
+        max_tasks_per_worker: int | None = None,
+        memory_limit: int | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._retry_executor: ProcessPoolExecutor | None = None
+        self._retry_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._make_executor(self.max_workers)
+        return self._executor
+
+    def _get_retry_executor(self) -> ProcessPoolExecutor:
+        if self._retry_executor is None:
+            self._retry_executor = self._make_executor(1)
+        return self._retry_executor
+
+    def _make_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit,),
+            max_tasks_per_child=self.max_tasks_per_worker,
+        )
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Stops using an executor. Tasks it is running are not cancelled, they finish
+        or fail on their own.
+        """
+        if self._executor is executor:
+            self._executor = None
+        if self._retry_executor is executor:
+            self._retry_executor = None
+        executor.shutdown(wait=False)
+
+    async def run[T](
+        self,
+        func: Callable[..., T],
+        content: IO[bytes],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Runs `func(content, *args, **kwargs)` in a worker process. The function
+        must be defined at a module level.
+
+        Raises:
+            TaskFailed: If the task exceeded its limits or a worker died.
+        """
+        if not self.max_workers:
+            return await asyncio.to_thread(func, content, *args, **kwargs)
+
+        path, is_temporary = await asyncio.to_thread(_as_path, content)
+        task = functools.partial(_run_task, func, path, self.timeout, args, kwargs)
+        try:
+            try:
+                return await self._submit(self._get_executor(), task)
+            except BrokenProcessPool:
+                pass
+
+            # only one task runs at a time, so if the worker dies it's that task
+            async with self._retry_lock:
+                try:
+                    return await self._submit(self._get_retry_executor(), task)
+                except BrokenProcessPool as exc:
+                    raise TaskFailed("Worker process died unexpectedly") from exc
+        finally:
+            if is_temporary:
+                os.unlink(path)
+
+    async def _submit[T](
+        self, executor: ProcessPoolExecutor, task: Callable[[], T]
+    ) -> T:
+        """
+        Runs a task in an executor. If the task is stuck past its time limit, the
+        executor workers are killed, so the other tasks of the executor fail with
+        BrokenProcessPool.
+        """
+        try:
+            future = asyncio.wrap_future(executor.submit(task))
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+        timeout = None
+        if self.timeout:
+            timeout = self.timeout + _KILL_GRACE_PERIOD
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            _kill_workers(executor)
+            self._discard(executor)
+            raise TaskFailed("Task exceeded time limit") from None
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def shutdown(self) -> None:
+        """Stops all worker processes."""
+        for executor in (self._executor, self._retry_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._retry_executor = None
+
+
+def temporary_file(*, in_memory: bool = True) -> IO[bytes]:
+    """
+    Returns a named temporary file, that can be passed to the pool without making
+    a copy. The file is removed on close.
+
+    The file is kept in memory (tmpfs) when available, unless `in_memory` is False,
+    then it is created on disk, which is better for large content.
+    """
+    tmp_dir = _TMP_DIR if in_memory else None
+    return tempfile.NamedTemporaryFile(dir=tmp_dir)  # noqa: SIM115
+
+
+def _as_path(content: IO[bytes]) -> tuple[str, bool]:
+    """
+    Returns a path to the content and whether it is a temporary copy that has to
+    be removed afterwards.
+    """
+    name = getattr(content, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name, False
+
+    content.seek(0)
+    with tempfile.NamedTemporaryFile(dir=_TMP_DIR, delete=False) as file:
+        shutil.copyfileobj(content, file)
+    return file.name, True
+
+
+def _kill_workers(executor: ProcessPoolExecutor) -> None:
+    # there is no public API to reach workers of an executor before Python 3.14
+    processes = getattr(executor, "_processes", None) or {}
+    for process in list(processes.values()):
+        process.kill()
+
+
+def _init_worker(memory_limit: int | None) -> None:
+    if memory_limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    signal.signal(signal.SIGALRM, _on_timeout)
+
+
+def _on_timeout(signum, frame) -> None:
+    raise TimeoutError("Task exceeded time limit")
+
+
+def _run_task[T](
+    func: Callable[..., T],
+    path: str,
+    timeout: float | None,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> T:
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with open(path, "rb") as content:
+            return func(content, *args, **kwargs)
+    except (MemoryError, TimeoutError) as exc:
+        raise TaskFailed(str(exc) or exc.__class__.__name__) from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine, Hashable
+
+__all__ = ["SingleFlight"]
+
+
+class SingleFlight[K: Hashable, T]:
+    """
+    Coalesces concurrent calls with the same key into a single call.
+
+    The first caller for a key starts the call, and everyone who asks for the same
+    key while it is still running awaits the same result (or exception). The call
+    runs in its own task, so cancelling one of the callers doesn't affect others.
+    """
+
+    __slots__ = ("_calls",)
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Task[T]] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._calls
+
+    async def run(
+        self,
+        key: K,
+        func: Callable[..., Coroutine[Any, Any, T]],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """Returns the result of `func(*args, **kwargs)` shared by the key."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: K, task: asyncio.Task[T]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # mark the exception as retrieved in case every caller has been cancelled
+        if not task.cancelled():
+            task.exception()
@@ -1,23 +1,52 @@
 from __future__ import annotations
 
 import asyncio
-from typing import IO
+import logging
+from collections import Counter
+from typing import IO, TYPE_CHECKING, Any
 
 from app.toolkit import mediatypes
 from app.toolkit.mediatypes import MediaType
 
 from ._exceptions import ThumbnailUnavailable
-from .image import thumbnail_image
-from .pdf import thumbnail_pdf
+from .image import (
+    MAX_ANIMATION_DURATION,
+    MAX_ANIMATION_FRAMES,
+    OUTPUT_TYPES,
+    collect_preview_stats,
+    thumbnail_image,
+    thumbnail_image_many,
+)
+from .pdf import thumbnail_pdf, thumbnail_pdf_many
+from .placeholder import placeholder
 from .svg import thumbnail_svg
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from app.toolkit.processpool import ProcessPool
+
 __all__ = [
+    "MAX_ANIMATION_DURATION",
+    "MAX_ANIMATION_FRAMES",
+    "OUTPUT_TYPES",
     "SUPPORTED_TYPES",
     "ThumbnailUnavailable",
     "is_supported",
+    "placeholder",
+    "preview_stats",
     "thumbnail",
+    "thumbnail_many",
 ]
 
+logger = logging.getLogger(__name__)
+
+# how many times an embedded preview was used instead of a full decode ("hit")
+# and how many times it was missing or unfit ("miss"), including thumbnails
+# generated in a pool, the stats are logged once per that many lookups
+preview_stats: Counter[str] = Counter()
+_PREVIEW_STATS_LOG_INTERVAL = 1000
+
 _SUPPORTED_IMAGES = {
     MediaType.IMAGE_BMP,
     MediaType.IMAGE_GIF,
@@ -43,21 +72,102 @@ def is_supported(mediatype: str) -> bool:
     return mediatype in SUPPORTED_TYPES
 
 
-async def thumbnail(content: IO[bytes], *, size: int) -> tuple[bytes, MediaType]:
+async def thumbnail(
+    content: IO[bytes],
+    *,
+    size: int,
+    output_type: MediaType = MediaType.IMAGE_WEBP,
+    max_frames: int = MAX_ANIMATION_FRAMES,
+    max_duration: int = MAX_ANIMATION_DURATION,
+    pool: ProcessPool | None = None,
+) -> tuple[bytes, MediaType]:
     """
     Generates in-memory thumbnail with a specified sized for a given content with
-    preserved aspect ratio.
+    preserved aspect ratio. The thumbnail is encoded to the output type, one of
+    the `OUTPUT_TYPES`. Animated thumbnails are limited to `max_frames` frames
+    and `max_duration` milliseconds. If a pool is provided, thumbnail is
+    generated there.
 
     Raises:
         File.ThumbnailUnavailable: If thumbnail can't be generated for the content.
     """
-    return await asyncio.to_thread(_thumbnail, content, size)
+    return await _run(
+        pool, _thumbnail, content, size, output_type, max_frames, max_duration
+    )
+
+
+async def thumbnail_many(
+    content: IO[bytes],
+    *,
+    sizes: Iterable[int],
+    output_type: MediaType = MediaType.IMAGE_WEBP,
+    max_frames: int = MAX_ANIMATION_FRAMES,
+    max_duration: int = MAX_ANIMATION_DURATION,
+    pool: ProcessPool | None = None,
+) -> dict[int, tuple[bytes, MediaType]]:
+    """
+    Generates in-memory thumbnails of several sizes for a given content with
+    preserved aspect ratio. The content is decoded only once, and each size is
+    downscaled from the previous, larger one. Animated thumbnails are limited to
+    `max_frames` frames and `max_duration` milliseconds. If a pool is provided,
+    thumbnails are generated there.
 
+    Raises:
+        File.ThumbnailUnavailable: If thumbnail can't be generated for the content.
+    """
+    return await _run(
+        pool, _thumbnail_many, content, sizes, output_type, max_frames, max_duration
+    )
 
-def _thumbnail(content: IO[bytes], size: int) -> tuple[bytes, MediaType]:
+
+async def _run[T](
+    pool: ProcessPool | None,
+    func: Callable[..., T],
+    content: IO[bytes],
+    *args: Any,
+) -> T:
+    """
+    Runs a function in the pool or in a thread, and adds up embedded preview
+    stats collected there.
+    """
+    if pool is not None:
+        result, stats = await pool.run(_with_preview_stats, content, func, *args)
+    else:
+        result, stats = await asyncio.to_thread(
+            _with_preview_stats, content, func, *args
+        )
+
+    lookups = preview_stats.total()
+    preview_stats.update(stats)
+    interval = _PREVIEW_STATS_LOG_INTERVAL
+    if lookups // interval != preview_stats.total() // interval:
+        logger.info(
+            "Embedded thumbnail previews: %s hits, %s misses",
+            preview_stats["hit"],
+            preview_stats["miss"],
+        )
+    return result
+
+
+def _with_preview_stats[T](
+    content: IO[bytes], func: Callable[..., T], *args: Any
+) -> tuple[T, Counter[str]]:
+    with collect_preview_stats() as stats:
+        return func(content, *args), stats
+
+
+def _thumbnail(
+    content: IO[bytes],
+    size: int,
+    output_type: MediaType,
+    max_frames: int,
+    max_duration: int,
+) -> tuple[bytes, MediaType]:
     mediatype = mediatypes.guess(content)
     if mediatype in _SUPPORTED_PDF:
-        return thumbnail_pdf(content, size=size, mediatype=mediatype)
+        return thumbnail_pdf(
+            content, size=size, mediatype=mediatype, output_type=output_type
+        )
 
     if mediatype == MediaType.IMAGE_SVG:
         return thumbnail_svg(content)
@@ -65,4 +175,36 @@ def _thumbnail(content: IO[bytes], size: int) -> tuple[bytes, MediaType]:
     # content should be strictly identified by magic numbers signature, so if no other
     # mediatype matched then assume it is an image. This is done that way because some
     # image formats are not supported by `filetype` lib.
-    return thumbnail_image(content, size=size)
+    return thumbnail_image(
+        content,
+        size=size,
+        output_type=output_type,
+        max_frames=max_frames,
+        max_duration=max_duration,
+    )
+
+
+def _thumbnail_many(
+    content: IO[bytes],
+    sizes: Iterable[int],
+    output_type: MediaType,
+    max_frames: int,
+    max_duration: int,
+) -> dict[int, tuple[bytes, MediaType]]:
+    mediatype = mediatypes.guess(content)
+    if mediatype in _SUPPORTED_PDF:
+        return thumbnail_pdf_many(
+            content, sizes=sizes, mediatype=mediatype, output_type=output_type
+        )
+
+    if mediatype == MediaType.IMAGE_SVG:
+        thumb = thumbnail_svg(content)
+        return dict.fromkeys(sizes, thumb)
+
+    return thumbnail_image_many(
+        content,
+        sizes=sizes,
+        output_type=output_type,
+        max_frames=max_frames,
+        max_duration=max_duration,
+    )
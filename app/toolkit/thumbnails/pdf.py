@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-from io import BytesIO
-from typing import IO
+from typing import IO, TYPE_CHECKING
 
 import fitz
 
 from app.toolkit.mediatypes import MediaType
 
+from .image import downscale_many, encode
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
 __all__ = [
     "thumbnail_pdf",
+    "thumbnail_pdf_many",
 ]
 
 _SUPPORTED_IMAGES = {
@@ -28,26 +33,10 @@ _SUPPORTED_PDF = {
 SUPPORTED_TYPES = _SUPPORTED_IMAGES | _SUPPORTED_PDF
 
 
-def _get_method(size: int) -> int:
-    """Returns preferred quality/speed trade-off based on desired size."""
-    if size >= 1920:
-        return 0
-    return 2
-
-
-def _get_quality(size: int) -> int:
-    """Returns preferred image quality for compression based on desired size."""
-    if size >= 1920:
-        return 65
-    return 80
-
-
-def thumbnail_pdf(
+def _render_first_page(
     content: IO[bytes], *, size: int, mediatype: str
-) -> tuple[bytes, MediaType]:
-    method, quality = _get_method(size), _get_quality(size)
+) -> fitz.Pixmap:
     content.seek(0)
-
     with fitz.open(stream=content.read(), filetype=mediatype) as doc:
         page = doc[0]
         original_size = max(page.mediabox.height, page.mediabox.width)
@@ -56,9 +45,32 @@ def thumbnail_pdf(
             matrix = fitz.Matrix(factor, factor)
         else:
             matrix = None
-        pixmap = page.get_pixmap(matrix=matrix)
+        return page.get_pixmap(matrix=matrix)
+
+
+def thumbnail_pdf(
+    content: IO[bytes],
+    *,
+    size: int,
+    mediatype: str,
+    output_type: MediaType = MediaType.IMAGE_WEBP,
+) -> tuple[bytes, MediaType]:
+    pixmap = _render_first_page(content, size=size, mediatype=mediatype)
+    return encode(pixmap.pil_image(), size, output_type), output_type
+
 
-    buffer = BytesIO()
-    pixmap.pil_save(buffer, "webp", method=method, quality=quality)
-    buffer.seek(0)
-    return buffer.read(), MediaType.IMAGE_WEBP
+def thumbnail_pdf_many(
+    content: IO[bytes],
+    *,
+    sizes: Iterable[int],
+    mediatype: str,
+    output_type: MediaType = MediaType.IMAGE_WEBP,
+) -> dict[int, tuple[bytes, MediaType]]:
+    """
+    Generates thumbnails of several sizes for the first page, rendering the page
+    only once in the largest size.
+    """
+    sizes = set(sizes)
+    pixmap = _render_first_page(content, size=max(sizes), mediatype=mediatype)
+    thumbs = downscale_many(pixmap.pil_image(), sizes, output_type)
+    return {size: (thumb, output_type) for size, thumb in thumbs.items()}
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import base64
+from io import BytesIO
+
+from PIL import Image, UnidentifiedImageError
+
+__all__ = [
+    "PLACEHOLDER_SIZE",
+    "placeholder",
+]
+
+PLACEHOLDER_SIZE = 16
+_QUALITY = 40
+
+
+def placeholder(thumbnail: bytes) -> str | None:
+    """
+    Makes a low-quality image placeholder from a small thumbnail. The placeholder
+    is a tiny WebP image, encoded as a data URI, so clients can put it right into
+    an <img> and stretch it with a blur until the real thumbnail is loaded.
+
+    Returns None if the thumbnail is not a raster image.
+    """
+    try:
+        with Image.open(BytesIO(thumbnail)) as im:
+            im.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            buffer = BytesIO()
+            im.save(buffer, "webp", quality=_QUALITY, method=6)
+    except (OSError, UnidentifiedImageError):
+        return None
+
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/webp;base64,{data}"
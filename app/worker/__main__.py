@@ -0,0 +1,88 @@
+"""
+Runs workers for the chosen lanes in a single process, for example:
+
+    python -m app.worker interactive bulk
+
+All lanes are served when none is specified, or only the default one, unless
+lanes are enabled with WORKER__LANES.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging.config
+import signal
+from typing import TYPE_CHECKING
+
+from arq.logs import default_log_config
+from arq.worker import create_worker
+
+from app.config import config
+from app.infrastructure.context import AppContext
+from app.infrastructure.worker.arq import Lane
+from app.worker.main import LANE_SETTINGS
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from arq.worker import Worker
+
+
+def parse_lanes(
+    argv: Sequence[str] | None = None, *, lanes_enabled: bool = True
+) -> list[Lane]:
+    parser = argparse.ArgumentParser(prog="python -m app.worker")
+    parser.add_argument(
+        "lanes",
+        nargs="*",
+        type=Lane,
+        choices=list(Lane),
+        help="lanes to serve, all by default",
+        metavar="{" + ",".join(Lane) + "}",
+    )
+    args = parser.parse_args(argv)
+    if args.lanes:
+        return list(dict.fromkeys(args.lanes))
+    return list(Lane) if lanes_enabled else [Lane.default]
+
+
+async def serve(lanes: Sequence[Lane]) -> None:
+    """Serves the lanes with workers sharing one application context."""
+    async with AppContext(config) as app_ctx:
+        workers: list[Worker] = [
+            create_worker(
+                LANE_SETTINGS[lane],
+                ctx={"usecases": app_ctx.usecases, "worker": app_ctx.worker},
+                on_startup=None,
+                on_shutdown=None,
+                handle_signals=False,
+            )
+            for lane in lanes
+        ]
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, _stop, workers, signum)
+
+        try:
+            with contextlib.suppress(asyncio.CancelledError):
+                await asyncio.gather(*(worker.async_run() for worker in workers))
+        finally:
+            await asyncio.gather(*(worker.close() for worker in workers))
+
+
+def _stop(workers: Sequence[Worker], signum: signal.Signals) -> None:
+    for worker in workers:
+        worker.handle_sig(signum)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    logging.config.dictConfig(default_log_config(verbose=False))
+    lanes = parse_lanes(argv, lanes_enabled=config.worker.lanes)
+    asyncio.run(serve(lanes))
+
+
+if __name__ == "__main__":
+    main()
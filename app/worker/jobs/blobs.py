@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import logging
+import resource
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -8,12 +10,56 @@ if TYPE_CHECKING:
 
     from ..main import ARQContext
 
+logger = logging.getLogger(__name__)
+
 
 async def process_blob_content(ctx: ARQContext, blob_id: UUID) -> None:
     blob_content_processor = ctx["usecases"].blob_content_processor
-    await blob_content_processor.process(blob_id)
+    fetched = await blob_content_processor.process(blob_id)
+    # ru_maxrss is in kilobytes on Linux
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    logger.info(
+        "Fetched %s bytes to process blob %s content, peak RSS %s KB",
+        fetched,
+        blob_id,
+        max_rss,
+    )
+
+
+async def process_blob_content_batch(
+    ctx: ARQContext, blob_ids: Sequence[UUID]
+) -> None:
+    blob_content_processor = ctx["usecases"].blob_content_processor
+    fetched = await blob_content_processor.process_batch(blob_ids)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    logger.info(
+        "Fetched %s bytes to process %s blobs content, peak RSS %s KB",
+        fetched,
+        len(blob_ids),
+        max_rss,
+    )
+
+
+async def process_missed_blob_content(ctx: ARQContext) -> None:
+    """Schedules processing of blobs whose ids were lost before being enqueued."""
+    try:
+        count = await ctx["usecases"].blob_content_processor.process_missed()
+    except Exception:
+        logger.exception("Unexpectedly failed to process missed blob content")
+        return
+    logger.info("Checked %s blobs without metadata", count)
 
 
 async def process_blob_jobs(ctx: ARQContext, ids: Sequence[UUID]) -> None:
     blob_service = ctx["usecases"].blob
     await blob_service.process_blob_jobs(ids)
+
+
+async def process_pending_blob_jobs(ctx: ARQContext) -> None:
+    """Applies blob jobs whose worker jobs were lost or have failed."""
+    try:
+        count = await ctx["usecases"].blob.process_pending_blob_jobs()
+    except Exception:
+        logger.exception("Unexpectedly failed to process pending blob jobs")
+        return
+    logger.info("Processed %s pending blob jobs", count)
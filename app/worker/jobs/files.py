@@ -13,6 +13,7 @@ if TYPE_CHECKING:
 
     from app.app.audit.domain import CurrentUserContext
     from app.app.files.domain import AnyPath
+    from app.app.files.usecases.namespace import BatchResultCallback
 
     from ..main import ARQContext
 
@@ -64,6 +65,37 @@ def exc_to_err_code(exc: Exception) -> ErrorCode:
     return ErrorCode.internal
 
 
+def _make_task_result(result: File | Exception) -> FileTaskResult:
+    if isinstance(result, Exception):
+        return FileTaskResult(err_code=exc_to_err_code(result))
+    return FileTaskResult(file=result)
+
+
+def _to_task_result(result: File | Exception, error_msg: str) -> FileTaskResult:
+    task_result = _make_task_result(result)
+    if task_result.err_code == ErrorCode.internal:
+        logger.error(error_msg, exc_info=result)
+    return task_result
+
+
+def _progress_publisher(ctx: ARQContext) -> BatchResultCallback:
+    """
+    Returns a callback publishing a result of each batch item as a pair of its
+    index and a task result, so clients can watch a job while it runs.
+    """
+    job_id = ctx["job_id"]
+
+    async def publish(index: int, result: File | Exception) -> None:
+        try:
+            await ctx["worker"].publish_progress(
+                job_id, (index, _make_task_result(result))
+            )
+        except Exception:
+            logger.exception("Failed to publish job progress")
+
+    return publish
+
+
 async def delete_immediately_batch(
     ctx: ARQContext,
     ns_path: AnyPath,
@@ -73,21 +105,13 @@ async def delete_immediately_batch(
     Permanently deletes a file at given paths. If some file is a folder, then it will be
     deleted with all of its contents.
     """
-
-    results = []
-    for path in paths:
-        file, err_code = None, None
-
-        try:
-            file = await ctx["usecases"].namespace.delete_item(ns_path, path)
-        except Exception as exc:
-            err_code = exc_to_err_code(exc)
-            if err_code == ErrorCode.internal:
-                logger.exception("Unexpectedly failed to delete a file")
-
-        result = FileTaskResult(file=file, err_code=err_code)
-        results.append(result)
-    return results
+    results = await ctx["usecases"].namespace.delete_item_batch(
+        ns_path, list(paths), on_result=_progress_publisher(ctx)
+    )
+    return [
+        _to_task_result(result, "Unexpectedly failed to delete a file")
+        for result in results
+    ]
 
 
 async def empty_trash(
@@ -112,23 +136,16 @@ async def move_batch(
     context: CurrentUserContext,
 ) -> list[FileTaskResult]:
     """Moves several files/folders to a different locations."""
-    results = []
-    move_item = ctx["usecases"].namespace.move_item
     with context:
-        for relocation in relocations:
-            path, next_path = relocation.from_path, relocation.to_path
-            file, err_code = None, None
-
-            try:
-                file = await move_item(ns_path, path, next_path)
-            except Exception as exc:
-                err_code = exc_to_err_code(exc)
-                if err_code == ErrorCode.internal:
-                    logger.exception("Unexpectedly failed to move a file")
-
-            result = FileTaskResult(file=file, err_code=err_code)
-            results.append(result)
-    return results
+        results = await ctx["usecases"].namespace.move_item_batch(
+            ns_path,
+            [(relocation.from_path, relocation.to_path) for relocation in relocations],
+            on_result=_progress_publisher(ctx),
+        )
+    return [
+        _to_task_result(result, "Unexpectedly failed to move a file")
+        for result in results
+    ]
 
 
 async def move_to_trash_batch(
@@ -139,19 +156,35 @@ async def move_to_trash_batch(
     context: CurrentUserContext,
 ) -> list[FileTaskResult]:
     """Moves several files to trash asynchronously."""
-    results = []
-    move_item_to_trash = ctx["usecases"].namespace.move_item_to_trash
     with context:
-        for path in paths:
-            file, err_code = None, None
-
-            try:
-                file = await move_item_to_trash(ns_path, path)
-            except Exception as exc:
-                err_code = exc_to_err_code(exc)
-                if err_code == ErrorCode.internal:
-                    logger.exception("Unexpectedly failed to move file to trash")
-
-            result = FileTaskResult(file=file, err_code=err_code)
-            results.append(result)
-    return results
+        results = await ctx["usecases"].namespace.move_item_to_trash_batch(
+            ns_path, list(paths), on_result=_progress_publisher(ctx)
+        )
+    return [
+        _to_task_result(result, "Unexpectedly failed to move file to trash")
+        for result in results
+    ]
+
+
+async def purge_deleted_files(ctx: ARQContext) -> None:
+    """Purges contents of deleted folders chunk by chunk."""
+    try:
+        await ctx["usecases"].namespace.purge_deleted_files()
+    except Exception:
+        logger.exception("Unexpectedly failed to purge deleted files")
+
+
+async def purge_expired_trash(ctx: ARQContext) -> None:
+    """Permanently deletes items that have been in the Trash past the retention."""
+    try:
+        await ctx["usecases"].namespace.purge_expired_trash()
+    except Exception:
+        logger.exception("Unexpectedly failed to purge expired trash")
+
+
+async def reconcile_space_usage(ctx: ARQContext) -> None:
+    """Recomputes cached space usage counters, so they don't drift from the database."""
+    try:
+        await ctx["usecases"].namespace.reconcile_space_usage()
+    except Exception:
+        logger.exception("Unexpectedly failed to reconcile space usage")
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..main import ARQContext
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_expired_media_items(ctx: ARQContext) -> None:
+    """Permanently deletes media items that have been deleted past the retention."""
+    try:
+        await ctx["usecases"].media_item.purge_expired()
+    except Exception:
+        logger.exception("Unexpectedly failed to purge expired media items")
@@ -1,19 +1,25 @@
 from __future__ import annotations
 
 from contextlib import AsyncExitStack
+from datetime import timedelta
 from typing import TYPE_CHECKING, TypedDict
 
+from arq import cron, func
 from arq.connections import RedisSettings
 
 from app.config import config
 from app.infrastructure.context import AppContext
-from app.worker.jobs import blobs, files
+from app.infrastructure.worker.arq import QUEUE_NAMES, Lane
+from app.worker.jobs import blobs, files, photos
 
 if TYPE_CHECKING:
+    from app.app.infrastructure.worker import IWorker
     from app.infrastructure.context import UseCases
 
     class ARQContext(TypedDict):
+        job_id: str
         usecases: UseCases
+        worker: IWorker
         _stack: AsyncExitStack
 
 
@@ -22,6 +28,7 @@ async def startup(ctx: ARQContext):
     ctx["_stack"] = AsyncExitStack()
     await ctx["_stack"].enter_async_context(app_ctx)
     ctx["usecases"] = app_ctx.usecases
+    ctx["worker"] = app_ctx.worker
 
 
 async def shutdown(ctx: ARQContext):
@@ -33,15 +40,69 @@ async def ping(ctx):
 
 
 class WorkerSettings:
+    """
+    Serves the default lane and runs cron jobs. Unless lanes are enabled with
+    WORKER__LANES, all jobs are enqueued to the default lane, so this worker
+    serves all of them.
+    """
+
     functions = [
         ping,
         blobs.process_blob_content,
+        blobs.process_blob_content_batch,
         blobs.process_blob_jobs,
+        blobs.process_missed_blob_content,
+        blobs.process_pending_blob_jobs,
         files.delete_immediately_batch,
         files.empty_trash,
         files.move_batch,
         files.move_to_trash_batch,
+        # the result is not kept, so the job can be enqueued again right after
+        func(files.purge_deleted_files, keep_result=0),
+        files.purge_expired_trash,
+        photos.purge_expired_media_items,
+    ]
+    cron_jobs = [
+        # picks up deleted files, if the job enqueued for them was lost
+        cron(files.purge_deleted_files, minute={15, 45}, run_at_startup=True),
+        cron(files.reconcile_space_usage, minute={0, 30}, run_at_startup=False),
+        # the look-back window spans two runs, so a missed run is covered
+        cron(blobs.process_missed_blob_content, minute={0, 30}, run_at_startup=False),
+        cron(blobs.process_pending_blob_jobs, minute={10, 40}, run_at_startup=True),
+        # each run purges a capped amount, so frequent runs keep the pace steady
+        cron(files.purge_expired_trash, minute={5, 20, 35, 50}, run_at_startup=False),
+        cron(
+            photos.purge_expired_media_items,
+            minute={10, 25, 40, 55},
+            run_at_startup=False,
+        ),
     ]
     on_startup = startup
     on_shutdown = shutdown
     redis_settings = RedisSettings.from_dsn(config.worker.broker_dsn)
+    queue_name = QUEUE_NAMES[Lane.default]
+
+
+class InteractiveWorkerSettings(WorkerSettings):
+    """Serves jobs a user is waiting for, such as moving files to the trash."""
+
+    queue_name = QUEUE_NAMES[Lane.interactive]
+    cron_jobs = []
+    max_jobs = 20
+    job_timeout = timedelta(minutes=10)
+
+
+class BulkWorkerSettings(WorkerSettings):
+    """Serves long-running background work, such as processing uploaded media."""
+
+    queue_name = QUEUE_NAMES[Lane.bulk]
+    cron_jobs = []
+    max_jobs = 4
+    job_timeout = timedelta(hours=1)
+
+
+LANE_SETTINGS: dict[Lane, type[WorkerSettings]] = {
+    Lane.interactive: InteractiveWorkerSettings,
+    Lane.default: WorkerSettings,
+    Lane.bulk: BulkWorkerSettings,
+}
@@ -25,16 +25,14 @@ from app.api.files.exceptions import (
     ThumbnailUnavailable,
     UploadFileTooLarge,
 )
-from app.api.files.schemas import MoveBatchRequest, ThumbnailSize
-from app.api.files.views import _make_thumbnail_ttl
+from app.api.files.schemas import MoveBatchRequest
 from app.app.blobs.domain import BlobMetadata
 from app.app.files.domain import (
     File,
     Path,
 )
-from app.app.infrastructure.worker import Job, JobStatus
+from app.app.infrastructure.worker import Job, JobProgress, JobStatus
 from app.app.users.domain import Account
-from app.cache import disk_cache
 from app.toolkit import timezone
 from app.toolkit.mediatypes import MediaType
 from app.toolkit.metadata import Exif
@@ -80,6 +78,78 @@ async def _aiter(content: bytes) -> AsyncIterator[bytes]:
     yield content
 
 
+class TestWatchAsyncTask:
+    @staticmethod
+    def url(job_id: str) -> str:
+        return f"/files/async_tasks/{job_id}/events"
+
+    @staticmethod
+    async def _progress(*items: JobProgress) -> AsyncIterator[JobProgress]:
+        for item in items:
+            yield item
+
+    async def test(
+        self, client: TestClient, namespace: Namespace, worker_mock: MagicMock
+    ):
+        # GIVEN
+        ns_path = str(namespace.path)
+        job_id = str(uuid.uuid4())
+        file = _make_file(ns_path, "f.txt")
+        missing = FileTaskResult(file=None, err_code=TaskErrorCode.file_not_found)
+        worker_mock.watch.return_value = self._progress(
+            JobProgress(id="1-0", item=(1, missing)),
+            JobProgress(id="2-0", item=(0, FileTaskResult(file=file))),
+        )
+        worker_mock.get_status.return_value = JobStatus.complete
+        worker_mock.get_result.return_value = [FileTaskResult(file=file), missing]
+        client.mock_namespace(namespace)
+
+        # WHEN
+        response = await client.get(self.url(job_id))
+
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = response.text.split("\n\n")
+        assert events[0].startswith("id: 1-0\nevent: progress\ndata: ")
+        assert '"index":1' in events[0]
+        assert '"err_code":"file_not_found"' in events[0]
+        assert events[1].startswith("id: 2-0\nevent: progress\ndata: ")
+        assert '"path":"f.txt"' in events[1]
+        assert events[2].startswith('event: completed\ndata: {"status":"completed"')
+        assert events[3] == ""
+        worker_mock.watch.assert_called_once_with(job_id, last_id=None, timeout=60)
+
+    async def test_when_job_is_pending(
+        self, client: TestClient, namespace: Namespace, worker_mock: MagicMock
+    ):
+        # GIVEN
+        job_id = str(uuid.uuid4())
+        worker_mock.watch.return_value = self._progress()
+        worker_mock.get_status.return_value = JobStatus.pending
+        client.mock_namespace(namespace)
+        headers = {"Last-Event-ID": "1-0"}
+        # WHEN
+        response = await client.get(self.url(job_id), headers=headers)
+        # THEN
+        assert response.status_code == 200
+        assert response.text == ""
+        worker_mock.watch.assert_called_once_with(job_id, last_id="1-0", timeout=60)
+        worker_mock.get_result.assert_not_awaited()
+
+    async def test_when_last_event_id_is_malformed(
+        self, client: TestClient, namespace: Namespace, worker_mock: MagicMock
+    ):
+        # GIVEN
+        client.mock_namespace(namespace)
+        headers = {"Last-Event-ID": "$"}
+        # WHEN
+        response = await client.get(self.url("job-id"), headers=headers)
+        # THEN
+        assert response.status_code == 422
+        worker_mock.watch.assert_not_called()
+
+
 class TestCreateFolder:
     @pytest.mark.parametrize(["path", "expected_path"], [
         ("Folder", "Folder"),
@@ -653,51 +723,31 @@ class TestGetThumbnail:
         assert headers["Content-Length"] == '1651'
         assert headers["Content-Type"] == "image/webp"
         assert headers["Cache-Control"] == "private, max-age=31536000, no-transform"
+        assert headers["Vary"] == "Accept"
         ns_use_case.get_file_thumbnail.assert_awaited_once_with(
-            namespace.path, file.id, size=72
+            namespace.path, file.id, size=72, output_type=MediaType.IMAGE_WEBP
         )
 
-    async def test_cache_hits(
+    async def test_format_is_negotiated(
         self,
         client: TestClient,
         ns_use_case: MagicMock,
         namespace: Namespace,
-        image_content: IBlobContent,
     ):
         # GIVEN
-        ns_path, path = namespace.path, "im.jpeg"
-        file = _make_file(ns_path, path)
-        thumbnail, mediatype = image_content.file.read(), MediaType.IMAGE_WEBP
+        file = _make_file(namespace.path, "im.jpeg")
+        thumbnail, mediatype = b"thumbnail", MediaType.IMAGE_AVIF
         ns_use_case.get_file_thumbnail.return_value = file, thumbnail, mediatype
-
+        headers = {"Accept": "image/avif,image/webp,*/*;q=0.8"}
+        # WHEN
         client.mock_namespace(namespace)
-        with disk_cache.detect as detector:
-            # WHEN hits for the first time
-            response_1 = await client.get(self.url(file.id))
-            # THEN cache miss
-            assert response_1.status_code == 200
-            assert detector.calls == {}
-            # WHEN hits for the second time
-            response_2 = await client.get(self.url(file.id))
-            # THEN cache hit
-            assert len(detector.calls_list) == 1
-            cache_key, cache_values = detector.calls_list[0]
-            assert cache_key == f"{file.id}:xs"
-            assert cache_values["ttl"] == 604800
-            assert cache_values["name"] == "simple"
-            assert cache_values["template"] == "{file_id}:{size}"
-            assert cache_values["value"].body == response_1.content
-
-            assert response_1.status_code == response_2.status_code
-            assert response_1.content == response_2.content
-            ns_use_case.get_file_thumbnail.assert_awaited_once()
-
-    @pytest.mark.parametrize(["size", "ttl"], [
-        (ThumbnailSize.xs, "7d"),
-        (ThumbnailSize.lg, "24h")],
-    )
-    async def test_ttl_depends_on_size(self, size: ThumbnailSize, ttl: str):
-        assert _make_thumbnail_ttl(size=size) == ttl
+        response = await client.get(self.url(file.id), headers=headers)
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == "image/avif"
+        ns_use_case.get_file_thumbnail.assert_awaited_once_with(
+            namespace.path, file.id, size=72, output_type=MediaType.IMAGE_AVIF
+        )
 
     async def test_when_path_has_non_latin_characters(
         self,
@@ -720,7 +770,7 @@ class TestGetThumbnail:
         assert response.status_code == 200
         assert headers["Content-Disposition"] == 'inline; filename="изо.jpeg"'
         ns_use_case.get_file_thumbnail.assert_awaited_once_with(
-            namespace.path, file.id, size=72
+            namespace.path, file.id, size=72, output_type=MediaType.IMAGE_WEBP
         )
 
     @pytest.mark.parametrize(["error", "expected_error"], [
@@ -748,6 +798,43 @@ class TestGetThumbnail:
         assert response.status_code == expected_error.status_code
 
 
+class TestGetThumbnailBatch:
+    url = "/files/get_thumbnail_batch"
+
+    async def test(
+        self,
+        client: TestClient,
+        ns_use_case: MagicMock,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        file_id = uuid.uuid7()
+
+        async def thumbnails():
+            yield file_id, b"thumbnail", MediaType.IMAGE_WEBP
+
+        ns_use_case.get_file_thumbnail_batch.return_value = thumbnails()
+        payload = {"ids": [str(file_id)], "size": "xs"}
+        client.mock_namespace(namespace)
+        # WHEN
+        response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("multipart/mixed;")
+        assert f"Content-ID: {file_id}".encode() in response.content
+        ns_use_case.get_file_thumbnail_batch.assert_awaited_once_with(
+            namespace.path, [file_id], size=72, output_type=MediaType.IMAGE_WEBP
+        )
+
+    async def test_when_too_many_ids(
+        self, client: TestClient, namespace: Namespace
+    ):
+        payload = {"ids": [str(uuid.uuid7()) for _ in range(201)], "size": "xs"}
+        client.mock_namespace(namespace)
+        response = await client.post(self.url, json=payload)
+        assert response.status_code == 422
+
+
 class TestListFolder:
     url = "/files/list_folder"
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import uuid
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING
 
 import pytest
 
@@ -11,12 +11,10 @@ from app.api.photos.exceptions import (
     MediaItemNotFound,
     ThumbnailUnavailable,
 )
-from app.api.photos.media_items.views import _make_thumbnail_ttl
 from app.app.blobs.domain import Blob, BlobMetadata
 from app.app.photos.domain import MediaItem
 from app.app.photos.repositories.media_item import CountResult
 from app.app.photos.services.media_item import DownloadMediaItem, DownloadSessionInfo
-from app.cache import disk_cache
 from app.toolkit import timezone
 from app.toolkit.mediatypes import MediaType
 from app.toolkit.metadata import Exif
@@ -464,49 +462,11 @@ class TestGetThumbnail:
         assert response.headers["Cache-Control"] == (
             "private, max-age=31536000, no-transform"
         )
-        media_item_use_case.thumbnail.assert_awaited_once_with(user.id, item.id, 72)
-
-    async def test_cache_hits(
-        self, client: TestClient, media_item_use_case: MagicMock, user: User,
-    ):
-        # GIVEN
-        item = _make_media_item("photo.jpg", media_type="image/jpeg")
-        thumbnail = b"thumbnail"
-        media_item_use_case.thumbnail.return_value = (
-            item,
-            thumbnail,
-            MediaType.IMAGE_WEBP,
+        assert response.headers["Vary"] == "Accept"
+        media_item_use_case.thumbnail.assert_awaited_once_with(
+            user.id, item.id, 72, MediaType.IMAGE_WEBP
         )
 
-        client.mock_user(user)
-        with disk_cache.detect as detector:
-            # WHEN hits for the first time
-            response_1 = await client.get(self.url(item.id))
-            # THEN cache miss
-            assert response_1.status_code == 200
-            assert detector.calls == {}
-            # WHEN hits for the second time
-            response_2 = await client.get(self.url(item.id))
-            # THEN cache hit
-            assert len(detector.calls_list) == 1
-            cache_key, cache_values = detector.calls_list[0]
-            assert cache_key == f"{item.id}:xs"
-            assert cache_values["ttl"] == 604800
-            assert cache_values["name"] == "simple"
-            assert cache_values["template"] == "{media_item_id}:{size}"
-            assert cache_values["value"].body == response_1.content
-
-            assert response_1.status_code == response_2.status_code
-            assert response_1.content == response_2.content
-            media_item_use_case.thumbnail.assert_awaited_once()
-
-    @pytest.mark.parametrize(["size", "ttl"], [
-        ("xs", "7d"),
-        ("lg", "24h"),
-    ])
-    async def test_ttl_depends_on_size(self, size: str, ttl: str):
-        assert _make_thumbnail_ttl(size=cast(Any, size)) == ttl
-
     async def test_when_media_item_not_found(
         self,
         client: TestClient,
@@ -540,6 +500,32 @@ class TestGetThumbnail:
         assert response.json() == ThumbnailUnavailable().as_dict()
 
 
+class TestGetThumbnailBatch:
+    url = "/photos/media_items/get_thumbnail_batch"
+
+    async def test(
+        self, client: TestClient, media_item_use_case: MagicMock, user: User,
+    ):
+        # GIVEN
+        item_id = uuid.uuid7()
+
+        async def thumbnails():
+            yield item_id, b"thumbnail", MediaType.IMAGE_WEBP
+
+        media_item_use_case.thumbnail_batch.return_value = thumbnails()
+        payload = {"ids": [str(item_id)], "size": "xs"}
+        client.mock_user(user)
+        # WHEN
+        response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("multipart/mixed;")
+        assert f"Content-ID: {item_id}".encode() in response.content
+        media_item_use_case.thumbnail_batch.assert_awaited_once_with(
+            user.id, [item_id], 72, MediaType.IMAGE_WEBP
+        )
+
+
 class TestList:
     url = "/photos/media_items/list"
 
@@ -245,6 +245,25 @@ class TestGetSharedLinkThumbnail:
         assert int(headers["Content-Length"]) == 7
         assert headers["Content-Type"] == "image/webp"
         assert headers["Cache-Control"] == "private, max-age=31536000, no-transform"
+        assert headers["Vary"] == "Accept"
+
+    async def test_filename_follows_format(
+        self, client: TestClient, sharing_use_case: MagicMock
+    ):
+        # GIVEN
+        file = _make_file("admin", "im.jpeg")
+        thumbnail, mediatype = b"content", MediaType.IMAGE_AVIF
+        sharing_use_case.get_link_thumbnail.return_value = file, thumbnail, mediatype
+        headers = {"Accept": "image/avif"}
+        # WHEN
+        response = await client.get(self.url(token="link-token"), headers=headers)
+        # THEN
+        assert response.headers["Content-Disposition"] == (
+            'inline; filename="thumbnail-xs.avif"'
+        )
+        sharing_use_case.get_link_thumbnail.assert_awaited_once_with(
+            "link-token", size=72, output_type=MediaType.IMAGE_AVIF
+        )
 
     async def test_when_link_not_found(
         self, client: TestClient, sharing_use_case: MagicMock
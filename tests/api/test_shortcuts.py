@@ -8,8 +8,12 @@ import pytest
 from app.api import shortcuts
 from app.app.files.domain import File, Path
 from app.cache import cache
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from uuid import UUID
+
     from app.app.files.domain import AnyPath
 
 pytestmark = [pytest.mark.anyio, pytest.mark.database]
@@ -56,3 +60,44 @@ class TestPopDownloadCache:
     async def test_cache_miss(self):
         value = await shortcuts.pop_download_cache("key-not-exists")
         assert value is None
+
+
+class TestNegotiateThumbnailType:
+    @pytest.mark.parametrize(["accept", "expected"], [
+        (None, MediaType.IMAGE_WEBP),
+        ("*/*", MediaType.IMAGE_WEBP),
+        ("image/avif,image/webp,*/*;q=0.8", MediaType.IMAGE_AVIF),
+        ("image/webp,image/png,image/*;q=0.8", MediaType.IMAGE_WEBP),
+        ("image/avif;q=0, image/webp", MediaType.IMAGE_WEBP),
+        ("image/png,image/*;q=0.8", MediaType.IMAGE_WEBP),
+        ("image/webp;q=0,image/*", MediaType.IMAGE_JPEG),
+        ("image/jpeg", MediaType.IMAGE_JPEG),
+        ("image/avif;q=bad", MediaType.IMAGE_JPEG),
+    ])
+    async def test(self, accept: str | None, expected: MediaType):
+        assert shortcuts.negotiate_thumbnail_type(accept) == expected
+
+
+class TestMakeThumbnailBatchResponse:
+    async def test(self):
+        # GIVEN
+        ids = [uuid.uuid7(), uuid.uuid7()]
+
+        async def thumbnails() -> AsyncIterator[tuple[UUID, bytes, MediaType]]:
+            for item_id in ids:
+                yield item_id, b"thumbnail", MediaType.IMAGE_WEBP
+
+        # WHEN
+        response = shortcuts.make_thumbnail_batch_response(thumbnails())
+        # THEN
+        boundary = response.media_type.split("boundary=")[1]
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        parts = body.split(f"--{boundary}".encode())
+        assert parts[0] == b""
+        assert parts[-1] == b"--\r\n"
+        for item_id, part in zip(ids, parts[1:-1], strict=True):
+            headers, content = part.split(b"\r\n\r\n")
+            assert f"Content-ID: {item_id}".encode() in headers
+            assert b"Content-Type: image/webp" in headers
+            assert b"Content-Length: 9" in headers
+            assert content == b"thumbnail\r\n"
@@ -14,6 +14,7 @@ from app.app.blobs.services import (
 )
 from app.app.infrastructure.storage import IStorage
 from app.app.infrastructure.worker import IWorker
+from app.toolkit.processpool import ProcessPool
 
 if TYPE_CHECKING:
     from typing import Protocol
@@ -52,7 +53,7 @@ def blob_metadata_service() -> BlobMetadataService:
     database = mock.MagicMock(
         blob_metadata=mock.AsyncMock(IBlobMetadataRepository),
     )
-    return BlobMetadataService(database=database)
+    return BlobMetadataService(database=database, pool=ProcessPool(max_workers=0))
 
 
 @pytest.fixture
@@ -64,6 +65,8 @@ def thumbnailer() -> BlobThumbnailService:
         blob_service=blob_service,
         storage=storage,
         max_file_size=10 * 1024 * 1024,
+        pool=ProcessPool(max_workers=0),
+        memory_cache_max_size=1024 * 1024,
     )
 
 
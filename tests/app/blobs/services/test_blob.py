@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import uuid
+from datetime import timedelta
 from typing import TYPE_CHECKING, cast
 from unittest import mock
 
@@ -13,8 +14,11 @@ from app.app.blobs.domain.blob_job import (
     BlobJobMovePayload,
     BlobJobMovePrefixPayload,
 )
+from app.app.blobs.services import blob as blob_module
+from app.app.files.domain import File
 from app.app.infrastructure.database import SENTINEL_ID
 from app.app.infrastructure.storage import DownloadBatchItem
+from app.toolkit import taskgroups, timezone
 
 if TYPE_CHECKING:
     from app.app.blobs.domain import IBlobContent
@@ -51,6 +55,8 @@ class TestDeleteAllWithPrefix:
         # WHEN
         await blob_service.delete_all_with_prefix(prefix)
 
+        await taskgroups.wait_background_tasks()
+
         # THEN
         worker.enqueue.assert_awaited_once_with("process_blob_jobs", ids=mock.ANY)
         job_ids = worker.enqueue.await_args.kwargs["ids"]
@@ -60,6 +66,27 @@ class TestDeleteAllWithPrefix:
         assert jobs[0].payload.storage_key_prefix == prefix
 
 
+class TestDeleteAndMove:
+    async def test_jobs_are_enqueued_together(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content_factory: ContentFactory,
+    ):
+        # GIVEN
+        blob_a = await blob_factory("blobs/a.txt", content_factory())
+        blob_b = await blob_factory("blobs/b.txt", content_factory())
+        worker = cast(mock.AsyncMock, blob_service.worker)
+        # WHEN
+        await blob_service.delete_batch([blob_a.id])
+        await blob_service.move(blob_b.id, "blobs/c.txt")
+        await blob_service.delete_all_with_prefix("admin/folder/")
+        await taskgroups.wait_background_tasks()
+        # THEN
+        worker.enqueue.assert_awaited_once_with("process_blob_jobs", ids=mock.ANY)
+        assert len(worker.enqueue.await_args.kwargs["ids"]) == 3
+
+
 class TestDeleteBatch:
     async def test(
         self,
@@ -75,6 +102,8 @@ class TestDeleteBatch:
         # WHEN
         await blob_service.delete_batch([blob_a.id, blob_b.id])
 
+        await taskgroups.wait_background_tasks()
+
         # THEN
         worker.enqueue.assert_awaited_once_with("process_blob_jobs", ids=mock.ANY)
         job_ids = worker.enqueue.await_args.kwargs["ids"]
@@ -185,6 +214,24 @@ class TestGetByIdBatch:
         assert sorted(result, key=lambda b: b.storage_key) == [blob_a, blob_b]
 
 
+class TestListIdsWithoutMetadata:
+    async def test(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        created_after = timezone.now()
+        blob = await blob_factory("blobs/a.txt", content)
+        # WHEN
+        result = await blob_service.list_ids_without_metadata(
+            created_after, timezone.now(), [blob.media_type]
+        )
+        # THEN
+        assert result == [blob.id]
+
+
 class TestMove:
     async def test(
         self,
@@ -198,6 +245,8 @@ class TestMove:
         worker = cast(mock.AsyncMock, blob_service.worker)
         # WHEN
         await blob_service.move(blob.id, to_storage_key)
+        await taskgroups.wait_background_tasks()
+
         # THEN
         worker.enqueue.assert_awaited_once_with("process_blob_jobs", ids=mock.ANY)
         job_ids = worker.enqueue.await_args.kwargs["ids"]
@@ -245,6 +294,8 @@ class TestMoveWithPrefix:
         worker = cast(mock.AsyncMock, blob_service.worker)
         # WHEN
         await blob_service.move_with_prefix(prefix, to_prefix)
+        await taskgroups.wait_background_tasks()
+
         # THEN
         worker.enqueue.assert_awaited_once_with("process_blob_jobs", ids=mock.ANY)
         job_ids = worker.enqueue.await_args.kwargs["ids"]
@@ -292,6 +343,29 @@ class TestProcessBlobJobs:
         assert await blob_service.db.blob.get_by_id_batch([blob_a.id, blob_b.id]) == []
         assert await blob_service.db.blob_job.get_by_id_batch(job_ids) == []
 
+    async def test_delete_job_after_blob_has_moved(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content_factory: ContentFactory,
+    ):
+        # GIVEN a blob is deleted while its move is still pending
+        blob = await blob_factory("admin/folder/a.txt", content_factory())
+        await blob_service.move_with_prefix("admin/folder/", "admin/other/")
+        await blob_service.delete_batch([blob.id])
+        job_ids = await blob_service.db.blob_job.list_ids(
+            created_before=timezone.now()
+        )
+
+        # WHEN
+        await blob_service.process_blob_jobs(job_ids)
+
+        # THEN
+        assert not await blob_service.storage.exists("admin/folder/a.txt")
+        assert not await blob_service.storage.exists("admin/other/a.txt")
+        assert await blob_service.db.blob.get_by_id_batch([blob.id]) == []
+        assert await blob_service.db.blob_job.get_by_id_batch(job_ids) == []
+
     async def test_delete_prefix_job(
         self,
         blob_service: BlobService,
@@ -377,9 +451,207 @@ class TestProcessBlobJobs:
         assert updated_blob.storage_key == "admin/z/f.txt"
         assert await blob_service.db.blob_job.get_by_id_batch(job_ids) == []
 
+    async def test_move_jobs_of_the_same_blob_are_applied_in_order(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = await blob_factory("admin/f.txt", content)
+        jobs = await blob_service.db.blob_job.save_batch([
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobMovePayload(
+                    blob_id=blob.id, at_storage_key=at, to_storage_key=to,
+                ),
+            )
+            for at, to in [
+                ("admin/f.txt", "admin/g.txt"),
+                ("admin/g.txt", "admin/h.txt"),
+            ]
+        ])
+        job_ids = [j.id for j in jobs]
+
+        # WHEN
+        await blob_service.process_blob_jobs(job_ids)
+
+        # THEN
+        assert await blob_service.storage.exists("admin/h.txt")
+        updated_blob = await blob_service.db.blob.get_by_id(blob.id)
+        assert updated_blob.storage_key == "admin/h.txt"
+        assert await blob_service.db.blob_job.get_by_id_batch(job_ids) == []
+
+    async def test_failed_move_job_is_kept(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content_factory: ContentFactory,
+    ):
+        # GIVEN
+        blob_a = await blob_factory("admin/a.txt", content_factory())
+        blob_b = await blob_factory("admin/b.txt", content_factory())
+        jobs = await blob_service.db.blob_job.save_batch([
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobMovePayload(
+                    blob_id=blob_a.id,
+                    at_storage_key="admin/missing.txt",
+                    to_storage_key="admin/c.txt",
+                ),
+            ),
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobMovePayload(
+                    blob_id=blob_b.id,
+                    at_storage_key=blob_b.storage_key,
+                    to_storage_key="admin/d.txt",
+                ),
+            ),
+        ])
+        job_ids = [j.id for j in jobs]
+
+        # WHEN
+        with pytest.raises(File.NotFound):
+            await blob_service.process_blob_jobs(job_ids)
+
+        # THEN
+        assert (await blob_service.db.blob.get_by_id(blob_a.id)) == blob_a
+        updated_blob = await blob_service.db.blob.get_by_id(blob_b.id)
+        assert updated_blob.storage_key == "admin/d.txt"
+        remaining = await blob_service.db.blob_job.get_by_id_batch(job_ids)
+        assert [job.id for job in remaining] == [jobs[0].id]
+
+    async def test_jobs_of_different_types_are_applied_in_order(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = await blob_factory("admin/a/f.txt", content)
+        jobs = await blob_service.db.blob_job.save_batch([
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobMovePrefixPayload(
+                    at_storage_key_prefix="admin/a/",
+                    to_storage_key_prefix="admin/z/",
+                ),
+            ),
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobMovePayload(
+                    blob_id=blob.id,
+                    at_storage_key="admin/z/f.txt",
+                    to_storage_key="admin/g.txt",
+                ),
+            ),
+        ])
+        job_ids = [j.id for j in jobs]
+
+        # WHEN
+        await blob_service.process_blob_jobs(job_ids)
+
+        # THEN
+        assert await blob_service.storage.exists("admin/g.txt")
+        updated_blob = await blob_service.db.blob.get_by_id(blob.id)
+        assert updated_blob.storage_key == "admin/g.txt"
+        assert await blob_service.db.blob_job.get_by_id_batch(job_ids) == []
+
+    async def test_failed_delete_jobs_are_kept(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content_factory: ContentFactory,
+    ):
+        # GIVEN
+        blob_a = await blob_factory("admin/a.txt", content_factory())
+        blob_b = await blob_factory("admin/b.txt", content_factory())
+        jobs = await blob_service.db.blob_job.save_batch([
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobDeletePayload(
+                    blob_id=blob_a.id,
+                    storage_key=blob_a.storage_key,
+                ),
+            ),
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobMovePayload(
+                    blob_id=blob_b.id,
+                    at_storage_key=blob_b.storage_key,
+                    to_storage_key="admin/c.txt",
+                ),
+            ),
+        ])
+        job_ids = [j.id for j in jobs]
+        storage = blob_service.storage
+        delete_batch = mock.patch.object(
+            type(storage), "delete_batch", side_effect=OSError
+        )
+
+        # WHEN
+        with delete_batch, pytest.raises(OSError):
+            await blob_service.process_blob_jobs(job_ids)
+
+        # THEN
+        assert (await blob_service.db.blob.get_by_id(blob_a.id)) == blob_a
+        updated_blob = await blob_service.db.blob.get_by_id(blob_b.id)
+        assert updated_blob.storage_key == "admin/c.txt"
+        remaining = await blob_service.db.blob_job.get_by_id_batch(job_ids)
+        assert [job.id for job in remaining] == [jobs[0].id]
+
     async def test_when_no_jobs_found(self, blob_service: BlobService):
         # GIVEN
         ids = [uuid.uuid7()]
         # WHEN
         await blob_service.process_blob_jobs(ids)
         # THEN - no exception raised
+
+
+class TestProcessPendingBlobJobs:
+    async def test(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = await blob_factory("blobs/a.txt", content)
+        jobs = await blob_service.db.blob_job.save_batch([
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobDeletePayload(
+                    blob_id=blob.id, storage_key=blob.storage_key
+                ),
+            ),
+        ])
+        # WHEN
+        with mock.patch.object(blob_module, "_PENDING_JOB_DELAY", timedelta(0)):
+            result = await blob_service.process_pending_blob_jobs()
+        # THEN
+        assert result == 1
+        assert not await blob_service.storage.exists(blob.storage_key)
+        assert await blob_service.db.blob_job.get_by_id_batch([jobs[0].id]) == []
+
+    async def test_recent_jobs_are_skipped(
+        self,
+        blob_service: BlobService,
+        blob_factory: BlobFactory,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = await blob_factory("blobs/a.txt", content)
+        await blob_service.db.blob_job.save_batch([
+            BlobJob(
+                id=SENTINEL_ID,
+                payload=BlobJobDeletePayload(
+                    blob_id=blob.id, storage_key=blob.storage_key
+                ),
+            ),
+        ])
+        # WHEN
+        result = await blob_service.process_pending_blob_jobs()
+        # THEN
+        assert result == 0
+        assert await blob_service.storage.exists(blob.storage_key)
@@ -1,44 +1,61 @@
 from __future__ import annotations
 
 import uuid
-from typing import IO, TYPE_CHECKING, cast
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, cast
 from unittest import mock
 
 import pytest
 
-from app.app.blobs.domain import Blob
-from app.toolkit import timezone
+from app.app.blobs.domain import Blob, BlobMetadata
+from app.cache import cache
+from app.config import ThumbnailSize
+from app.toolkit import taskgroups, thumbnails, timezone
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncIterator
-
     from app.app.blobs.domain import IBlobContent
     from app.app.blobs.services.content_processor import BlobContentProcessor
 
 pytestmark = [pytest.mark.anyio]
 
 
-async def _aiter(content: IO[bytes]) -> AsyncIterator[bytes]:
-    for chunk in content:
-        yield chunk
+@pytest.fixture(autouse=True)
+async def clear_cache() -> None:
+    await cache.clear()
 
 
-def _make_blob() -> Blob:
+def _make_blob(size: int = 10, media_type: str = "image/jpeg") -> Blob:
     return Blob(
         id=uuid.uuid7(),
         storage_key=f"{uuid.uuid4().hex}/{uuid.uuid4().hex}",
         chash=uuid.uuid4().hex,
-        size=10,
-        media_type="image/jpeg",
+        size=size,
+        media_type=media_type,
         created_at=timezone.now(),
     )
 
 
+@pytest.fixture
+def content_processor(
+    content_processor: BlobContentProcessor,
+) -> BlobContentProcessor:
+    thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+    thumbnail_service.is_supported.return_value = True
+    thumbnail_service.max_file_size = 1024
+    thumbnail_service.generate.return_value = {}
+    metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+    metadata_service.is_supported.return_value = True
+    metadata_service.get_header_size.return_value = 256
+    metadata_service.get_by_chash.side_effect = BlobMetadata.NotFound
+    return content_processor
+
+
 class TestProcess:
     async def test(
         self,
         content_processor: BlobContentProcessor,
-        content: IBlobContent
+        content: IBlobContent,
+        image_content: IBlobContent,
     ):
         # GIVEN
         blob = _make_blob()
@@ -47,26 +64,316 @@ class TestProcess:
         thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
 
         blob_service.get_by_id.return_value = blob
-        blob_service.download.return_value = _aiter(content.file)
+        blob_service.open_local.return_value = nullcontext(content.file)
+        thumb, _ = await thumbnails.thumbnail(image_content.file, size=72)
+        thumbnail_service.generate.return_value = {ThumbnailSize.xs: thumb}
 
         # WHEN
-        await content_processor.process(blob.id)
+        result = await content_processor.process(blob.id)
 
         # THEN
+        assert result == content.size
         blob_service.get_by_id.assert_awaited_once_with(blob.id)
-        blob_service.download.assert_called_once_with(blob.storage_key)
+        blob_service.open_local.assert_called_once_with(
+            blob.storage_key, length=None, in_memory=True
+        )
         thumbnail_service.generate.assert_awaited_once()
-        metadata_service.track.assert_awaited_once()
+        thumbnail_service.placeholder.assert_not_called()
+        metadata_service.extract.assert_awaited_once_with(
+            blob.id,
+            mock.ANY,
+            placeholder=thumbnails.placeholder(thumb),
+        )
+        metadata_service.track_batch.assert_awaited_once_with(
+            [metadata_service.extract.return_value]
+        )
+
+    async def test_when_smallest_thumbnail_exists(
+        self,
+        content_processor: BlobContentProcessor,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob()
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id.return_value = blob
+        blob_service.open_local.return_value = nullcontext(content.file)
+        # WHEN
+        await content_processor.process(blob.id)
+        # THEN
+        thumbnail_service.placeholder.assert_awaited_once_with(blob.id, blob.chash)
+        metadata_service.extract.assert_awaited_once_with(
+            blob.id,
+            mock.ANY,
+            placeholder=thumbnail_service.placeholder.return_value,
+        )
+
+    async def test_when_content_is_not_supported(
+        self, content_processor: BlobContentProcessor
+    ):
+        # GIVEN
+        blob = _make_blob(media_type="application/zip")
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id.return_value = blob
+        thumbnail_service.is_supported.return_value = False
+        metadata_service.is_supported.return_value = False
+        # WHEN
+        result = await content_processor.process(blob.id)
+        # THEN
+        assert result == 0
+        blob_service.open_local.assert_not_called()
+        thumbnail_service.generate.assert_not_called()
+        metadata_service.extract.assert_not_called()
+        metadata_service.track_batch.assert_not_called()
+
+    async def test_when_only_metadata_is_needed(
+        self,
+        content_processor: BlobContentProcessor,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob(size=2048)
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id.return_value = blob
+        # a file read in place is larger than the header
+        content.file.write(b"x" * 1024)
+        blob_service.open_local.return_value = nullcontext(content.file)
+        # WHEN
+        result = await content_processor.process(blob.id)
+        # THEN
+        assert result == 256
+        blob_service.open_local.assert_called_once_with(
+            blob.storage_key, length=256, in_memory=True
+        )
+        thumbnail_service.generate.assert_not_called()
+        thumbnail_service.placeholder.assert_not_called()
+        metadata_service.extract.assert_awaited_once_with(
+            blob.id, mock.ANY, placeholder=None
+        )
+
+    async def test_large_content_is_spilled_to_disk(
+        self,
+        content_processor: BlobContentProcessor,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob(size=512)
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        blob_service.get_by_id.return_value = blob
+        blob_service.open_local.return_value = nullcontext(content.file)
+        target = "app.app.blobs.services.content_processor.config.process_pool"
+        # WHEN
+        with mock.patch(f"{target}.in_memory_content_max_size", 256):
+            await content_processor.process(blob.id)
+        # THEN
+        blob_service.open_local.assert_called_once_with(
+            blob.storage_key, length=None, in_memory=False
+        )
+
+    async def test_when_content_has_been_processed(
+        self, content_processor: BlobContentProcessor
+    ):
+        # GIVEN
+        blob = _make_blob()
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id.return_value = blob
+        metadata_service.get_by_chash.side_effect = None
+        metadata_service.get_by_chash.return_value = BlobMetadata(
+            blob_id=uuid.uuid7(), data=None, placeholder="data:image/webp;base64,"
+        )
+        thumbnail_service.exists.return_value = True
+        # WHEN
+        result = await content_processor.process(blob.id)
+        # THEN
+        assert result == 0
+        metadata_service.get_by_chash.assert_awaited_once_with(
+            blob.chash, blob.media_type
+        )
+        blob_service.open_local.assert_not_called()
+        metadata_service.extract.assert_not_called()
+        metadata_service.track_batch.assert_awaited_once_with([
+            BlobMetadata(
+                blob_id=blob.id, data=None, placeholder="data:image/webp;base64,"
+            )
+        ])
+
+    async def test_when_processed_content_misses_thumbnails(
+        self,
+        content_processor: BlobContentProcessor,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob()
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id.return_value = blob
+        blob_service.open_local.return_value = nullcontext(content.file)
+        metadata_service.get_by_chash.side_effect = None
+        thumbnail_service.exists.return_value = False
+        # WHEN
+        result = await content_processor.process(blob.id)
+        # THEN
+        assert result == content.size
+        thumbnail_service.generate.assert_awaited_once()
+        metadata_service.extract.assert_awaited_once()
+
+
+class TestProcessBatch:
+    async def test(
+        self,
+        content_processor: BlobContentProcessor,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blobs = [_make_blob(), _make_blob()]
+        blob_ids = [blob.id for blob in blobs]
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id_batch.return_value = blobs
+        blob_service.open_local.side_effect = lambda *a, **kw: nullcontext(
+            content.file
+        )
+        metadata_service.extract.side_effect = [mock.sentinel.meta_1, None]
+        # WHEN
+        result = await content_processor.process_batch(blob_ids)
+        # THEN
+        assert result == content.size * 2
+        blob_service.get_by_id_batch.assert_awaited_once_with(blob_ids)
+        assert thumbnail_service.generate.await_count == 2
+        metadata_service.track_batch.assert_awaited_once()
+        saved = metadata_service.track_batch.await_args.args[0]
+        assert list(saved) == [mock.sentinel.meta_1]
+
+    async def test_failure_does_not_affect_other_blobs(
+        self,
+        content_processor: BlobContentProcessor,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        blobs = [_make_blob(), _make_blob()]
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        thumbnail_service = cast(mock.MagicMock, content_processor.thumbnail_service)
+        blob_service.get_by_id_batch.return_value = blobs
+        blob_service.open_local.side_effect = lambda *a, **kw: nullcontext(
+            content.file
+        )
+        thumbnail_service.generate.side_effect = [Exception, {}]
+        # WHEN
+        result = await content_processor.process_batch([b.id for b in blobs])
+        # THEN
+        assert result == content.size
+        metadata_service.extract.assert_awaited_once_with(
+            blobs[1].id, mock.ANY, placeholder=mock.ANY
+        )
+        saved = metadata_service.track_batch.await_args.args[0]
+        assert list(saved) == [metadata_service.extract.return_value]
+
+
+class TestProcessMissed:
+    async def test(self, content_processor: BlobContentProcessor):
+        # GIVEN
+        blob_ids = [uuid.uuid7(), uuid.uuid7(), uuid.uuid7()]
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        blob_service.list_ids_without_metadata.return_value = blob_ids
+        metadata_service = cast(mock.MagicMock, content_processor.metadata_service)
+        metadata_service.supported_types.return_value = frozenset({"image/jpeg"})
+        thumbnailer = cast(mock.MagicMock, content_processor.thumbnail_service)
+        thumbnailer.supported_types.return_value = frozenset({"image/png"})
+        worker = cast(mock.AsyncMock, content_processor.worker)
+        await content_processor.process_async(blob_ids[1])
+        await taskgroups.wait_background_tasks()
+        target = "app.app.blobs.services.content_processor.config.features"
+        # WHEN
+        with mock.patch(f"{target}.content_processing_batch_size", 1):
+            result = await content_processor.process_missed()
+        # THEN
+        assert result == 3
+        blob_service.list_ids_without_metadata.assert_awaited_once_with(
+            created_after=mock.ANY,
+            created_before=mock.ANY,
+            media_types={"image/jpeg", "image/png"},
+        )
+        assert worker.enqueue.await_args_list == [
+            mock.call("process_blob_content_batch", blob_ids=[blob_ids[1]]),
+            mock.call("process_blob_content_batch", blob_ids=[blob_ids[0]]),
+            mock.call("process_blob_content_batch", blob_ids=[blob_ids[2]]),
+        ]
 
 
 class TestProcessAsync:
     async def test(self, content_processor: BlobContentProcessor):
         # GIVEN
-        blob_id = uuid.uuid7()
+        blob_ids = [uuid.uuid7(), uuid.uuid7()]
         worker = cast(mock.AsyncMock, content_processor.worker)
         # WHEN
-        await content_processor.process_async(blob_id)
+        for blob_id in blob_ids:
+            await content_processor.process_async(blob_id)
+        await taskgroups.wait_background_tasks()
         # THEN
         worker.enqueue.assert_awaited_once_with(
-            "process_blob_content", blob_id=blob_id,
+            "process_blob_content_batch", blob_ids=blob_ids
         )
+
+    async def test_queued_blob_is_not_enqueued_again(
+        self, content_processor: BlobContentProcessor
+    ):
+        # GIVEN
+        blob_ids = [uuid.uuid7(), uuid.uuid7()]
+        worker = cast(mock.AsyncMock, content_processor.worker)
+        await content_processor.process_async(blob_ids[0])
+        await taskgroups.wait_background_tasks()
+        # WHEN
+        for blob_id in [*blob_ids, blob_ids[1]]:
+            await content_processor.process_async(blob_id)
+        await taskgroups.wait_background_tasks()
+        # THEN
+        assert worker.enqueue.await_args_list == [
+            mock.call("process_blob_content_batch", blob_ids=[blob_ids[0]]),
+            mock.call("process_blob_content_batch", blob_ids=[blob_ids[1]]),
+        ]
+
+    async def test_processed_blob_can_be_enqueued_again(
+        self, content_processor: BlobContentProcessor
+    ):
+        # GIVEN
+        blob_id = uuid.uuid7()
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        blob_service.get_by_id_batch.return_value = []
+        worker = cast(mock.AsyncMock, content_processor.worker)
+        await content_processor.process_async(blob_id)
+        await taskgroups.wait_background_tasks()
+        await content_processor.process_batch([blob_id])
+        # WHEN
+        await content_processor.process_async(blob_id)
+        await taskgroups.wait_background_tasks()
+        # THEN
+        assert worker.enqueue.await_count == 2
+
+    async def test_blob_that_failed_to_process_can_be_enqueued_again(
+        self, content_processor: BlobContentProcessor
+    ):
+        # GIVEN
+        blob_id = uuid.uuid7()
+        blob_service = cast(mock.MagicMock, content_processor.blob_service)
+        blob_service.get_by_id.side_effect = Blob.NotFound
+        worker = cast(mock.AsyncMock, content_processor.worker)
+        await content_processor.process_async(blob_id)
+        await taskgroups.wait_background_tasks()
+        with pytest.raises(Blob.NotFound):
+            await content_processor.process(blob_id)
+        # WHEN
+        await content_processor.process_async(blob_id)
+        await taskgroups.wait_background_tasks()
+        # THEN
+        assert worker.enqueue.await_count == 2
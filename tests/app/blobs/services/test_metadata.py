@@ -8,6 +8,7 @@ import pytest
 
 from app.app.blobs.domain import BlobMetadata
 from app.toolkit.metadata import Exif
+from app.toolkit.processpool import TaskFailed
 
 if TYPE_CHECKING:
     from unittest.mock import MagicMock
@@ -18,6 +19,41 @@ if TYPE_CHECKING:
 pytestmark = [pytest.mark.anyio]
 
 
+class TestIsSupported:
+    @pytest.mark.parametrize(["media_type", "supported"], [
+        ("image/jpeg", True),
+        ("application/zip", False),
+    ])
+    async def test(
+        self,
+        blob_metadata_service: BlobMetadataService,
+        media_type: str,
+        supported: bool,
+    ):
+        assert blob_metadata_service.is_supported(media_type) is supported
+
+
+class TestSupportedTypes:
+    async def test(self, blob_metadata_service: BlobMetadataService):
+        result = blob_metadata_service.supported_types()
+        assert "image/jpeg" in result
+        assert "application/zip" not in result
+
+
+class TestGetHeaderSize:
+    @pytest.mark.parametrize(["media_type", "header_size"], [
+        ("image/jpeg", 256 * 1024),
+        ("image/png", None),
+    ])
+    async def test(
+        self,
+        blob_metadata_service: BlobMetadataService,
+        media_type: str,
+        header_size: int | None,
+    ):
+        assert blob_metadata_service.get_header_size(media_type) == header_size
+
+
 class TestGetByBlobID:
     async def test(self, blob_metadata_service: BlobMetadataService):
         # GIVEN
@@ -29,6 +65,31 @@ class TestGetByBlobID:
         assert result == db.blob_metadata.get_by_blob_id.return_value
         db.blob_metadata.get_by_blob_id.assert_awaited_once_with(file_id)
 
+    async def test_when_only_placeholder_is_tracked(
+        self, blob_metadata_service: BlobMetadataService
+    ):
+        # GIVEN
+        blob_id = uuid.uuid4()
+        db = cast(mock.MagicMock, blob_metadata_service.db)
+        db.blob_metadata.get_by_blob_id.return_value = BlobMetadata(
+            blob_id=blob_id, data=None, placeholder="data:image/webp;base64,"
+        )
+        # WHEN / THEN
+        with pytest.raises(BlobMetadata.NotFound):
+            await blob_metadata_service.get_by_blob_id(blob_id)
+
+
+class TestGetByChash:
+    async def test(self, blob_metadata_service: BlobMetadataService):
+        # GIVEN
+        chash, media_type = uuid.uuid4().hex, "image/jpeg"
+        db = cast(mock.MagicMock, blob_metadata_service.db)
+        # WHEN
+        result = await blob_metadata_service.get_by_chash(chash, media_type)
+        # THEN
+        assert result == db.blob_metadata.get_by_chash.return_value
+        db.blob_metadata.get_by_chash.assert_awaited_once_with(chash, media_type)
+
 
 @mock.patch("app.app.blobs.services.metadata.metadata.load")
 class TestTrack:
@@ -45,7 +106,9 @@ class TestTrack:
         # WHEN
         await blob_metadata_service.track(file_id, image_content.file)
         # THEN
-        load_metadata.assert_awaited_once_with(image_content.file)
+        load_metadata.assert_awaited_once_with(
+            image_content.file, pool=blob_metadata_service.pool
+        )
         db.blob_metadata.save.assert_awaited_once_with(
             BlobMetadata(blob_id=file_id, data=load_metadata.return_value)
         )
@@ -63,5 +126,89 @@ class TestTrack:
         # WHEN
         await blob_metadata_service.track(file_id, image_content.file)
         # THEN
-        load_metadata.assert_awaited_once_with(image_content.file)
+        load_metadata.assert_awaited_once_with(
+            image_content.file, pool=blob_metadata_service.pool
+        )
+        db.blob_metadata.save.assert_not_awaited()
+
+    async def test_when_metadata_is_none_but_placeholder_is_not(
+        self,
+        load_metadata: MagicMock,
+        blob_metadata_service: BlobMetadataService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        file_id = uuid.uuid4()
+        placeholder = "data:image/webp;base64,"
+        db = cast(mock.MagicMock, blob_metadata_service.db)
+        load_metadata.return_value = None
+        # WHEN
+        await blob_metadata_service.track(
+            file_id, image_content.file, placeholder=placeholder
+        )
+        # THEN
+        db.blob_metadata.save.assert_awaited_once_with(
+            BlobMetadata(blob_id=file_id, data=None, placeholder=placeholder)
+        )
+
+    async def test_when_task_failed(
+        self,
+        load_metadata: MagicMock,
+        blob_metadata_service: BlobMetadataService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        file_id = uuid.uuid4()
+        db = cast(mock.MagicMock, blob_metadata_service.db)
+        load_metadata.side_effect = TaskFailed
+        # WHEN
+        await blob_metadata_service.track(file_id, image_content.file)
+        # THEN
         db.blob_metadata.save.assert_not_awaited()
+
+
+@mock.patch("app.app.blobs.services.metadata.metadata.load")
+class TestExtract:
+    async def test(
+        self,
+        load_metadata: MagicMock,
+        blob_metadata_service: BlobMetadataService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob_id = uuid.uuid4()
+        db = cast(mock.MagicMock, blob_metadata_service.db)
+        load_metadata.return_value = Exif(width=1280, height=800)
+        # WHEN
+        result = await blob_metadata_service.extract(blob_id, image_content.file)
+        # THEN
+        assert result == BlobMetadata(blob_id=blob_id, data=load_metadata.return_value)
+        db.blob_metadata.save.assert_not_awaited()
+
+    async def test_when_metadata_is_none(
+        self,
+        load_metadata: MagicMock,
+        blob_metadata_service: BlobMetadataService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob_id = uuid.uuid4()
+        load_metadata.return_value = None
+        # WHEN
+        result = await blob_metadata_service.extract(blob_id, image_content.file)
+        # THEN
+        assert result is None
+
+
+class TestTrackBatch:
+    async def test(self, blob_metadata_service: BlobMetadataService):
+        # GIVEN
+        items = [
+            BlobMetadata(blob_id=uuid.uuid4(), data=Exif(width=1280, height=800)),
+            BlobMetadata(blob_id=uuid.uuid4(), data=None, placeholder="data:,"),
+        ]
+        db = cast(mock.MagicMock, blob_metadata_service.db)
+        # WHEN
+        await blob_metadata_service.track_batch(items)
+        # THEN
+        db.blob_metadata.save_batch.assert_awaited_once_with(items)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import uuid
+from contextlib import nullcontext
 from io import BytesIO
 from typing import IO, TYPE_CHECKING, cast
 from unittest import mock
@@ -8,20 +11,31 @@ from unittest import mock
 import pytest
 
 from app.app.blobs.domain import Blob
+from app.app.blobs.services import thumbnailer as thumbnailer_module
+from app.cache import cache, disk_cache
 from app.toolkit import thumbnails, timezone
 from app.toolkit.mediatypes import MediaType
+from app.toolkit.processpool import TaskFailed
 from app.toolkit.thumbnails import ThumbnailUnavailable
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator
     from unittest.mock import MagicMock
 
+    from pytest import LogCaptureFixture
+
     from app.app.blobs.domain import IBlobContent
     from app.app.blobs.services import BlobThumbnailService
 
 pytestmark = [pytest.mark.anyio]
 
 
+@pytest.fixture(autouse=True)
+async def clear_cache() -> None:
+    await cache.clear()
+    await disk_cache.clear()
+
+
 async def _aiter(content: IO[bytes]) -> AsyncIterator[bytes]:
     for chunk in content:
         yield chunk
@@ -55,12 +69,54 @@ class TestIsSupported:
         thumbnails_mock.is_supported.assert_called_once_with(media_type)
 
 
+class TestSupportedTypes:
+    async def test(self, thumbnailer: BlobThumbnailService):
+        result = thumbnailer.supported_types()
+        assert "image/jpeg" in result
+        assert "application/pdf" in result
+        assert "plain/text" not in result
+
+
 class TestGetStorageKey:
     async def test(self, thumbnailer: BlobThumbnailService):
         chash, size = "abcdef", 72
         path = thumbnailer.get_storage_key(chash, size)
         assert path == "thumbnails/ab/cd/ef/abcdef_72.webp"
 
+    @pytest.mark.parametrize(["output_type", "expected"], [
+        (MediaType.IMAGE_AVIF, "thumbnails/ab/cd/ef/abcdef_72.avif"),
+        (MediaType.IMAGE_JPEG, "thumbnails/ab/cd/ef/abcdef_72.jpg"),
+    ])
+    async def test_output_type(
+        self, thumbnailer: BlobThumbnailService, output_type: MediaType, expected: str
+    ):
+        path = thumbnailer.get_storage_key("abcdef", 72, output_type)
+        assert path == expected
+
+
+class TestExists:
+    async def test(self, thumbnailer: BlobThumbnailService):
+        # GIVEN
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        # WHEN
+        result = await thumbnailer.exists("abcdef", sizes=[72, 768])
+        # THEN
+        assert result is True
+        storage.exists.assert_has_awaits([
+            mock.call("thumbnails/ab/cd/ef/abcdef_72.webp"),
+            mock.call("thumbnails/ab/cd/ef/abcdef_768.webp"),
+        ])
+
+    async def test_when_some_are_missing(self, thumbnailer: BlobThumbnailService):
+        # GIVEN
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.side_effect = [True, False]
+        # WHEN
+        result = await thumbnailer.exists("abcdef", sizes=[72, 768])
+        # THEN
+        assert result is False
+
 
 class TestGenerate:
     async def test(
@@ -81,13 +137,65 @@ class TestGenerate:
             mock.call(thumbnailer.get_storage_key(blob.chash, 64)),
             mock.call(thumbnailer.get_storage_key(blob.chash, 128)),
         ])
-        storage.makedirs.assert_has_awaits([
-            mock.call("thumbnails/ab/cd/ef"),
-            mock.call("thumbnails/ab/cd/ef"),
-        ])
+        storage.makedirs.assert_awaited_once_with("thumbnails/ab/cd/ef")
+        storage.save.assert_has_awaits([
+            mock.call(thumbnailer.get_storage_key(blob.chash, 64), mock.ANY),
+            mock.call(thumbnailer.get_storage_key(blob.chash, 128), mock.ANY),
+        ], any_order=True)
         assert storage.save.await_count == 2
 
-    @mock.patch("app.app.blobs.services.thumbnailer.thumbnails.thumbnail")
+    @mock.patch("app.app.blobs.services.thumbnailer.thumbnails.thumbnail_many")
+    async def test_content_decoded_once(
+        self,
+        thumbnail_mock: MagicMock,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        sizes = [32, 64, 128]
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.side_effect = [False, True, False]
+        thumbnail_mock.return_value = {
+            32: (b"32", MediaType.IMAGE_WEBP),
+            128: (b"128", MediaType.IMAGE_WEBP),
+        }
+        # WHEN
+        result = await thumbnailer.generate(
+            blob.chash, image_content.file, sizes=sizes
+        )
+        # THEN
+        assert result == {32: b"32", 128: b"128"}
+        thumbnail_mock.assert_awaited_once_with(
+            image_content.file,
+            sizes=[32, 128],
+            max_frames=thumbnailer.max_animation_frames,
+            max_duration=thumbnailer.max_animation_duration,
+            pool=thumbnailer.pool,
+        )
+        assert storage.save.await_count == 2
+
+    async def test_when_all_thumbnails_exist(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        sizes = [32, 64, 128]
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        # WHEN
+        result = await thumbnailer.generate(
+            blob.chash, image_content.file, sizes=sizes
+        )
+        # THEN
+        assert result == {}
+        assert storage.exists.await_count == 3
+        storage.makedirs.assert_not_called()
+        storage.save.assert_not_called()
+
+    @mock.patch("app.app.blobs.services.thumbnailer.thumbnails.thumbnail_many")
     async def test_when_file_not_thumbnailable(
         self,
         thumbnail_mock: MagicMock,
@@ -103,7 +211,26 @@ class TestGenerate:
         # WHEN
         await thumbnailer.generate(blob.chash, image_content.file, sizes=sizes)
         # THEN
-        storage.exists.assert_awaited_once_with("thumbnails/ab/cd/ef/abcdef_32.webp")
+        assert storage.exists.await_count == 3
+        storage.makedirs.assert_not_called()
+        storage.save.assert_not_called()
+
+    @mock.patch("app.app.blobs.services.thumbnailer.thumbnails.thumbnail_many")
+    async def test_when_task_failed(
+        self,
+        thumbnail_mock: MagicMock,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        sizes = [32, 64, 128]
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = False
+        thumbnail_mock.side_effect = TaskFailed
+        # WHEN
+        await thumbnailer.generate(blob.chash, image_content.file, sizes=sizes)
+        # THEN
         storage.makedirs.assert_not_called()
         storage.save.assert_not_called()
 
@@ -194,17 +321,66 @@ class TestThumbnail:
         storage.exists.return_value = False
         blob_service = cast(mock.MagicMock, thumbnailer.blob_service)
         blob_service.get_by_id.return_value = blob
-        blob_service.download.return_value = _aiter(image_content.file)
+        blob_service.open_local.return_value = nullcontext(image_content.file)
         # WHEN
         thumbnail, mediatype = await thumbnailer.thumbnail(blob.id, blob.chash, 32)
         # THEN
         assert thumbnail
         assert mediatype == MediaType.IMAGE_WEBP
         blob_service.get_by_id.assert_awaited_once_with(blob.id)
-        blob_service.download.assert_called_once_with(blob.storage_key)
+        blob_service.open_local.assert_called_once_with(blob.storage_key)
         storage.makedirs.assert_awaited_once_with("thumbnails/ab/cd/ef")
         storage.save.assert_awaited_once()
 
+    async def test_output_type(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        output_type = MediaType.IMAGE_AVIF
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = False
+        blob_service = cast(mock.MagicMock, thumbnailer.blob_service)
+        blob_service.get_by_id.return_value = blob
+        blob_service.open_local.return_value = nullcontext(image_content.file)
+        # WHEN
+        thumbnail, mediatype = await thumbnailer.thumbnail(
+            blob.id, blob.chash, 32, output_type
+        )
+        # THEN
+        assert thumbnail
+        assert mediatype == output_type
+        key = "thumbnails/ab/cd/ef/abcdef_32.avif"
+        storage.exists.assert_awaited_once_with(key)
+        storage.save.assert_awaited_once_with(key, mock.ANY)
+        assert (blob.chash, 32, output_type) in thumbnailer.memory_cache
+        assert (blob.chash, 32, MediaType.IMAGE_WEBP) not in thumbnailer.memory_cache
+
+    async def test_bytes_served_are_counted(
+        self,
+        caplog: LogCaptureFixture,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        caplog.set_level(logging.INFO, logger=thumbnailer_module.__name__)
+        # WHEN
+        with mock.patch.object(thumbnailer_module, "_STATS_LOG_INTERVAL", 2):
+            for _ in range(2):
+                await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+        # THEN
+        assert thumbnailer.served[MediaType.IMAGE_WEBP] == 2
+        assert thumbnailer.bytes_served[MediaType.IMAGE_WEBP] == 2 * len(thumbnail)
+        msg = f"Thumbnails served as image/webp: 2, {2 * len(thumbnail)} bytes"
+        assert caplog.records[-1].getMessage() == msg
+
     @mock.patch("app.app.blobs.services.thumbnailer.thumbnails.thumbnail")
     async def test_when_thumbnail_unavailable(
         self,
@@ -218,7 +394,7 @@ class TestThumbnail:
         storage.exists.return_value = False
         blob_service = cast(mock.MagicMock, thumbnailer.blob_service)
         blob_service.get_by_id.return_value = blob
-        blob_service.download.return_value = _aiter(image_content.file)
+        blob_service.open_local.return_value = nullcontext(image_content.file)
         thumbnail_mock.side_effect = ThumbnailUnavailable
         # WHEN / THEN
         with pytest.raises(Blob.ThumbnailUnavailable):
@@ -238,7 +414,7 @@ class TestThumbnail:
         # WHEN / THEN
         with pytest.raises(Blob.ThumbnailUnavailable):
             await thumbnailer.thumbnail(blob.id, blob.chash, 32)
-        blob_service.download.assert_not_called()
+        blob_service.open_local.assert_not_called()
         storage.makedirs.assert_not_called()
         storage.save.assert_not_called()
 
@@ -250,3 +426,156 @@ class TestThumbnail:
         with pytest.raises(Blob.ThumbnailUnavailable):
             await thumbnailer.thumbnail(blob_id, "", 32)
         storage.exists.assert_not_called()
+
+    async def test_memory_cache_hit(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+        # WHEN
+        result = await thumbnailer.thumbnail(uuid.uuid7(), blob.chash, 32)
+        # THEN
+        assert result == (thumbnail, MediaType.IMAGE_WEBP)
+        storage.download.assert_called_once()
+        assert thumbnailer.memory_cache.hits == 1
+        assert thumbnailer.memory_cache.misses == 1
+
+    async def test_memory_cache_stats_are_logged(
+        self,
+        caplog: LogCaptureFixture,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        caplog.set_level(logging.INFO, logger=thumbnailer_module.__name__)
+        # WHEN
+        with mock.patch.object(thumbnailer_module, "_STATS_LOG_INTERVAL", 2):
+            await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+            await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+        # THEN
+        records = [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == thumbnailer_module.__name__
+        ]
+        assert records[0] == (
+            "Thumbnail memory cache: 1 hits, 1 misses, 0 evictions, "
+            f"{len(thumbnail)} of {thumbnailer.memory_cache.max_size} bytes used"
+        )
+
+    async def test_disk_cache_hit(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+        thumbnailer.memory_cache.clear()
+        # WHEN
+        result = await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+        # THEN
+        assert result == (thumbnail, MediaType.IMAGE_WEBP)
+        storage.download.assert_called_once()
+        assert thumbnailer.memory_cache.misses == 2
+        assert len(thumbnailer.memory_cache) == 1
+
+    async def test_concurrent_calls_are_coalesced(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        # WHEN
+        results = await asyncio.gather(*(
+            thumbnailer.thumbnail(blob.id, blob.chash, 32) for _ in range(5)
+        ))
+        # THEN
+        assert results == [(thumbnail, MediaType.IMAGE_WEBP)] * 5
+        storage.exists.assert_awaited_once()
+        storage.download.assert_called_once()
+
+    async def test_result_handed_over_by_another_node(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        await cache.set("thumbnails_handoff:abcdef:32:webp", thumbnail, expire=30)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        # WHEN
+        result = await thumbnailer.thumbnail(blob.id, blob.chash, 32)
+        # THEN
+        assert result == (thumbnail, MediaType.IMAGE_WEBP)
+        storage.exists.assert_not_called()
+        storage.download.assert_not_called()
+
+
+class TestPlaceholder:
+    async def test(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=72)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        # WHEN
+        result = await thumbnailer.placeholder(blob.id, blob.chash)
+        # THEN
+        assert result is not None
+        assert result.startswith("data:image/webp;base64,")
+        storage.download.assert_called_once_with(
+            "thumbnails/ab/cd/ef/abcdef_72.webp"
+        )
+
+    async def test_when_thumbnail_unavailable(
+        self, thumbnailer: BlobThumbnailService
+    ):
+        result = await thumbnailer.placeholder(uuid.uuid7(), "")
+        assert result is None
+
+
+class TestThumbnailBatch:
+    async def test(
+        self,
+        thumbnailer: BlobThumbnailService,
+        image_content: IBlobContent,
+    ):
+        # GIVEN
+        blob = _make_blob("admin/im.jpeg", chash="abcdef")
+        thumbnail, _ = await thumbnails.thumbnail(image_content.file, size=32)
+        storage = cast(mock.MagicMock, thumbnailer.storage)
+        storage.exists.return_value = True
+        storage.download.return_value = _aiter(BytesIO(thumbnail))
+        items = [("a", blob.id, blob.chash), ("b", uuid.uuid7(), "")]
+        # WHEN
+        result = [item async for item in thumbnailer.thumbnail_batch(items, 32)]
+        # THEN
+        assert result == [("a", thumbnail, MediaType.IMAGE_WEBP)]
@@ -68,6 +68,7 @@ def filecore(tortoise_database: TortoiseDatabase, fs_storage: IStorage):
         database=tortoise_database,
         blob_service=blob_service,
         storage=fs_storage,
+        worker=worker,
     )
 
 
@@ -7,6 +7,7 @@ from unittest import mock
 import pytest
 
 from app.app.files.domain import File, Path
+from app.toolkit import timezone
 
 if TYPE_CHECKING:
     from unittest.mock import MagicMock
@@ -253,6 +254,19 @@ class TestListFolder:
         filecore.list_folder.assert_awaited_once_with(ns_path, path)
 
 
+@pytest.mark.anyio
+class TestListTrashed:
+    async def test(self, file_service: FileService):
+        # GIVEN
+        before = timezone.now()
+        filecore = cast(mock.AsyncMock, file_service.filecore)
+        # WHEN
+        result = await file_service.list_trashed(before, limit=10)
+        # THEN
+        assert result == filecore.list_trashed.return_value
+        filecore.list_trashed.assert_awaited_once_with(before, 10)
+
+
 @pytest.mark.anyio
 class TestMove:
     async def test_moves_file_within_namespace(self, file_service: FileService):
@@ -267,3 +281,14 @@ class TestMove:
             at=(ns_path, at_path),
             to=(ns_path, to_path),
         )
+
+
+@pytest.mark.anyio
+class TestPurgeDeleted:
+    async def test(self, file_service: FileService):
+        # GIVEN
+        filecore = cast(mock.MagicMock, file_service.filecore)
+        # WHEN
+        await file_service.purge_deleted()
+        # THEN
+        filecore.purge_deleted.assert_awaited_once_with()
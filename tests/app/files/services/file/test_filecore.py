@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 import uuid
 from typing import TYPE_CHECKING, cast
 from unittest import mock
@@ -7,11 +8,15 @@ from unittest import mock
 import pytest
 
 from app.app.files.domain import File, Path
+from app.app.files.services.file import filecore as filecore_module
 from app.app.infrastructure.storage import DownloadBatchItem
-from app.toolkit import taskgroups
+from app.cache import cache
+from app.toolkit import taskgroups, timezone
 
 if TYPE_CHECKING:
 
+    from pytest import LogCaptureFixture
+
     from app.app.blobs.domain import IBlobContent
     from app.app.files.domain import Namespace
     from app.app.files.services.file import FileCoreService
@@ -26,6 +31,14 @@ if TYPE_CHECKING:
 pytestmark = [pytest.mark.anyio, pytest.mark.database]
 
 
+async def _apply_blob_jobs(filecore: FileCoreService) -> None:
+    # blob jobs are applied by the worker in the background
+    ids = await filecore.blob_service.db.blob_job.list_ids(
+        created_before=timezone.now()
+    )
+    await filecore.blob_service.process_blob_jobs(ids)
+
+
 class TestCreateFile:
     async def test(
         self, filecore: FileCoreService, namespace: Namespace, content: IBlobContent
@@ -107,6 +120,31 @@ class TestCreateFile:
         home = await db.file.get_by_path(namespace.path, ".")
         assert home.size == sum(content.size for content in contents)
 
+    async def test_query_budget(
+        self,
+        caplog: LogCaptureFixture,
+        filecore: FileCoreService,
+        namespace: Namespace,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        statements = ("SELECT", "INSERT", "UPDATE", "DELETE")
+        # the namespace is cached by a lookup outside of a transaction
+        target = "app.infrastructure.database.tortoise.repositories.namespace"
+        with mock.patch(f"{target}.in_transaction", return_value=False):
+            await filecore.create_folder(namespace.path, "a")
+        # WHEN
+        with caplog.at_level(logging.DEBUG, logger="tortoise.db_client"):
+            await filecore.create_file(namespace.path, "a/f.txt", content)
+        # THEN
+        queries = [
+            record
+            for record in caplog.records
+            if record.getMessage().lstrip().upper().startswith(statements)
+        ]
+        # parent lookup, available path, blob insert, file insert, parents update
+        assert len(queries) == 5
+
     async def test_when_file_path_already_taken(
         self, filecore: FileCoreService, namespace: Namespace, content: IBlobContent
     ):
@@ -165,6 +203,75 @@ class TestCreateFolder:
             await filecore.create_folder(namespace.path, "f.txt/folder")
 
 
+class TestDeferSizeUpdates:
+    async def test(
+        self,
+        filecore: FileCoreService,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_factory(ns_path, "a/c/f.txt")
+        await file_factory(ns_path, "a/d/f.txt")
+        db = cast(mock.MagicMock, filecore.db)
+
+        # WHEN
+        with mock.patch.object(
+            db.file, "incr_size_batch", wraps=db.file.incr_size_batch
+        ) as incr_size_batch:
+            async with filecore.defer_size_updates():
+                await filecore.delete(ns_path, "a/b/f.txt")
+                await filecore.delete(ns_path, "a/c/f.txt")
+                # nothing is applied until the context exits
+                a = await filecore.db.file.get_by_path(ns_path, "a")
+                assert a.size == 30
+
+        # THEN
+        paths = [".", "a", "a/b", "a/c"]
+        home, a, b, c = await filecore.db.file.get_by_path_batch(ns_path, paths)
+        assert (home.size, a.size, b.size, c.size) == (10, 10, 0, 0)
+        assert incr_size_batch.await_count == 2
+
+    async def test_when_operation_fails(
+        self,
+        filecore: FileCoreService,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_factory(ns_path, "a/c/f.txt")
+        incr_size_batch = filecore_module.FileCoreService._incr_size_batch
+
+        async def incr_size_batch_and_fail(self, ns_path, paths, value):
+            await incr_size_batch(self, ns_path, paths, value)
+            raise RuntimeError
+
+        # WHEN
+        async with filecore.defer_size_updates():
+            await filecore.delete(ns_path, "a/b/f.txt")
+            with (
+                mock.patch.object(
+                    filecore_module.FileCoreService,
+                    "_incr_size_batch",
+                    autospec=True,
+                    side_effect=incr_size_batch_and_fail,
+                ),
+                pytest.raises(RuntimeError),
+            ):
+                await filecore.delete(ns_path, "a/c/f.txt")
+
+        # THEN
+        paths = [".", "a", "a/b", "a/c", "a/c/f.txt"]
+        files = await filecore.db.file.get_by_path_batch(ns_path, paths)
+        home, a, b, c, f = files
+        assert (home.size, a.size, b.size, c.size) == (10, 10, 0, 10)
+        assert f.size == 10
+
+
 class TestDelete:
     async def test_deleting_a_file(
         self, filecore: FileCoreService, namespace: Namespace, file: File
@@ -199,6 +306,77 @@ class TestDelete:
         assert len(files) == 2
         assert files[0].path == "a"
         assert files[1].path == "a/c"
+        worker = cast(mock.MagicMock, filecore.worker)
+        worker.enqueue.assert_not_awaited()
+
+    async def test_deleting_a_large_folder(
+        self,
+        filecore: FileCoreService,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "a/f.txt")
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_factory(ns_path, "a/b/c/f.txt")
+        worker = cast(mock.MagicMock, filecore.worker)
+
+        with mock.patch.object(filecore_module, "_DELETE_CHUNK_SIZE", 2):
+            # WHEN
+            await filecore.delete(ns_path, "a/b")
+
+            # THEN the folder is hidden with its contents, and its path is free
+            with pytest.raises(File.NotFound):
+                await filecore.get_by_path(ns_path, "a/b")
+            assert not await filecore.exists_at_path(ns_path, "a/b/c/f.txt")
+            assert await filecore.get_available_path(ns_path, "a/b") == "a/b"
+            a = await filecore.get_by_path(ns_path, "a")
+            assert a.size == 10
+            worker.enqueue.assert_awaited_once_with(
+                "purge_deleted_files", job_id="purge_deleted_files"
+            )
+
+            # WHEN
+            await filecore.purge_deleted()
+
+        # THEN
+        assert await filecore.db.file.count_by_path_pattern(ns_path, "^a/b/") == 0
+        assert await filecore.db.file.count_by_path_pattern(ns_path, "^~deleted/") == 0
+        assert await filecore.db.file.list_deleted(limit=10) == []
+
+    async def test_reusing_path_of_a_large_folder_being_deleted(
+        self,
+        filecore: FileCoreService,
+        file_factory: FileFactory,
+        namespace: Namespace,
+        content: IBlobContent,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "a/f.txt")
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_factory(ns_path, "a/b/c/f.txt")
+        with mock.patch.object(filecore_module, "_DELETE_CHUNK_SIZE", 2):
+            await filecore.delete(ns_path, "a/b")
+        await _apply_blob_jobs(filecore)
+
+        # WHEN
+        await filecore.create_folder(ns_path, "a/b/c/d")
+        file = await filecore.create_file(ns_path, "a/b/c/f.txt", content)
+        await filecore.move((ns_path, "a/f.txt"), (ns_path, "a/b/f.txt"))
+        await filecore.purge_deleted()
+        await _apply_blob_jobs(filecore)
+
+        # THEN
+        assert await filecore.list_folder(ns_path, "a/b/c") == [
+            await filecore.get_by_path(ns_path, "a/b/c/d"),
+            file,
+        ]
+        _, chunks = await filecore.download(file.id)
+        assert b"".join([chunk async for chunk in chunks]) == content.file.getvalue()
+        assert await filecore.exists_at_path(ns_path, "a/b/f.txt")
+        assert await filecore.db.file.count_by_path_pattern(ns_path, "^~deleted") == 0
 
     async def test_updating_parent_size(
         self,
@@ -306,13 +484,27 @@ class TestEmptyFolder:
     ):
         # GIVEN
         ns_path = namespace.path
-        file_a = await file_factory(ns_path, "Folder/f.txt")
-        file_b = await file_factory(ns_path, "Folder/a/f.txt")
+        await file_factory(ns_path, "Folder/f.txt")
+        await file_factory(ns_path, "Folder/a/f.txt")
+        worker = cast(mock.MagicMock, filecore.worker)
+
         # WHEN
         await filecore.empty_folder(ns_path, "Folder")
+
+        # THEN contents are hidden and purged later, but their paths are free
+        assert await filecore.list_folder(ns_path, "Folder") == []
+        assert not await filecore.exists_at_path(ns_path, "Folder/a/f.txt")
+        assert await filecore.get_available_path(ns_path, "Folder/a") == "Folder/a"
+        worker.enqueue.assert_awaited_once_with(
+            "purge_deleted_files", job_id="purge_deleted_files"
+        )
+
+        # WHEN
+        await filecore.purge_deleted()
+
         # THEN
-        assert not await filecore.db.file.exists_with_id(ns_path, file_a.id)
-        assert not await filecore.db.file.exists_with_id(ns_path, file_b.id)
+        assert await filecore.db.file.count_by_path_pattern(ns_path, "^~deleted") == 0
+        assert await filecore.db.file.list_deleted(limit=10) == []
 
     async def test_updating_folder_size(
         self,
@@ -341,12 +533,12 @@ class TestEmptyFolder:
 
     async def test_when_folder_is_empty(self, filecore: FileCoreService, folder: File):
         with (
-            mock.patch.object(filecore.db.file, "delete_all_with_prefix") as db_mock,
+            mock.patch.object(filecore.db.file, "set_deleted_at_batch") as db_mock,
         ):
             await filecore.empty_folder(folder.ns_path, folder.path)
 
         db_mock.assert_not_awaited()
-        cast(mock.AsyncMock, filecore.blob_service.worker).enqueue.assert_not_awaited()
+        cast(mock.AsyncMock, filecore.worker).enqueue.assert_not_awaited()
 
 
 class TestExistsWithID:
@@ -466,6 +658,33 @@ class TestGetByPath:
         db.file.get_by_path.assert_awaited_once_with(ns_path, path)
 
 
+class TestGetSpaceUsed:
+    async def test(
+        self, filecore: FileCoreService, file_factory: FileFactory, namespace: Namespace
+    ):
+        # GIVEN
+        await file_factory(namespace.path, "a/f.txt")
+        # WHEN
+        result = await filecore.get_space_used(namespace.owner_id)
+        # THEN
+        assert result == 10
+
+    async def test_counter_is_kept_up_to_date(
+        self, filecore: FileCoreService, file_factory: FileFactory, namespace: Namespace
+    ):
+        # GIVEN
+        ns_path, owner_id = namespace.path, namespace.owner_id
+        assert await filecore.get_space_used(owner_id) == 0
+        # WHEN / THEN
+        await file_factory(ns_path, "a/f.txt")
+        await file_factory(ns_path, "a/b/f.txt")
+        assert await filecore.get_space_used(owner_id) == 20
+        await filecore.delete(ns_path, "a/b")
+        assert await filecore.get_space_used(owner_id) == 10
+        await filecore.empty_folder(ns_path, "a")
+        assert await filecore.get_space_used(owner_id) == 0
+
+
 class TestListFolder:
     async def test(
         self,
@@ -684,6 +903,25 @@ class TestMove:
         assert f.name == "f.txt"
         assert str(f.path) == "a/C/B/C/f.txt"
 
+    async def test_moving_to_trash_and_back(
+        self,
+        filecore: FileCoreService,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        file = await file_factory(ns_path, "f.txt")
+        # WHEN
+        await filecore.move(at=(ns_path, "f.txt"), to=(ns_path, "trash/f.txt"))
+        # THEN
+        trashed = await filecore.list_trashed(timezone.now(), limit=10)
+        assert [item.id for item in trashed] == [file.id]
+        # WHEN
+        await filecore.move(at=(ns_path, "Trash/f.txt"), to=(ns_path, "f.txt"))
+        # THEN
+        assert await filecore.list_trashed(timezone.now(), limit=10) == []
+
     async def test_when_path_does_not_exist(
         self, filecore: FileCoreService, namespace: Namespace
     ):
@@ -748,3 +986,73 @@ class TestMove:
         with pytest.raises(File.MalformedPath) as excinfo:
             await filecore.move(at=(namespace.path, a), to=(namespace.path, b))
         assert str(excinfo.value) == "Can't move to itself."
+
+
+
+class TestReconcileSpaceUsed:
+    async def test(
+        self, filecore: FileCoreService, file_factory: FileFactory, namespace: Namespace
+    ):
+        # GIVEN
+        owner_id = namespace.owner_id
+        await file_factory(namespace.path, "f.txt")
+        assert await filecore.get_space_used(owner_id) == 10
+        await filecore.reserve_space(owner_id, 5, quota=100)
+        # WHEN
+        await filecore.reconcile_space_used()
+        # THEN
+        assert await filecore.get_space_used(owner_id) == 10
+        assert await filecore.reserve_space(owner_id, 86, quota=100) is False
+        assert await filecore.reserve_space(owner_id, 85, quota=100) is True
+
+
+class TestReserveSpace:
+    async def test(
+        self, filecore: FileCoreService, file_factory: FileFactory, namespace: Namespace
+    ):
+        # GIVEN
+        owner_id = namespace.owner_id
+        await file_factory(namespace.path, "f.txt")
+        # WHEN / THEN
+        assert await filecore.reserve_space(owner_id, 10, quota=20) is True
+        assert await filecore.reserve_space(owner_id, 1, quota=20) is False
+        assert await filecore.get_space_used(owner_id) == 10
+        await filecore.release_space(owner_id, 10)
+        assert await filecore.reserve_space(owner_id, 10, quota=20) is True
+
+    async def test_when_usage_is_not_cached(
+        self, filecore: FileCoreService, file_factory: FileFactory, namespace: Namespace
+    ):
+        # GIVEN
+        owner_id = namespace.owner_id
+        await file_factory(namespace.path, "f.txt")
+        assert await filecore.reserve_space(owner_id, 5, quota=20) is True
+        await cache.delete(f"space_used:{owner_id}")
+        # WHEN
+        result = await filecore.reserve_space(owner_id, 6, quota=20)
+        # THEN
+        assert result is False
+
+    async def test_file_is_not_counted_twice(
+        self, filecore: FileCoreService, namespace: Namespace, content: IBlobContent
+    ):
+        # GIVEN
+        owner_id = namespace.owner_id
+        assert await filecore.reserve_space(owner_id, content.size, quota=100)
+        await filecore.create_file(namespace.path, "f.txt", content)
+        # WHEN
+        await filecore.release_space(owner_id, content.size)
+        # THEN
+        assert await filecore.get_space_used(owner_id) == content.size
+        assert await filecore.reserve_space(owner_id, 100 - content.size, quota=100)
+
+    async def test_release_after_reservations_expired(
+        self, filecore: FileCoreService, namespace: Namespace
+    ):
+        # GIVEN
+        owner_id = namespace.owner_id
+        await filecore.release_space(owner_id, 10)
+        # WHEN
+        result = await filecore.reserve_space(owner_id, 11, quota=10)
+        # THEN
+        assert result is False
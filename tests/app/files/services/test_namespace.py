@@ -77,9 +77,42 @@ class TestGetSpaceUsedByOwnerID:
     async def test(self, ns_service: NamespaceService):
         # GIVEN
         owner_id = uuid.uuid4()
-        db = cast(mock.MagicMock, ns_service.db)
+        filecore = cast(mock.MagicMock, ns_service.filecore)
         # WHEN
         result = await ns_service.get_space_used_by_owner_id(owner_id)
         # THEN
-        assert result == db.namespace.get_space_used_by_owner_id.return_value
-        db.namespace.get_space_used_by_owner_id.assert_awaited_once_with(owner_id)
+        assert result == filecore.get_space_used.return_value
+        filecore.get_space_used.assert_awaited_once_with(owner_id)
+
+
+class TestReconcileSpaceUsed:
+    async def test(self, ns_service: NamespaceService):
+        # GIVEN
+        filecore = cast(mock.MagicMock, ns_service.filecore)
+        # WHEN
+        await ns_service.reconcile_space_used()
+        # THEN
+        filecore.reconcile_space_used.assert_awaited_once_with()
+
+
+class TestReleaseSpace:
+    async def test(self, ns_service: NamespaceService):
+        # GIVEN
+        owner_id = uuid.uuid4()
+        filecore = cast(mock.MagicMock, ns_service.filecore)
+        # WHEN
+        await ns_service.release_space(owner_id, 512)
+        # THEN
+        filecore.release_space.assert_awaited_once_with(owner_id, 512)
+
+
+class TestReserveSpace:
+    async def test(self, ns_service: NamespaceService):
+        # GIVEN
+        owner_id = uuid.uuid4()
+        filecore = cast(mock.MagicMock, ns_service.filecore)
+        # WHEN
+        result = await ns_service.reserve_space(owner_id, 512, 1024)
+        # THEN
+        assert result == filecore.reserve_space.return_value
+        filecore.reserve_space.assert_awaited_once_with(owner_id, 512, 1024)
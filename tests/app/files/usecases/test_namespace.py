@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import logging
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING, cast
 from unittest import mock
 
@@ -9,12 +10,17 @@ import freezegun
 import pytest
 
 from app.app.files.domain import File, Path
+from app.app.files.usecases import namespace as namespace_module
+from app.app.files.usecases.namespace import _group_conflicting
 from app.app.users.domain import Account
 from app.config import config
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
     from uuid import UUID
 
+    from pytest import LogCaptureFixture
+
     from app.app.blobs.domain import IBlobContent
     from app.app.files.domain import AnyPath
     from app.app.files.usecases import NamespaceUseCase
@@ -76,7 +82,8 @@ class TestAddFile:
         owner_id = ns_service.get_by_path.return_value.owner_id
 
         user_service.get_account.assert_awaited_once_with(owner_id)
-        ns_service.get_space_used_by_owner_id.assert_not_awaited()
+        ns_service.reserve_space.assert_not_awaited()
+        ns_service.release_space.assert_not_awaited()
         blob_processor.process_async.assert_awaited_once_with(result.blob_id)
         audit_trail.file_added.assert_called_once_with(result)
 
@@ -88,7 +95,7 @@ class TestAddFile:
         blob_processor = cast(mock.MagicMock, ns_use_case.blob_processor)
         file_service = cast(mock.MagicMock, ns_use_case.file)
         ns_service = cast(mock.MagicMock, ns_use_case.namespace)
-        ns_service.get_space_used_by_owner_id = mock.AsyncMock(return_value=512)
+        ns_service.reserve_space.return_value = True
         user_service = cast(mock.MagicMock, ns_use_case.user)
         user_service.get_account.return_value = _make_account(storage_quota=1024)
 
@@ -105,10 +112,31 @@ class TestAddFile:
         owner_id = ns_service.get_by_path.return_value.owner_id
 
         user_service.get_account.assert_awaited_once_with(owner_id)
-        ns_service.get_space_used_by_owner_id.assert_awaited_once_with(owner_id)
+        ns_service.reserve_space.assert_awaited_once_with(owner_id, content.size, 1024)
+        ns_service.release_space.assert_awaited_once_with(owner_id, content.size)
         blob_processor.process_async.assert_awaited_once_with(result.blob_id)
         audit_trail.file_added.assert_called_once_with(result)
 
+    async def test_releasing_reserved_space_on_failure(
+        self, ns_use_case: NamespaceUseCase, content: IBlobContent
+    ):
+        # GIVEN
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.create_file.side_effect = File.NotADirectory
+        ns_service = cast(mock.MagicMock, ns_use_case.namespace)
+        ns_service.reserve_space.return_value = True
+        user_service = cast(mock.MagicMock, ns_use_case.user)
+        user_service.get_account.return_value = _make_account(storage_quota=1024)
+
+        ns_path, path = "admin", "f.txt"
+        # WHEN
+        with pytest.raises(File.NotADirectory):
+            await ns_use_case.add_file(ns_path, path, content)
+
+        # THEN
+        owner_id = ns_service.get_by_path.return_value.owner_id
+        ns_service.release_space.assert_awaited_once_with(owner_id, content.size)
+
     async def test_when_adding_to_trash_folder(
         self, ns_use_case: NamespaceUseCase, content: IBlobContent
     ):
@@ -134,7 +162,7 @@ class TestAddFile:
         blob_processor = cast(mock.MagicMock, ns_use_case.blob_processor)
         file_service = cast(mock.MagicMock, ns_use_case.file)
         ns_service = cast(mock.MagicMock, ns_use_case.namespace)
-        ns_service.get_space_used_by_owner_id = mock.AsyncMock(return_value=1024)
+        ns_service.reserve_space.return_value = False
         user_service = cast(mock.MagicMock, ns_use_case.user)
         user_service.get_account.return_value = _make_account(storage_quota=1024)
 
@@ -148,7 +176,8 @@ class TestAddFile:
 
         owner_id = ns_service.get_by_path.return_value.owner_id
         user_service.get_account.assert_awaited_once_with(owner_id)
-        ns_service.get_space_used_by_owner_id.assert_awaited_once_with(owner_id)
+        ns_service.reserve_space.assert_awaited_once_with(owner_id, content.size, 1024)
+        ns_service.release_space.assert_not_awaited()
         blob_processor.process_async.assert_not_awaited()
         audit_trail.file_added.assert_not_called()
 
@@ -263,11 +292,38 @@ class TestGetFileThumbnail:
         thumbnailer = cast(mock.MagicMock, ns_use_case.thumbnailer)
         thumbnail = thumbnailer.thumbnail.return_value
         # WHEN
-        result = await ns_use_case.get_file_thumbnail(ns_path, file.id, size=32)
+        result = await ns_use_case.get_file_thumbnail(
+            ns_path, file.id, size=32, output_type=MediaType.IMAGE_AVIF
+        )
         # THEN
         assert result == (file, *thumbnail)
         file_service.get_by_id.assert_awaited_once_with(ns_path, file.id)
-        thumbnailer.thumbnail.assert_awaited_once_with(file.blob_id, file.chash, 32)
+        thumbnailer.thumbnail.assert_awaited_once_with(
+            file.blob_id, file.chash, 32, MediaType.IMAGE_AVIF
+        )
+
+
+class TestGetFileThumbnailBatch:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        ns_path = "admin"
+        files = [_make_file(ns_path, "a.jpeg"), _make_file(ns_path, "b.jpeg")]
+        ids = [file.id for file in files]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.get_by_id_batch.return_value = files
+        thumbnailer = cast(mock.MagicMock, ns_use_case.thumbnailer)
+        # WHEN
+        result = await ns_use_case.get_file_thumbnail_batch(
+            ns_path, ids, size=32, output_type=MediaType.IMAGE_AVIF
+        )
+        # THEN
+        assert result == thumbnailer.thumbnail_batch.return_value
+        file_service.get_by_id_batch.assert_awaited_once_with(ns_path, ids)
+        thumbnailer.thumbnail_batch.assert_called_once_with(
+            [(file.id, file.blob_id, file.chash) for file in files],
+            32,
+            MediaType.IMAGE_AVIF,
+        )
 
 
 class TestGetItemAtPath:
@@ -321,6 +377,56 @@ class TestListFolder:
         file_service.list_folder.assert_awaited_once_with(ns_path, path)
 
 
+class TestDeleteItemBatch:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        ns_path, paths = "admin", ["a.txt", "b.txt", "b.txt/c.txt", "d.txt"]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.delete.side_effect = lambda ns_path, path: (
+            _make_file(ns_path, path) if path != "d.txt" else File.NotFound()
+        )
+        # WHEN
+        results = await ns_use_case.delete_item_batch(ns_path, paths)
+        # THEN
+        assert [getattr(r, "path", None) for r in results] == paths[:3] + [None]
+        assert isinstance(results[3], File.NotFound)
+        file_service.defer_size_updates.assert_called_once_with()
+        # conflicting items run in the original order after independent ones
+        deleted = [c.args[1] for c in file_service.delete.await_args_list]
+        assert deleted[-2:] == ["b.txt", "b.txt/c.txt"]
+
+    async def test_reporting_results(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        ns_path, paths = "admin", ["a.txt", "a.txt/b.txt", "c.txt"]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.delete.side_effect = [
+            _make_file(ns_path, "c.txt"), File.NotFound(), Exception(),
+        ]
+        on_result = mock.AsyncMock()
+        # WHEN
+        results = await ns_use_case.delete_item_batch(
+            ns_path, paths, on_result=on_result
+        )
+        # THEN
+        on_result.assert_has_awaits([
+            mock.call(2, results[2]),
+            mock.call(0, results[0]),
+            mock.call(1, results[1]),
+        ])
+
+
+class TestGroupConflicting:
+    @pytest.mark.parametrize(["keys", "expected"], [
+        ([["a"], ["b"], ["a b"]], [[0], [1], [2]]),
+        ([["a"], ["A/b"], ["c"]], [[0, 1], [2]]),
+        ([["a/b", "c"], ["d", "c/e"], ["f"]], [[0, 1], [2]]),
+        ([["a/b"], ["a b"], ["a/b/c"]], [[0, 2], [1]]),
+        ([["x", "Trash/f.txt"], ["y/f.txt", "Trash/F.txt"]], [[0, 1]]),
+    ])
+    def test(self, keys: list[list[str]], expected: list[list[int]]):
+        assert _group_conflicting(keys) == expected
+
+
 class TestMoveItem:
     async def test(self, ns_use_case: NamespaceUseCase):
         # GIVEN
@@ -344,6 +450,29 @@ class TestMoveItem:
         assert str(excinfo.value) == "Can't move Home or Trash folder."
 
 
+class TestMoveItemBatch:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        ns_path = "admin"
+        relocations = [("a", "b"), ("c", "d"), ("b/e", "f")]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.move.side_effect = [
+            _make_file(ns_path, "d"), _make_file(ns_path, "b"), Exception(),
+        ]
+        # WHEN
+        results = await ns_use_case.move_item_batch(ns_path, relocations)
+        # THEN
+        assert len(results) == 3
+        assert isinstance(results[0], File)
+        assert isinstance(results[1], File)
+        assert isinstance(results[2], Exception)
+        file_service.move.assert_has_awaits([
+            mock.call(ns_path, "c", "d"),
+            mock.call(ns_path, "a", "b"),
+            mock.call(ns_path, "b/e", "f"),
+        ])
+
+
 class TestMoveItemToTrash:
     async def test(self, ns_use_case: NamespaceUseCase):
         # GIVEN
@@ -374,3 +503,121 @@ class TestMoveItemToTrash:
             ns_path, Path("Trash/f.txt")
         )
         file_service.move.assert_awaited_once_with(ns_path, path, next_path)
+
+
+class TestMoveItemToTrashBatch:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        ns_path, paths = "admin", ["a/f.txt", "b/f.txt", "c.txt"]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.exists_at_path.return_value = False
+        # WHEN
+        results = await ns_use_case.move_item_to_trash_batch(ns_path, paths)
+        # THEN
+        assert results == [file_service.move.return_value] * 3
+        # items trashed under the same name are not moved concurrently
+        moved = [c.args[1] for c in file_service.move.await_args_list]
+        assert moved == ["c.txt", "a/f.txt", "b/f.txt"]
+
+
+class TestPurgeDeletedFiles:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        # WHEN
+        await ns_use_case.purge_deleted_files()
+        # THEN
+        file_service.purge_deleted.assert_awaited_once_with()
+
+
+class TestPurgeExpiredTrash:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        now = datetime(2000, 1, 1, tzinfo=UTC)
+        files = [
+            _make_file("admin", "Trash/a.txt"),
+            _make_file("user", "Trash/b.txt"),
+            _make_file("admin", "Trash/c.txt"),
+        ]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.list_trashed.return_value = files
+        # WHEN
+        with (
+            mock.patch.object(config.features, "trash_retention", timedelta(1)),
+            freezegun.freeze_time(now, real_asyncio=True),
+        ):
+            await ns_use_case.purge_expired_trash()
+        # THEN
+        file_service.list_trashed.assert_awaited_once_with(
+            now - timedelta(1), limit=100
+        )
+        assert file_service.delete.await_args_list == [
+            mock.call("admin", files[0].path),
+            mock.call("admin", files[2].path),
+            mock.call("user", files[1].path),
+        ]
+        assert file_service.defer_size_updates.call_count == 2
+
+    async def test_when_item_is_restored_in_the_meantime(
+        self, ns_use_case: NamespaceUseCase
+    ):
+        # GIVEN
+        files = [_make_file("admin", "Trash/a.txt"), _make_file("admin", "Trash/b.txt")]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.list_trashed.return_value = files
+        file_service.delete.side_effect = [File.NotFound, files[1]]
+        # WHEN
+        await ns_use_case.purge_expired_trash()
+        # THEN
+        assert file_service.delete.await_count == 2
+
+    async def test_when_item_fails_to_be_deleted(
+        self, caplog: LogCaptureFixture, ns_use_case: NamespaceUseCase
+    ):
+        # GIVEN
+        files = [_make_file("admin", "Trash/a.txt"), _make_file("user", "Trash/b.txt")]
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.list_trashed.return_value = files
+        file_service.delete.side_effect = [Exception, files[1]]
+        # WHEN
+        await ns_use_case.purge_expired_trash()
+        # THEN
+        assert file_service.delete.await_args_list == [
+            mock.call("admin", files[0].path),
+            mock.call("user", files[1].path),
+        ]
+        assert caplog.record_tuples == [
+            (
+                "app.app.files.usecases.namespace",
+                logging.ERROR,
+                "Failed to purge Trash/a.txt from the Trash of admin",
+            ),
+        ]
+
+    async def test_run_is_capped(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        file_service = cast(mock.MagicMock, ns_use_case.file)
+        file_service.list_trashed.return_value = [_make_file("admin", "Trash/a.txt")]
+        features = config.features
+        # WHEN
+        with (
+            mock.patch.object(features, "trash_purge_batch_size", 1),
+            mock.patch.object(features, "trash_purge_max_batches", 3),
+            mock.patch.object(features, "trash_purge_pause", timedelta(seconds=5)),
+            mock.patch.object(namespace_module.asyncio, "sleep") as sleep_mock,
+        ):
+            await ns_use_case.purge_expired_trash()
+        # THEN
+        assert file_service.list_trashed.await_count == 3
+        assert file_service.delete.await_count == 3
+        assert sleep_mock.await_args_list == [mock.call(5), mock.call(5)]
+
+
+class TestReconcileSpaceUsage:
+    async def test(self, ns_use_case: NamespaceUseCase):
+        # GIVEN
+        ns_service = cast(mock.MagicMock, ns_use_case.namespace)
+        # WHEN
+        await ns_use_case.reconcile_space_usage()
+        # THEN
+        ns_service.reconcile_space_used.assert_awaited_once_with()
@@ -8,6 +8,7 @@ import pytest
 
 from app.app.files.domain import File
 from app.config import config
+from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
     from app.app.files.usecases import SharingUseCase
@@ -96,12 +97,16 @@ class TestGetLinkThumbnail:
         thumbnailer = cast(mock.MagicMock, sharing_use_case.thumbnailer)
         thumbnail = thumbnailer.thumbnail.return_value
         # WHEN
-        result = await sharing_use_case.get_link_thumbnail(token, size=32)
+        result = await sharing_use_case.get_link_thumbnail(
+            token, size=32, output_type=MediaType.IMAGE_AVIF
+        )
         # THEN
         assert result == (file, *thumbnail)
         sharing_service.get_link_by_token.assert_awaited_once_with(token)
         file_service.filecore.get_by_id.assert_awaited_once_with(link.file_id)
-        thumbnailer.thumbnail.assert_awaited_once_with(file.blob_id, file.chash, 32)
+        thumbnailer.thumbnail.assert_awaited_once_with(
+            file.blob_id, file.chash, 32, MediaType.IMAGE_AVIF
+        )
 
 
 class TestGetSharedItem:
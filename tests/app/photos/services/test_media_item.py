@@ -399,6 +399,18 @@ class TestListDeleted:
         db.media_item.list_deleted.assert_awaited_once_with(user_id, offset=0, limit=50)
 
 
+class TestListDeletedBefore:
+    async def test(self, media_item_service: MediaItemService):
+        # GIVEN
+        before = timezone.now()
+        db = cast(mock.AsyncMock, media_item_service.db)
+        # WHEN
+        result = await media_item_service.list_deleted_before(before, limit=50)
+        # THEN
+        assert result == db.media_item.list_deleted_before.return_value
+        db.media_item.list_deleted_before.assert_awaited_once_with(before, 50)
+
+
 class TestListFavouriteIDs:
     async def test(self, media_item_service: MediaItemService):
         # GIVEN
@@ -2,14 +2,18 @@ from __future__ import annotations
 
 import uuid
 from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING, cast
 from unittest import mock
 
+import freezegun
 import pytest
 
 from app.app.blobs.domain import BlobMetadata
 from app.app.photos.domain import MediaItem
 from app.app.photos.services.media_item import DownloadMediaItem, DownloadSessionInfo
+from app.app.photos.usecases import media_item as media_item_module
+from app.config import config
 from app.toolkit import timezone
 from app.toolkit.mediatypes import MediaType
 from app.toolkit.metadata import Exif
@@ -338,6 +342,54 @@ class TestPurge:
         media_item_service.delete_permanently.assert_awaited_once_with(ids)
 
 
+class TestPurgeExpired:
+    async def test(self, media_item_use_case: MediaItemUseCase):
+        # GIVEN
+        now = datetime(2000, 1, 1, tzinfo=UTC)
+        items = [_make_media_item(), _make_media_item()]
+        media_item_service = cast(mock.MagicMock, media_item_use_case.media_item)
+        media_item_service.list_deleted_before.return_value = items
+        # WHEN
+        with (
+            mock.patch.object(config.features, "trash_retention", timedelta(1)),
+            freezegun.freeze_time(now, real_asyncio=True),
+        ):
+            await media_item_use_case.purge_expired()
+        # THEN
+        media_item_service.list_deleted_before.assert_awaited_once_with(
+            now - timedelta(1), limit=100
+        )
+        media_item_service.delete_permanently.assert_awaited_once_with(
+            [item.id for item in items]
+        )
+
+    async def test_when_nothing_expired(self, media_item_use_case: MediaItemUseCase):
+        # GIVEN
+        media_item_service = cast(mock.MagicMock, media_item_use_case.media_item)
+        media_item_service.list_deleted_before.return_value = []
+        # WHEN
+        await media_item_use_case.purge_expired()
+        # THEN
+        media_item_service.delete_permanently.assert_not_awaited()
+
+    async def test_run_is_capped(self, media_item_use_case: MediaItemUseCase):
+        # GIVEN
+        media_item_service = cast(mock.MagicMock, media_item_use_case.media_item)
+        media_item_service.list_deleted_before.return_value = [_make_media_item()]
+        features = config.features
+        # WHEN
+        with (
+            mock.patch.object(features, "trash_purge_batch_size", 1),
+            mock.patch.object(features, "trash_purge_max_batches", 3),
+            mock.patch.object(features, "trash_purge_pause", timedelta(seconds=5)),
+            mock.patch.object(media_item_module.asyncio, "sleep") as sleep_mock,
+        ):
+            await media_item_use_case.purge_expired()
+        # THEN
+        assert media_item_service.delete_permanently.await_count == 3
+        assert sleep_mock.await_args_list == [mock.call(5), mock.call(5)]
+
+
 class TestRestoreBatch:
     async def test(self, media_item_use_case: MediaItemUseCase):
         # GIVEN
@@ -361,13 +413,39 @@ class TestThumbnail:
         thumbnailer = cast(mock.MagicMock, media_item_use_case.thumbnailer)
         thumbnail = thumbnailer.thumbnail.return_value
         # WHEN
-        result = await media_item_use_case.thumbnail(owner_id, media_item_id, size=72)
+        result = await media_item_use_case.thumbnail(
+            owner_id, media_item_id, size=72, output_type=MediaType.IMAGE_AVIF
+        )
         # THEN
         assert result == (item, *thumbnail)
         media_item_service.get_for_owner.assert_awaited_once_with(
             owner_id, media_item_id
         )
-        thumbnailer.thumbnail.assert_awaited_once_with(item.blob_id, item.chash, 72)
+        thumbnailer.thumbnail.assert_awaited_once_with(
+            item.blob_id, item.chash, 72, MediaType.IMAGE_AVIF
+        )
+
+
+class TestThumbnailBatch:
+    async def test(self, media_item_use_case: MediaItemUseCase):
+        # GIVEN
+        owner_id = uuid.uuid7()
+        item = _make_media_item(owner_id=owner_id)
+        another_owner_item = _make_media_item()
+        ids = [item.id, another_owner_item.id]
+        media_item_service = cast(mock.MagicMock, media_item_use_case.media_item)
+        media_item_service.get_by_id_batch.return_value = [item, another_owner_item]
+        thumbnailer = cast(mock.MagicMock, media_item_use_case.thumbnailer)
+        # WHEN
+        result = await media_item_use_case.thumbnail_batch(
+            owner_id, ids, size=72, output_type=MediaType.IMAGE_AVIF
+        )
+        # THEN
+        assert result == thumbnailer.thumbnail_batch.return_value
+        media_item_service.get_by_id_batch.assert_awaited_once_with(ids)
+        thumbnailer.thumbnail_batch.assert_called_once_with(
+            [(item.id, item.blob_id, item.chash)], 72, MediaType.IMAGE_AVIF
+        )
 
 
 class TestUnmarkFavouriteBatch:
@@ -7,6 +7,7 @@ from tortoise.context import TortoiseContext
 from tortoise.contrib.test import tortoise_test_context, truncate_all_models
 from tortoise.transactions import in_transaction
 
+from app.cache import local_cache
 from app.config import TortoiseConfig, config
 from app.infrastructure.database.tortoise import TortoiseDatabase
 from app.infrastructure.database.tortoise.db import TORTOISE_MODELS
@@ -90,9 +91,11 @@ async def tortoise_database(
             yield db
         finally:
             await truncate_all_models()
+            await local_cache.clear()
     else:
         async with in_transaction("default") as tx:
             try:
                 yield db
             finally:
                 await tx.rollback()
+                await local_cache.clear()
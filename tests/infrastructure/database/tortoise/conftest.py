@@ -80,7 +80,9 @@ if TYPE_CHECKING:
         ) -> BlobJob: ...
 
     class BlobMetadataFactory(Protocol):
-        async def __call__(self, blob_id: UUID, data: Exif) -> BlobMetadata: ...
+        async def __call__(
+            self, blob_id: UUID, data: Exif | None, placeholder: str | None = None
+        ) -> BlobMetadata: ...
 
     class FileFactory(Protocol):
         async def __call__(
@@ -283,8 +285,12 @@ def blob_factory(blob_repo: IBlobRepository) -> BlobFactory:
 def blob_metadata_factory(
     blob_metadata_repo: IBlobMetadataRepository,
 ) -> BlobMetadataFactory:
-    async def factory(blob_id: UUID, data: Exif) -> BlobMetadata:
-        return await blob_metadata_repo.save(BlobMetadata(blob_id=blob_id, data=data))
+    async def factory(
+        blob_id: UUID, data: Exif | None, placeholder: str | None = None
+    ) -> BlobMetadata:
+        return await blob_metadata_repo.save(
+            BlobMetadata(blob_id=blob_id, data=data, placeholder=placeholder)
+        )
     return factory
 
 
@@ -20,6 +20,7 @@ if TYPE_CHECKING:
     )
     from tests.infrastructure.database.tortoise.conftest import (
         AlbumFactory,
+        BlobMetadataFactory,
         MediaItemFactory,
     )
 
@@ -203,6 +204,26 @@ class TestListByOwnerID:
         # THEN
         assert result == sorted(albums, key=operator.attrgetter("title"))[2:4]
 
+    async def test_cover_placeholders_are_loaded(
+        self,
+        album_repo: AlbumRepository,
+        album_factory: AlbumFactory,
+        blob_metadata_factory: BlobMetadataFactory,
+        media_item_factory: MediaItemFactory,
+        user: User,
+    ):
+        # GIVEN
+        placeholder = "data:image/webp;base64,"
+        item = await media_item_factory(user.id)
+        await blob_metadata_factory(item.blob_id, data=None, placeholder=placeholder)
+        await album_factory(user.id, cover_media_item_id=item.id)
+        # WHEN
+        result = await album_repo.list_by_owner_id(user.id, offset=0)
+        # THEN
+        assert result[0].cover == Album.Cover(
+            media_item_id=item.id, placeholder=placeholder
+        )
+
     async def test_when_empty(self, album_repo: AlbumRepository, user: User):
         # WHEN
         result = await album_repo.list_by_owner_id(user.id, offset=0)
@@ -15,7 +15,10 @@ if TYPE_CHECKING:
     from uuid import UUID
 
     from app.infrastructure.database.tortoise.repositories import BlobRepository
-    from tests.infrastructure.database.tortoise.conftest import BlobFactory
+    from tests.infrastructure.database.tortoise.conftest import (
+        BlobFactory,
+        BlobMetadataFactory,
+    )
 
 pytestmark = [pytest.mark.anyio, pytest.mark.database]
 
@@ -113,6 +116,33 @@ class TestExistsWithStorageKey:
         assert not await blob_repo.exists_with_storage_key(uuid.uuid4().hex)
 
 
+class TestListIdsWithoutMetadata:
+    async def test(
+        self,
+        blob_repo: BlobRepository,
+        blob_factory: BlobFactory,
+        blob_metadata_factory: BlobMetadataFactory,
+    ):
+        # GIVEN
+        created_after = timezone.now()
+        blobs = [
+            await blob_factory(media_type="image/jpeg"),
+            await blob_factory(media_type="image/jpeg"),
+            await blob_factory(media_type="plain/text"),
+            await blob_factory(media_type="image/png"),
+        ]
+        await blob_metadata_factory(blobs[1].id, data=None)
+        created_before = timezone.now()
+        await blob_factory(media_type="image/jpeg")
+        media_types = ["image/jpeg", "image/png"]
+        # WHEN
+        result = await blob_repo.list_ids_without_metadata(
+            created_after, created_before, media_types
+        )
+        # THEN
+        assert result == [blobs[0].id, blobs[3].id]
+
+
 class TestReplaceStorageKeyPrefix:
     async def test(self, blob_repo: BlobRepository, blob_factory: BlobFactory):
         # GIVEN
@@ -169,3 +199,24 @@ class TestUpdate:
         assert saved.size == fields["size"]
         assert saved.chash == fields["chash"]
         assert saved.media_type == fields["media_type"]
+
+
+class TestUpdateStorageKeyBatch:
+    async def test(self, blob_repo: BlobRepository, blob_factory: BlobFactory):
+        # GIVEN
+        blob_a = await blob_factory(storage_key="admin/a.txt")
+        blob_b = await blob_factory(storage_key="admin/b.txt")
+        blob_c = await blob_factory(storage_key="admin/c.txt")
+        # WHEN
+        await blob_repo.update_storage_key_batch([
+            (blob_a.id, "admin/x.txt"),
+            (blob_b.id, "admin/y.txt"),
+            (uuid.uuid7(), "admin/z.txt"),
+        ])
+        # THEN
+        assert (await _get_blob(blob_a.id)).storage_key == "admin/x.txt"
+        assert (await _get_blob(blob_b.id)).storage_key == "admin/y.txt"
+        assert (await _get_blob(blob_c.id)).storage_key == "admin/c.txt"
+
+    async def test_when_empty(self, blob_repo: BlobRepository):
+        await blob_repo.update_storage_key_batch([])
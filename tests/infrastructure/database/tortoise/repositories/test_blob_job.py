@@ -10,6 +10,7 @@ from app.app.blobs.domain import BlobJob
 from app.app.blobs.domain.blob_job import BlobJobDeletePayload, BlobJobMovePayload
 from app.app.infrastructure.database import SENTINEL_ID
 from app.infrastructure.database.tortoise import models
+from app.toolkit import timezone
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -69,6 +70,22 @@ class TestGetByIdBatch:
         assert sorted(result, key=operator.attrgetter("created_at")) == items[:2]
 
 
+class TestListIds:
+    async def test(
+        self,
+        blob_job_repo: BlobJobRepository,
+        blob_job_factory: BlobJobFactory,
+    ):
+        # GIVEN
+        items = [await blob_job_factory(), await blob_job_factory()]
+        created_before = timezone.now()
+        await blob_job_factory()
+        # WHEN
+        result = await blob_job_repo.list_ids(created_before=created_before)
+        # THEN
+        assert result == [item.id for item in items]
+
+
 class TestSaveBatch:
     async def test(self, blob_job_repo: BlobJobRepository):
         # GIVEN
@@ -40,6 +40,22 @@ class TestGetByBlobId:
         # THEN
         assert result == metadata
 
+    async def test_with_placeholder_only(
+        self,
+        blob_metadata_repo: BlobMetadataRepository,
+        blob_factory: BlobFactory,
+        blob_metadata_factory: BlobMetadataFactory
+    ):
+        # GIVEN
+        blob = await blob_factory()
+        metadata = await blob_metadata_factory(
+            blob_id=blob.id, data=None, placeholder="data:image/webp;base64,"
+        )
+        # WHEN
+        result = await blob_metadata_repo.get_by_blob_id(blob.id)
+        # THEN
+        assert result == metadata
+
     async def test_when_not_found(
         self, blob_metadata_repo: BlobMetadataRepository
     ):
@@ -50,6 +66,35 @@ class TestGetByBlobId:
             await blob_metadata_repo.get_by_blob_id(blob_id)
 
 
+class TestGetByChash:
+    async def test(
+        self,
+        blob_metadata_repo: BlobMetadataRepository,
+        blob_factory: BlobFactory,
+        blob_metadata_factory: BlobMetadataFactory
+    ):
+        # GIVEN
+        blob = await blob_factory(chash="a" * 64, media_type="image/jpeg")
+        metadata = await blob_metadata_factory(blob_id=blob.id, data=Exif(width=1280))
+        # WHEN
+        result = await blob_metadata_repo.get_by_chash(blob.chash, "image/jpeg")
+        # THEN
+        assert result == metadata
+
+    async def test_when_media_type_differs(
+        self,
+        blob_metadata_repo: BlobMetadataRepository,
+        blob_factory: BlobFactory,
+        blob_metadata_factory: BlobMetadataFactory
+    ):
+        # GIVEN
+        blob = await blob_factory(chash="a" * 64, media_type="image/jpeg")
+        await blob_metadata_factory(blob_id=blob.id, data=Exif(width=1280))
+        # WHEN / THEN
+        with pytest.raises(BlobMetadata.NotFound):
+            await blob_metadata_repo.get_by_chash(blob.chash, "image/png")
+
+
 class TestSave:
     async def test(
         self,
@@ -78,3 +123,44 @@ class TestSave:
         # WHEN / THEN
         with pytest.raises(Blob.NotFound):
             await blob_metadata_repo.save(metadata)
+
+
+class TestSaveBatch:
+    async def test(
+        self,
+        blob_metadata_repo: BlobMetadataRepository,
+        blob_factory: BlobFactory,
+    ):
+        # GIVEN
+        blobs = [await blob_factory(), await blob_factory()]
+        items = [
+            BlobMetadata(blob_id=blobs[0].id, data=Exif(width=1280, height=800)),
+            BlobMetadata(blob_id=blobs[1].id, data=None, placeholder="data:,"),
+        ]
+        # WHEN
+        await blob_metadata_repo.save_batch(items)
+        # THEN
+        for item in items:
+            assert await blob_metadata_repo.get_by_blob_id(item.blob_id) == item
+
+    async def test_skips_missing_blobs_and_existing_metadata(
+        self,
+        blob_metadata_repo: BlobMetadataRepository,
+        blob_factory: BlobFactory,
+        blob_metadata_factory: BlobMetadataFactory,
+    ):
+        # GIVEN
+        blob = await blob_factory()
+        metadata = await blob_metadata_factory(blob_id=blob.id, data=Exif(width=1280))
+        items = [
+            BlobMetadata(blob_id=blob.id, data=Exif(width=640)),
+            BlobMetadata(blob_id=uuid.uuid4(), data=Exif(width=640)),
+        ]
+        # WHEN
+        await blob_metadata_repo.save_batch(items)
+        # THEN
+        assert await blob_metadata_repo.get_by_blob_id(blob.id) == metadata
+        assert await models.BlobMetadata.all().count() == 1
+
+    async def test_empty_batch(self, blob_metadata_repo: BlobMetadataRepository):
+        await blob_metadata_repo.save_batch([])
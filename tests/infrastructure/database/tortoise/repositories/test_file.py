@@ -2,26 +2,32 @@ from __future__ import annotations
 
 import operator
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from io import BytesIO
 from typing import TYPE_CHECKING
 
 import pytest
 
-from app.app.files.domain import File, Path
+from app.app.files.domain import File, Namespace, Path
 from app.app.files.repositories.file import FileUpdate
 from app.app.infrastructure.database import SENTINEL_ID
 from app.infrastructure.database.tortoise import models
-from app.toolkit import chash
+from app.infrastructure.database.tortoise.repositories.file import (
+    _FIELDS,
+    _from_db,
+    _from_row,
+)
+from app.toolkit import chash, timezone
 from app.toolkit.mediatypes import MediaType
 
 if TYPE_CHECKING:
     from uuid import UUID
 
-    from app.app.files.domain import AnyPath, Namespace
+    from app.app.files.domain import AnyPath
     from app.infrastructure.database.tortoise.repositories import FileRepository
     from tests.infrastructure.database.tortoise.conftest import (
         BlobFactory,
+        BlobMetadataFactory,
         FileFactory,
         FolderFactory,
     )
@@ -29,6 +35,14 @@ if TYPE_CHECKING:
 pytestmark = [pytest.mark.anyio, pytest.mark.database]
 
 
+async def _exists_at_path(ns_path: AnyPath, path: AnyPath) -> bool:
+    return await (
+        models.File
+        .filter(namespace__path=str(ns_path), path=str(path))
+        .exists()
+    )
+
+
 async def _exists_with_id(file_id: UUID) -> bool:
     return await models.File.filter(id=file_id).exists()
 
@@ -226,6 +240,63 @@ class TestDeleteBatch:
         assert await _exists_with_id(files[2].id)
 
 
+class TestDeleteByIDBatch:
+    async def test(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        files = [
+            await file_factory(namespace.path),
+            await file_factory(namespace.path),
+            await file_factory(namespace.path),
+        ]
+        await file_repo.set_deleted_at_batch([files[1].id], timezone.now())
+        # WHEN
+        await file_repo.delete_by_id_batch([files[0].id, files[1].id])
+        # THEN
+        assert not await _exists_with_id(files[0].id)
+        assert not await _exists_with_id(files[1].id)
+        assert await _exists_with_id(files[2].id)
+
+
+class TestDeleteChunkWithPrefix:
+    async def test(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "a/f.txt")
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_factory(ns_path, "A/c/f.txt")
+        await file_factory(ns_path, "a/g.txt")
+        await file_factory(ns_path, "ab/f.txt")
+        prefix = "a/"
+
+        # WHEN
+        deleted = await file_repo.delete_chunk_with_prefix(ns_path, prefix, limit=3)
+
+        # THEN
+        assert len(deleted) == 3
+        assert all(str(file.path).lower().startswith(prefix) for file in deleted)
+        for file in deleted:
+            assert not await _exists_with_id(file.id)
+
+        # WHEN
+        deleted = await file_repo.delete_chunk_with_prefix(ns_path, prefix, limit=3)
+
+        # THEN
+        assert len(deleted) == 1
+        deleted = await file_repo.delete_chunk_with_prefix(ns_path, prefix, limit=3)
+        assert deleted == []
+        assert await file_repo.exists_at_path(ns_path, "ab/f.txt")
+
+
 class TestExistsAtPath:
     async def test_when_exists(
         self, file_repo: FileRepository, file: File
@@ -242,6 +313,23 @@ class TestExistsAtPath:
         exists = await file_repo.exists_at_path(namespace.path, path)
         assert exists is False
 
+    async def test_when_parent_is_marked_as_deleted(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "a")
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN
+        exists = await file_repo.exists_at_path(ns_path, "a/b/f.txt")
+        # THEN
+        assert exists is False
+
 
 class TestExistsWithID:
     async def test_when_exists(
@@ -261,6 +349,94 @@ class TestExistsWithID:
         )
         assert exists is False
 
+    async def test_when_parent_is_marked_as_deleted(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "a")
+        file = await file_factory(ns_path, "a/b/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN
+        exists = await file_repo.exists_with_id(ns_path, file.id)
+        # THEN
+        assert exists is False
+
+
+class TestFromRow:
+    async def test(
+        self,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await folder_factory(ns_path, "a")
+        await file_factory(ns_path, "a/f.txt")
+        qs = models.File.filter(namespace__path=ns_path).order_by("path")
+        objs = await qs.select_related("blob", "namespace")
+        # WHEN
+        files = [_from_row(row) for row in await qs.values(*_FIELDS)]
+        # THEN
+        assert len(files) == 2
+        assert files == [_from_db(None, obj) for obj in objs]
+
+
+class TestGetAvailablePath:
+    @pytest.mark.parametrize(["name", "expected_name"], [
+        ("f.txt", "f (1).txt"),
+        ("f.tar.gz", "f (1).tar.gz"),
+        ("f (1).tar.gz", "f (1) (1).tar.gz"),
+    ])
+    async def test(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+        name: str,
+        expected_name: str,
+    ):
+        # GIVEN
+        await file_factory(namespace.path, f"a/{name}")
+        # WHEN
+        path = await file_repo.get_available_path(namespace.path, f"a/{name}")
+        # THEN
+        assert path == f"a/{expected_name}"
+
+    async def test_skipping_gaps(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "f.txt")
+        await file_factory(ns_path, "f (2).txt")
+        await file_factory(ns_path, "b/f (3).txt")
+        # WHEN
+        path = await file_repo.get_available_path(ns_path, "f.txt")
+        # THEN
+        assert path == "f (3).txt"
+
+    async def test_returning_path_as_is(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        await file_factory(namespace.path, "f (1).txt")
+        # WHEN
+        path = await file_repo.get_available_path(namespace.path, "f.txt")
+        # THEN
+        assert path == "f.txt"
+
 
 class TestGetById:
     async def test(self, file_repo: FileRepository, file: File):
@@ -274,6 +450,22 @@ class TestGetById:
         with pytest.raises(File.NotFound):
             await file_repo.get_by_id(file_id)
 
+    async def test_when_parent_is_marked_as_deleted(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "a")
+        file = await file_factory(ns_path, "a/b/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN / THEN
+        with pytest.raises(File.NotFound):
+            await file_repo.get_by_id(file.id)
+
 
 class TestGetByIdBatch:
     async def test(
@@ -299,6 +491,24 @@ class TestGetByIdBatch:
         result = await file_repo.get_by_id_batch(ids)
         assert result == [file]
 
+    async def test_files_inside_folder_marked_as_deleted_are_hidden(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "a")
+        file_a = await file_factory(ns_path, "a/f.txt")
+        file_b = await file_factory(ns_path, "b/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN
+        result = await file_repo.get_by_id_batch([file_a.id, file_b.id])
+        # THEN
+        assert result == [file_b]
+
 
 class TestGetByPath:
     async def test(self, file_repo: FileRepository, file: File):
@@ -314,6 +524,32 @@ class TestGetByPath:
         with pytest.raises(File.NotFound):
             await file_repo.get_by_path(namespace.path, path)
 
+    async def test_when_file_is_marked_as_deleted(
+        self, file_repo: FileRepository, file: File
+    ):
+        # GIVEN
+        await file_repo.set_deleted_at_batch([file.id], timezone.now())
+        # WHEN / THEN
+        with pytest.raises(File.NotFound):
+            await file_repo.get_by_path(file.ns_path, file.path)
+        assert not await file_repo.exists_at_path(file.ns_path, file.path)
+
+    async def test_when_parent_is_marked_as_deleted(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "a")
+        await file_factory(ns_path, "a/b/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN / THEN
+        with pytest.raises(File.NotFound):
+            await file_repo.get_by_path(ns_path, "A/b/f.txt")
+
 
 class TestGetByPathBatch:
     async def test(
@@ -344,6 +580,25 @@ class TestGetByPathBatch:
         )
         assert result == [file]
 
+    async def test_files_inside_folder_marked_as_deleted_are_hidden(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "a/b")
+        await file_factory(ns_path, "a/b/f.txt")
+        file = await file_factory(ns_path, "a/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN
+        paths = ["a/b", "a/b/f.txt", "a/f.txt"]
+        result = await file_repo.get_by_path_batch(ns_path, paths)
+        # THEN
+        assert result == [file]
+
     async def test_case_insensitiveness(
         self,
         file_repo: FileRepository,
@@ -417,6 +672,58 @@ class TestIncrSizeBatch:
         )
 
 
+class TestListDeleted:
+    async def test(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        files = [
+            await file_factory(ns_path, "a.txt"),
+            await file_factory(ns_path, "b.txt"),
+            await file_factory(ns_path, "c.txt"),
+        ]
+        now = timezone.now()
+        await file_repo.set_deleted_at_batch([files[2].id], now)
+        await file_repo.set_deleted_at_batch([files[0].id], now + timedelta(1))
+        # WHEN
+        deleted = await file_repo.list_deleted(limit=10)
+        # THEN
+        assert [file.path for file in deleted] == ["c.txt", "a.txt"]
+        assert len(await file_repo.list_deleted(limit=1)) == 1
+
+
+class TestListTrashed:
+    async def test(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        files = [
+            await file_factory(ns_path, "Trash/a.txt"),
+            await file_factory(ns_path, "Trash/b.txt"),
+            await file_factory(ns_path, "Trash/c.txt"),
+            await file_factory(ns_path, "Trash/d.txt"),
+        ]
+        now = timezone.now()
+        await file_repo.update(files[0], FileUpdate(trashed_at=now - timedelta(2)))
+        await file_repo.update(files[1], FileUpdate(trashed_at=now + timedelta(1)))
+        await file_repo.update(files[2], FileUpdate(trashed_at=now - timedelta(3)))
+        await file_repo.update(files[3], FileUpdate(trashed_at=now - timedelta(4)))
+        await file_repo.set_deleted_at_batch([files[3].id], now)
+        # WHEN
+        trashed = await file_repo.list_trashed(now, limit=10)
+        # THEN
+        assert [file.path for file in trashed] == ["Trash/c.txt", "Trash/a.txt"]
+        assert len(await file_repo.list_trashed(now, limit=1)) == 1
+
+
 class TestListWithPrefix:
     async def test(
         self,
@@ -438,6 +745,39 @@ class TestListWithPrefix:
         assert files[0].path == "home/folder"
         assert files[1].path == "home/f.txt"
 
+    async def test_files_marked_as_deleted_are_hidden(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        await file_factory(ns_path, "home/a.txt")
+        file = await file_factory(ns_path, "home/b.txt")
+        await file_repo.set_deleted_at_batch([file.id], timezone.now())
+        # WHEN
+        files = await file_repo.list_with_prefix(ns_path, "home/")
+        # THEN
+        assert [file.path for file in files] == ["home/a.txt"]
+
+    async def test_when_parent_is_marked_as_deleted(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        folder_factory: FolderFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path = namespace.path
+        folder = await folder_factory(ns_path, "home")
+        await file_factory(ns_path, "home/a/f.txt")
+        await file_repo.set_deleted_at_batch([folder.id], timezone.now())
+        # WHEN
+        files = await file_repo.list_with_prefix(ns_path, "home/a/")
+        # THEN
+        assert files == []
+
     async def test_listing_top_level(
         self,
         file_repo: FileRepository,
@@ -457,6 +797,25 @@ class TestListWithPrefix:
         assert len(files) == 1
         assert files[0].path == "home"
 
+    async def test_placeholders_are_loaded(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        blob_metadata_factory: BlobMetadataFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        ns_path, placeholder = namespace.path, "data:image/webp;base64,"
+        file = await file_factory(ns_path, "im.jpeg")
+        assert file.blob_id is not None
+        await blob_metadata_factory(file.blob_id, data=None, placeholder=placeholder)
+        await file_factory(ns_path, "f.txt")
+        # WHEN
+        files = await file_repo.list_with_prefix(ns_path, "")
+        # THEN
+        placeholders = {file.name: file.placeholder for file in files}
+        assert placeholders == {"im.jpeg": placeholder, "f.txt": None}
+
     async def test_when_folder_does_not_exist(
         self, file_repo: FileRepository, namespace: Namespace
     ):
@@ -602,6 +961,7 @@ class TestReplacePathPrefix:
         assert file.path == "c/a/b/f.txt"
 
 
+@pytest.mark.slow
 class TestSave:
     async def test(
         self,
@@ -663,6 +1023,22 @@ class TestSave:
         assert saved_folder.mediatype == MediaType.FOLDER
         assert await _get_by_id(saved_folder.id) == saved_folder
 
+    async def test_when_namespace_does_not_exist(self, file_repo: FileRepository):
+        # GIVEN
+        folder = File(
+            id=SENTINEL_ID,
+            owner_id=uuid.uuid4(),
+            name="folder",
+            ns_path="nonexistent",
+            path=Path("folder"),
+            chash=chash.EMPTY_CONTENT_HASH,
+            size=0,
+            mediatype=MediaType.FOLDER,
+        )
+        # WHEN / THEN
+        with pytest.raises(Namespace.NotFound):
+            await file_repo.save(folder)
+
     async def test_when_file_at_path_already_exists(
         self,
         file_repo: FileRepository,
@@ -803,3 +1179,17 @@ class TestUpdate:
 
         file_in_db = await _get_by_id(file.id)
         assert file_in_db == updated_file
+
+    async def test_when_file_at_path_is_marked_as_deleted(
+        self,
+        file_repo: FileRepository,
+        file_factory: FileFactory,
+        namespace: Namespace,
+    ):
+        # GIVEN
+        file = await file_factory(namespace.path, "f.txt")
+        deleted_file = await file_factory(namespace.path, "g.txt")
+        await file_repo.set_deleted_at_batch([deleted_file.id], timezone.now())
+        # WHEN / THEN
+        with pytest.raises(File.AlreadyExists):
+            await file_repo.update(file, FileUpdate(name="g.txt", path="g.txt"))
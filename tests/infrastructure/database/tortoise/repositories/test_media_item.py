@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import operator
 import uuid
+from datetime import timedelta
 from typing import TYPE_CHECKING
 
 import pytest
@@ -155,6 +156,23 @@ class TestListByOwner:
             items[0],
         ]
 
+    async def test_placeholders_are_loaded(
+        self,
+        media_item_repo: MediaItemRepository,
+        blob_metadata_factory: BlobMetadataFactory,
+        media_item_factory: MediaItemFactory,
+        user: User,
+    ):
+        # GIVEN
+        placeholder = "data:image/webp;base64,"
+        item = await media_item_factory(user.id)
+        await blob_metadata_factory(item.blob_id, data=None, placeholder=placeholder)
+        # WHEN
+        result = await media_item_repo.list_by_owner(user.id, offset=0)
+        # THEN
+        assert result[0].placeholder == placeholder
+        assert result[0].taken_at is None
+
     async def test_only_favourites(
         self,
         media_item_repo: MediaItemRepository,
@@ -224,6 +242,28 @@ class TestListDeleted:
         assert result == [items[1], items[0]]
 
 
+class TestListDeletedBefore:
+    async def test(
+        self,
+        media_item_repo: MediaItemRepository,
+        media_item_factory: MediaItemFactory,
+        user: User,
+    ):
+        # GIVEN
+        now = timezone.now()
+        items = [
+            await media_item_factory(user.id, deleted_at=now - timedelta(1)),
+            await media_item_factory(user.id, deleted_at=now - timedelta(2)),
+            await media_item_factory(user.id, deleted_at=now + timedelta(1)),
+            await media_item_factory(user.id, deleted_at=None),
+        ]
+        # WHEN
+        result = await media_item_repo.list_deleted_before(now, limit=10)
+        # THEN
+        assert result == [items[1], items[0]]
+        assert len(await media_item_repo.list_deleted_before(now, limit=1)) == 1
+
+
 class TestSetDeletedAtBatch:
     async def test(
         self,
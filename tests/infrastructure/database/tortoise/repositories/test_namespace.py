@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import uuid
 from typing import TYPE_CHECKING
+from unittest import mock
 
 import pytest
 
 from app.app.files.domain import Namespace
 from app.app.infrastructure.database import SENTINEL_ID
+from app.cache import local_cache
+from app.infrastructure.database.tortoise.repositories import (
+    namespace as namespace_module,
+)
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -47,6 +52,30 @@ class TestGetByPath:
         with pytest.raises(Namespace.NotFound):
             await namespace_repo.get_by_path("nonexistent")
 
+    async def test_namespace_is_cached(
+        self, namespace_repo: INamespaceRepository, namespace: Namespace
+    ):
+        # GIVEN
+        with mock.patch.object(namespace_module, "in_transaction", return_value=False):
+            await namespace_repo.get_by_path(namespace.path)
+        # WHEN
+        with mock.patch.object(namespace_module.models.Namespace, "get") as get_mock:
+            result = await namespace_repo.get_by_path(namespace.path)
+        # THEN
+        assert result == namespace
+        get_mock.assert_not_called()
+        cached = await local_cache.get(f"namespace:owner:{namespace.owner_id}")
+        assert cached == namespace
+
+    async def test_namespace_is_not_cached_in_transaction(
+        self, namespace_repo: INamespaceRepository, namespace: Namespace
+    ):
+        # WHEN
+        with mock.patch.object(namespace_module, "in_transaction", return_value=True):
+            await namespace_repo.get_by_path(namespace.path)
+        # THEN
+        assert await local_cache.get(f"namespace:path:{namespace.path}") is None
+
 
 class TestGetSpaceUsedByOwnerID:
     async def test_on_empty_namespace(
@@ -80,3 +109,14 @@ class TestSave:
         assert saved.id != SENTINEL_ID
         assert saved.path == user.username
         assert saved.owner_id == user.id
+
+    async def test_cached_namespace_is_invalidated(
+        self, namespace_repo: INamespaceRepository, user: User
+    ):
+        # GIVEN
+        stale = Namespace(id=uuid.uuid4(), path=user.username, owner_id=user.id)
+        await local_cache.set(f"namespace:path:{user.username}", stale)
+        # WHEN
+        saved = await namespace_repo.save(_make_namespace(user.username, user.id))
+        # THEN
+        assert await namespace_repo.get_by_path(user.username) == saved
@@ -3,12 +3,15 @@ from __future__ import annotations
 import uuid
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
+from unittest import mock
 
 import pytest
 
 from app.app.infrastructure.database import SENTINEL_ID
 from app.app.users.domain import User
+from app.cache import local_cache
 from app.infrastructure.database.tortoise import models
+from app.infrastructure.database.tortoise.repositories import user as user_module
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -64,6 +67,26 @@ class TestGet:
         with pytest.raises(User.NotFound):
             await user_repo.get(id=user_id)
 
+    async def test_user_is_cached(self, user_repo: UserRepository, user: User):
+        # GIVEN
+        with mock.patch.object(user_module, "in_transaction", return_value=False):
+            await user_repo.get(id=user.id)
+        # WHEN
+        with mock.patch.object(user_module.models.User, "get") as get_mock:
+            result = await user_repo.get(id=user.id)
+        # THEN
+        assert result == user
+        get_mock.assert_not_called()
+
+    async def test_user_is_not_cached_in_transaction(
+        self, user_repo: UserRepository, user: User
+    ):
+        # WHEN
+        with mock.patch.object(user_module, "in_transaction", return_value=True):
+            await user_repo.get(id=user.id)
+        # THEN
+        assert await local_cache.get(f"user:{user.id}") is None
+
 
 class TestSave:
     async def test(self, user_repo: IUserRepository):
@@ -123,3 +146,14 @@ class TestUpdate:
         assert result.email_verified is True
         updated_user = await _get_by_id(user.id)
         assert updated_user.email_verified is True
+
+    async def test_cached_user_is_invalidated(
+        self, user_repo: IUserRepository, user: User
+    ):
+        # GIVEN
+        await local_cache.set(f"user:{user.id}", user)
+        # WHEN
+        await user_repo.update(user.id, email_verified=True)
+        # THEN
+        retrieved_user = await user_repo.get(id=user.id)
+        assert retrieved_user.email_verified is True
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+from tortoise import connections
+from tortoise.context import TortoiseContext
+from tortoise.router import router
+from tortoise.utils import get_schema_sql
+
+from app.app.infrastructure.database import SENTINEL_ID
+from app.app.users.domain import User
+from app.config import DatabaseDSN, TortoiseConfig
+from app.infrastructure.database.tortoise import TortoiseDatabase, models, routers
+from app.toolkit import taskgroups, timezone
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable
+    from pathlib import Path
+    from uuid import UUID
+
+pytestmark = [pytest.mark.anyio]
+
+
+def _make_user(username: str) -> User:
+    return User(
+        id=SENTINEL_ID,
+        username=username,
+        password="root",
+        email=None,
+        email_verified=False,
+        display_name="",
+        created_at=timezone.now(),
+        last_login_at=None,
+        active=True,
+        superuser=False,
+    )
+
+
+@pytest.fixture
+async def database(tmp_path: Path) -> AsyncIterator[TortoiseDatabase]:
+    """A database with a primary and a single read replica, both empty."""
+    db = TortoiseDatabase(
+        TortoiseConfig(
+            dsn=DatabaseDSN(f"sqlite:///{tmp_path / 'primary.sqlite3'}"),
+            replica_dsns=[DatabaseDSN(f"sqlite:///{tmp_path / 'replica.sqlite3'}")],
+        )
+    )
+    token = routers._pinned_to_primary.set(False)
+    try:
+        async with TortoiseContext() as ctx:
+            await ctx.init(config=db._tortoise_config())
+            await ctx.generate_schemas()
+            # replicas mirror the primary, so they need the same schema
+            schema = get_schema_sql(connections.get(routers.PRIMARY), safe=True)
+            await connections.get(f"{routers.REPLICA_PREFIX}0").execute_script(schema)
+            yield db
+    finally:
+        routers._pinned_to_primary.reset(token)
+        router.init_routers([])
+
+
+async def _request[T](user_id: UUID, call: Callable[[], Awaitable[T]]) -> T:
+    """Runs a call on behalf of a user in its own context, like a request does."""
+    async def _run() -> T:
+        routers._pinned_to_primary.set(False)
+        async with routers.read_your_writes(user_id, timedelta(seconds=5)):
+            return await call()
+
+    result = await asyncio.create_task(_run())
+    await taskgroups.wait_background_tasks()
+    return result
+
+
+async def _replica_usernames() -> list[str]:
+    replica = connections.get(f"{routers.REPLICA_PREFIX}0")
+    return await models.User.all().using_db(replica).values_list("username", flat=True)
+
+
+class TestReplicaRouter:
+    async def test_reads_go_to_replica(self, database: TortoiseDatabase):
+        # GIVEN
+        replica = connections.get(f"{routers.REPLICA_PREFIX}0")
+        await models.User.create(
+            username="admin",
+            password="root",
+            display_name="",
+            created_at=timezone.now(),
+            using_db=replica,
+        )
+        # WHEN
+        user = await database.user.get(username="admin")
+        # THEN
+        assert user.username == "admin"
+
+    async def test_writes_go_to_primary(self, database: TortoiseDatabase):
+        # WHEN
+        await database.user.save(_make_user("admin"))
+        # THEN
+        assert await models.User.filter(username="admin").exists()
+        assert await _replica_usernames() == []
+
+    async def test_reads_are_pinned_to_primary_after_write(
+        self, database: TortoiseDatabase
+    ):
+        # GIVEN
+        saved = await database.user.save(_make_user("admin"))
+        # WHEN
+        user = await database.user.get(username="admin")
+        # THEN
+        assert user.id == saved.id
+
+    async def test_reads_inside_transaction_go_to_primary(
+        self, database: TortoiseDatabase
+    ):
+        # GIVEN
+        primary = connections.get(routers.PRIMARY)
+        await models.User.create(
+            username="admin",
+            password="root",
+            display_name="",
+            created_at=timezone.now(),
+            using_db=primary,
+        )
+        # WHEN
+        async with database.atomic():
+            user = await database.user.get(username="admin")
+        # THEN
+        assert user.username == "admin"
+        assert await _replica_usernames() == []
+
+
+class TestReadYourWrites:
+    async def test_reads_after_write_go_to_primary(self, database: TortoiseDatabase):
+        # GIVEN
+        user_id = uuid.uuid4()
+        await _request(user_id, lambda: database.user.save(_make_user("admin")))
+        # WHEN
+        user = await _request(user_id, lambda: database.user.get(username="admin"))
+        # THEN
+        assert user.username == "admin"
+
+    async def test_reads_of_other_users_go_to_replica(
+        self, database: TortoiseDatabase
+    ):
+        # GIVEN
+        await _request(uuid.uuid4(), lambda: database.user.save(_make_user("admin")))
+        # WHEN / THEN
+        with pytest.raises(User.NotFound):
+            await _request(uuid.uuid4(), lambda: database.user.get(username="admin"))
@@ -148,6 +148,16 @@ class TestDownload:
         content = BytesIO(b"".join([chunk async for chunk in chunks]))
         assert content.read() == b"I'm Dummy File!"
 
+    async def test_with_length(
+        self, fs_storage: FileSystemStorage, file_factory: FileFactory
+    ):
+        # GIVEN
+        await file_factory("user/f.txt")
+        # WHEN
+        chunks = fs_storage.download("user/f.txt", length=3)
+        # THEN
+        assert b"".join([chunk async for chunk in chunks]) == b"I'm"
+
     async def test_when_it_is_a_dir(
         self, fs_storage: FileSystemStorage, file_factory: FileFactory
     ):
@@ -160,6 +170,32 @@ class TestDownload:
             await anext(fs_storage.download("user/f.txt"))
 
 
+class TestOpenLocal:
+    async def test(
+        self, tmp_path: Path, fs_storage: FileSystemStorage, file_factory: FileFactory
+    ):
+        # GIVEN
+        await file_factory("user/f.txt")
+        # WHEN
+        async with fs_storage.open_local("user/f.txt") as content:
+            # THEN
+            assert content.name == str(tmp_path / "user/f.txt")
+            assert content.read() == b"I'm Dummy File!"
+
+    async def test_when_it_is_a_dir(
+        self, fs_storage: FileSystemStorage, file_factory: FileFactory
+    ):
+        await file_factory("user/a/f.txt")
+        with pytest.raises(File.NotFound):
+            async with fs_storage.open_local("user/a"):
+                pass
+
+    async def test_when_file_does_not_exist(self, fs_storage: FileSystemStorage):
+        with pytest.raises(File.NotFound):
+            async with fs_storage.open_local("user/f.txt"):
+                pass
+
+
 class TestDownloadBatch:
     async def test(self, fs_storage: FileSystemStorage, file_factory: FileFactory):
         # GIVEN
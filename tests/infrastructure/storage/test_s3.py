@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import operator
+import os.path
 from io import BytesIO
 from typing import TYPE_CHECKING, Protocol
 from zipfile import ZipFile
@@ -127,6 +128,14 @@ class TestDownload:
         content = BytesIO(b"".join([chunk async for chunk in chunks]))
         assert content.read() == b"I'm Dummy File!"
 
+    async def test_with_length(self, s3_storage: S3Storage, file_factory: FileFactory):
+        # GIVEN
+        await file_factory("user/f.txt")
+        # WHEN
+        chunks = s3_storage.download("user/f.txt", length=3)
+        # THEN
+        assert b"".join([chunk async for chunk in chunks]) == b"I'm"
+
     async def test_when_it_is_a_dir(
         self, s3_storage: S3Storage, file_factory: FileFactory
     ):
@@ -139,6 +148,22 @@ class TestDownload:
             await anext(s3_storage.download("user/f.txt"))
 
 
+class TestOpenLocal:
+    async def test(self, s3_storage: S3Storage, file_factory: FileFactory):
+        # GIVEN
+        await file_factory("user/f.txt")
+        # WHEN
+        async with s3_storage.open_local("user/f.txt", length=3) as content:
+            # THEN
+            assert os.path.isfile(content.name)
+            assert content.read() == b"I'm"
+
+    async def test_when_file_does_not_exist(self, s3_storage: S3Storage):
+        with pytest.raises(File.NotFound):
+            async with s3_storage.open_local("user/f.txt"):
+                pass
+
+
 class TestDownloadBatch:
     async def test(self, s3_storage: S3Storage, file_factory: FileFactory):
         # GIVEN
@@ -5,7 +5,7 @@ from unittest import mock
 
 import pytest
 
-from app.config import FeatureConfig
+from app.config import CacheConfig, FeatureConfig
 from app.infrastructure.context import Infrastructure, Services
 from app.infrastructure.database.tortoise.db import TortoiseDatabase
 from app.infrastructure.storage import FileSystemStorage, S3Storage
@@ -56,7 +56,8 @@ class TestServices:
         infra = mock.MagicMock(Infrastructure)
         services = Services(
             infra,
-            features=mock.MagicMock(FeatureConfig, max_file_size_to_thumbnail=1024),
+            features=FeatureConfig(max_file_size_to_thumbnail=1024),
+            caches=mock.MagicMock(CacheConfig, thumbnails_max_size=1024),
         )
         # WHEN
         services.atomic()
@@ -6,7 +6,7 @@ from arq.worker import Worker
 
 from app.app.infrastructure.worker import JobStatus
 from app.config import config
-from app.infrastructure.worker.arq import ARQWorker
+from app.infrastructure.worker.arq import QUEUE_NAMES, ARQWorker, Lane, get_queue_name
 
 pytestmark = [pytest.mark.anyio]
 
@@ -21,6 +21,12 @@ async def worker_cli():
         yield worker
 
 
+@pytest.fixture(scope="module")
+async def worker_cli_with_lanes():
+    async with ARQWorker(config.worker.model_copy(update={"lanes": True})) as worker:
+        yield worker
+
+
 @pytest.fixture(scope="module")
 async def worker(worker_cli: ARQWorker):
     return Worker(
@@ -31,6 +37,17 @@ async def worker(worker_cli: ARQWorker):
     )
 
 
+class TestGetQueueName:
+    @pytest.mark.parametrize(["job_name", "lane"], [
+        ("move_to_trash_batch", Lane.interactive),
+        ("process_blob_content_batch", Lane.bulk),
+        ("purge_deleted_files", Lane.bulk),
+        ("ping", Lane.default),
+    ])
+    def test(self, job_name: str, lane: Lane):
+        assert get_queue_name(job_name) == QUEUE_NAMES[lane]
+
+
 class TestEnqueue:
     async def test(self, worker_cli: ARQWorker, worker: Worker):
         # WHEN
@@ -41,6 +58,36 @@ class TestEnqueue:
         assert result == "pong"
 
 
+    async def test_with_job_id(self, worker_cli: ARQWorker, worker: Worker):
+        # WHEN
+        job = await worker_cli.enqueue("ping", job_id="ping:1")
+        duplicate = await worker_cli.enqueue("ping", job_id="ping:1")
+        # THEN
+        assert job.id == duplicate.id == "ping:1"
+        await worker.main()
+        assert worker.jobs_complete == 1
+
+
+    async def test_job_is_routed_to_lane(self, worker_cli_with_lanes: ARQWorker):
+        # GIVEN
+        worker_cli = worker_cli_with_lanes
+        # WHEN
+        job = await worker_cli.enqueue("process_blob_jobs", ids=[])
+        # THEN
+        queue_name = QUEUE_NAMES[Lane.bulk]
+        assert await worker_cli.pool.zscore(queue_name, job.id) is not None
+        await worker_cli.pool.zrem(queue_name, job.id)
+
+
+    async def test_job_is_not_routed_when_lanes_disabled(self, worker_cli: ARQWorker):
+        # WHEN
+        job = await worker_cli.enqueue("process_blob_jobs", ids=[])
+        # THEN
+        queue_name = QUEUE_NAMES[Lane.default]
+        assert await worker_cli.pool.zscore(queue_name, job.id) is not None
+        await worker_cli.pool.zrem(queue_name, job.id)
+
+
 class TestGetResult:
     async def test(self, worker_cli: ARQWorker, worker: Worker):
         # GIVEN
@@ -65,3 +112,32 @@ class TestGetStatus:
     async def test_pending(self, worker_cli: ARQWorker):
         status = await worker_cli.get_status("non-existing-job-id")
         assert status == JobStatus.pending
+
+
+class TestWatch:
+    async def test(self, worker_cli: ARQWorker, worker: Worker):
+        # GIVEN
+        job = await worker_cli.enqueue("ping")
+        await worker_cli.publish_progress(job.id, (0, "a"))
+        await worker_cli.publish_progress(job.id, (1, "b"))
+        await worker.main()
+        # WHEN
+        progress = [item async for item in worker_cli.watch(job.id, timeout=1)]
+        # THEN
+        assert [item.item for item in progress] == [(0, "a"), (1, "b")]
+        # WHEN watching after the last seen item
+        last_id = progress[0].id
+        progress = [
+            item async for item in worker_cli.watch(job.id, last_id=last_id)
+        ]
+        # THEN
+        assert [item.item for item in progress] == [(1, "b")]
+
+    async def test_when_job_is_pending(self, worker_cli: ARQWorker):
+        # GIVEN
+        job_id = "non-existing-job-id"
+        await worker_cli.publish_progress(job_id, (0, "a"))
+        # WHEN
+        progress = [item async for item in worker_cli.watch(job_id, timeout=0.1)]
+        # THEN
+        assert [item.item for item in progress] == [(0, "a")]
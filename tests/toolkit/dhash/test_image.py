@@ -2,17 +2,22 @@ from __future__ import annotations
 
 from importlib import resources
 from io import BytesIO
+from unittest import mock
 
 import pytest
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
 
 from app.toolkit.dhash.image import dhash_image
 
+_draft = JpegImageFile.draft
+
 
 class TestDHashImage:
     @pytest.mark.parametrize(["name_a", "name_b", "delta"], [
         ("baikal_v1.jpeg", "baikal_v2.jpeg", 1),
         ("baikal_v1.jpeg", "baikal_v3.jpeg", 24),
-        ("park_v1.jpeg", "park_v2.jpeg", 7),
+        ("park_v1.jpeg", "park_v2.jpeg", 9),
         ("park_v1.jpeg", "park_v1_downscaled.jpeg", 0),
     ])
     def test(self, name_a: str, name_b: str, delta: int):
@@ -31,3 +36,36 @@ class TestDHashImage:
         content = BytesIO(b"Dummy content")
         result = dhash_image(content)
         assert result is None
+
+
+class TestDHashImageDraft:
+    @pytest.mark.parametrize(["name", "delta"], [
+        ("baikal_v1.jpeg", 0),
+        ("park_v1.jpeg", 1),
+    ])
+    def test(self, name: str, delta: int):
+        # GIVEN
+        pkg = resources.files("tests.data.images")
+        content = BytesIO(pkg.joinpath(name).read_bytes())
+        with Image.open(content) as im:
+            full_size = im.size
+        decoded_sizes = []
+
+        def draft(im: JpegImageFile, *args):
+            result = _draft(im, *args)
+            decoded_sizes.append(im.size)
+            return result
+
+        # WHEN
+        content.seek(0)
+        with mock.patch.object(JpegImageFile, "draft", draft):
+            result = dhash_image(content)
+        content.seek(0)
+        with mock.patch.object(JpegImageFile, "draft", return_value=None):
+            full_decode_result = dhash_image(content)
+
+        # THEN
+        assert decoded_sizes == [(full_size[0] // 8, full_size[1] // 8)]
+        assert result is not None
+        assert full_decode_result is not None
+        assert (result ^ full_decode_result).bit_count() == delta
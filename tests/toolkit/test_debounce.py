@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.toolkit import taskgroups
+from app.toolkit.debounce import Debouncer
+
+pytestmark = [pytest.mark.anyio]
+
+
+class TestAdd:
+    async def test_items_within_window_are_grouped(self):
+        # GIVEN
+        batches: list[list[int]] = []
+
+        async def flush(items: list[int]) -> None:
+            batches.append(items)
+
+        debouncer = Debouncer(flush, window=0.01, max_size=10)
+        # WHEN
+        for i in range(3):
+            await debouncer.add(i)
+        assert batches == []
+        await asyncio.sleep(0.05)
+        # THEN
+        assert batches == [[0, 1, 2]]
+        assert len(debouncer) == 0
+
+    async def test_full_batch_is_flushed_right_away(self):
+        # GIVEN
+        batches: list[list[int]] = []
+
+        async def flush(items: list[int]) -> None:
+            batches.append(items)
+
+        debouncer = Debouncer(flush, window=0.01, max_size=2)
+        # WHEN
+        for i in range(3):
+            await debouncer.add(i)
+        # THEN
+        assert batches == [[0, 1]]
+        await asyncio.sleep(0.05)
+        assert batches == [[0, 1], [2]]
+
+    async def test_zero_window(self):
+        # GIVEN
+        batches: list[list[int]] = []
+
+        async def flush(items: list[int]) -> None:
+            batches.append(items)
+
+        debouncer = Debouncer(flush, window=0, max_size=10)
+        # WHEN
+        await debouncer.add(0)
+        await debouncer.add(1)
+        # THEN
+        assert batches == [[0], [1]]
+
+    async def test_pending_items_are_flushed_on_shutdown(self):
+        # GIVEN
+        batches: list[list[int]] = []
+
+        async def flush(items: list[int]) -> None:
+            batches.append(items)
+
+        debouncer = Debouncer(flush, window=0.01, max_size=10)
+        await debouncer.add(0)
+        # WHEN
+        await taskgroups.wait_background_tasks()
+        # THEN
+        assert batches == [[0]]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from app.toolkit.lru import LRUCache
+
+
+def _make_cache(max_size: int) -> LRUCache[str, bytes]:
+    return LRUCache(max_size, sizeof=len)
+
+
+class TestGet:
+    def test(self):
+        # GIVEN
+        cache = _make_cache(10)
+        cache.set("a", b"abc")
+        # WHEN
+        value = cache.get("a")
+        # THEN
+        assert value == b"abc"
+        assert cache.hits == 1
+        assert cache.misses == 0
+
+    def test_when_key_is_missing(self):
+        cache = _make_cache(10)
+        assert cache.get("a") is None
+        assert cache.hits == 0
+        assert cache.misses == 1
+
+
+class TestSet:
+    def test_least_recently_used_entry_is_evicted(self):
+        # GIVEN
+        cache = _make_cache(6)
+        cache.set("a", b"aaa")
+        cache.set("b", b"bbb")
+        cache.get("a")
+        # WHEN
+        cache.set("c", b"ccc")
+        # THEN
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.size == 6
+        assert cache.evictions == 1
+
+    def test_replacing_value_updates_size(self):
+        # GIVEN
+        cache = _make_cache(10)
+        cache.set("a", b"aaa")
+        # WHEN
+        cache.set("a", b"a")
+        # THEN
+        assert cache.get("a") == b"a"
+        assert cache.size == 1
+        assert len(cache) == 1
+
+    def test_value_larger_than_cache_is_not_stored(self):
+        # GIVEN
+        cache = _make_cache(2)
+        cache.set("a", b"a")
+        # WHEN
+        cache.set("b", b"bbb")
+        # THEN
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.evictions == 0
+
+
+class TestClear:
+    def test(self):
+        # GIVEN
+        cache = _make_cache(10)
+        cache.set("a", b"aaa")
+        cache.get("a")
+        # WHEN
+        cache.clear()
+        # THEN
+        assert len(cache) == 0
+        assert cache.size == 0
+        assert cache.hits == 1
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import time
+from io import BytesIO
+from typing import IO, TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+from app.toolkit import processpool
+from app.toolkit.processpool import ProcessPool, TaskFailed
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+pytestmark = [pytest.mark.anyio]
+
+
+def _read(content: IO[bytes], suffix: bytes = b"") -> bytes:
+    return content.read() + suffix
+
+
+def _allocate(content: IO[bytes], size: int) -> int:
+    return len(bytearray(size))
+
+
+def _sleep(content: IO[bytes], seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def _getpid(content: IO[bytes]) -> int:
+    return os.getpid()
+
+
+def _hang(content: IO[bytes], seconds: float) -> None:
+    # the alarm can't interrupt the task, like a call stuck in a C extension
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(seconds)
+
+
+def _exit(content: IO[bytes]) -> None:
+    os._exit(1)
+
+
+@pytest.fixture(scope="module")
+async def pool() -> AsyncIterator[ProcessPool]:
+    pool = ProcessPool(
+        max_workers=1,
+        max_tasks_per_worker=2,
+        memory_limit=1024 * 1024 * 1024,
+        timeout=1,
+    )
+    async with pool:
+        yield pool
+
+
+class TestRun:
+    async def test(self, pool: ProcessPool):
+        content = BytesIO(b"Hello")
+        result = await pool.run(_read, content, b", World")
+        assert result == b"Hello, World"
+
+    async def test_content_with_a_path_is_not_copied(
+        self, pool: ProcessPool, tmp_path
+    ):
+        # GIVEN
+        path = tmp_path / "f.txt"
+        path.write_bytes(b"Hello")
+        # WHEN
+        with open(path, "rb") as content:
+            result = await pool.run(_read, content)
+        # THEN
+        assert result == b"Hello"
+        assert path.exists()
+
+    @pytest.mark.parametrize("in_memory", [True, False])
+    async def test_temporary_file(self, pool: ProcessPool, in_memory: bool):
+        with processpool.temporary_file(in_memory=in_memory) as content:
+            content.write(b"Hello")
+            content.flush()
+            result = await pool.run(_read, content)
+        assert result == b"Hello"
+
+    async def test_workers_are_recycled(self, pool: ProcessPool):
+        content = BytesIO()
+        pids = {await pool.run(_getpid, content) for _ in range(4)}
+        assert len(pids) >= 2
+
+    async def test_when_memory_limit_exceeded(self, pool: ProcessPool):
+        with pytest.raises(TaskFailed):
+            await pool.run(_allocate, BytesIO(), 2 * 1024 * 1024 * 1024)
+
+    async def test_when_time_limit_exceeded(self, pool: ProcessPool):
+        with pytest.raises(TaskFailed):
+            await pool.run(_sleep, BytesIO(), 5)
+
+    async def test_when_task_is_stuck(self, pool: ProcessPool):
+        # WHEN
+        with (
+            mock.patch.object(processpool, "_KILL_GRACE_PERIOD", 0.5),
+            pytest.raises(TaskFailed),
+        ):
+            await pool.run(_hang, BytesIO(), 10)
+        # THEN
+        assert await pool.run(_read, BytesIO(b"Hello")) == b"Hello"
+
+    async def test_when_worker_dies(self, pool: ProcessPool):
+        # WHEN
+        results = await asyncio.gather(
+            pool.run(_exit, BytesIO()),
+            pool.run(_read, BytesIO(b"Hello")),
+            pool.run(_read, BytesIO(b"World")),
+            return_exceptions=True,
+        )
+        # THEN
+        assert isinstance(results[0], TaskFailed)
+        assert results[1:] == [b"Hello", b"World"]
+        assert await pool.run(_read, BytesIO(b"Hello")) == b"Hello"
+
+    async def test_when_pool_has_no_workers(self):
+        pool = ProcessPool(max_workers=0)
+        result = await pool.run(_getpid, BytesIO())
+        assert result == os.getpid()
+
+
+class TestTemporaryFile:
+    async def test_on_disk(self):
+        with processpool.temporary_file(in_memory=False) as content:
+            assert not content.name.startswith("/dev/shm/")
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.toolkit.singleflight import SingleFlight
+
+pytestmark = [pytest.mark.anyio]
+
+
+class TestRun:
+    async def test_concurrent_calls_share_result(self):
+        # GIVEN
+        calls = 0
+        flight: SingleFlight[str, int] = SingleFlight()
+
+        async def func(value: int) -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return value
+
+        # WHEN
+        results = await asyncio.gather(*(flight.run("a", func, i) for i in range(3)))
+        # THEN
+        assert results == [0, 0, 0]
+        assert calls == 1
+        assert "a" not in flight
+
+    async def test_sequential_calls_are_not_shared(self):
+        flight: SingleFlight[str, int] = SingleFlight()
+
+        async def func(value: int) -> int:
+            return value
+
+        assert await flight.run("a", func, 1) == 1
+        assert await flight.run("a", func, 2) == 2
+
+    async def test_exception_is_shared(self):
+        # GIVEN
+        flight: SingleFlight[str, int] = SingleFlight()
+
+        async def func() -> int:
+            await asyncio.sleep(0.01)
+            raise ValueError
+
+        # WHEN
+        results = await asyncio.gather(
+            flight.run("a", func), flight.run("a", func), return_exceptions=True
+        )
+        # THEN
+        assert all(isinstance(result, ValueError) for result in results)
+        assert "a" not in flight
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        # GIVEN
+        flight: SingleFlight[str, int] = SingleFlight()
+
+        async def func() -> int:
+            await asyncio.sleep(0.01)
+            return 1
+
+        first = asyncio.create_task(flight.run("a", func))
+        second = asyncio.create_task(flight.run("a", func))
+        await asyncio.sleep(0)
+        # WHEN
+        first.cancel()
+        # THEN
+        assert await second == 1
+        assert first.cancelled()
@@ -1,19 +1,94 @@
 from __future__ import annotations
 
+import logging
+import struct
 from importlib import resources
 from io import BytesIO
 from typing import TYPE_CHECKING
+from unittest import mock
 
 import pytest
-from PIL import Image
+from PIL import Image, ImageChops, ImageStat
+from PIL.JpegImagePlugin import JpegImageFile
 
+from app.toolkit import thumbnails
 from app.toolkit.mediatypes import MediaType
+from app.toolkit.processpool import ProcessPool
 from app.toolkit.thumbnails import ThumbnailUnavailable
-from app.toolkit.thumbnails.image import thumbnail_image
+from app.toolkit.thumbnails.image import (
+    collect_preview_stats,
+    thumbnail_image,
+    thumbnail_image_many,
+)
 
 if TYPE_CHECKING:
+    from pytest import LogCaptureFixture
+
     from app.app.blobs.domain import IBlobContent
 
+_draft = JpegImageFile.draft
+
+
+def _make_animation(
+    n_frames: int, duration: int, size: tuple[int, int] = (64, 64)
+) -> BytesIO:
+    """Makes an animated GIF with distinct frames of the same duration."""
+    frames = [
+        Image.new("RGB", size, (i * 5 % 256, i * 7 % 256, i * 11 % 256))
+        for i in range(n_frames)
+    ]
+    content = BytesIO()
+    frames[0].save(
+        content,
+        "gif",
+        save_all=True,
+        append_images=frames[1:],
+        duration=duration,
+        loop=0,
+    )
+    content.seek(0)
+    return content
+
+
+def _get_durations(thumbnail: bytes) -> list[int]:
+    durations = []
+    with Image.open(BytesIO(thumbnail)) as im:
+        for idx in range(im.n_frames):
+            im.seek(idx)
+            im.load()
+            durations.append(im.info["duration"])
+    return durations
+
+
+def _make_jpeg_with_preview(
+    size: tuple[int, int], preview_size: tuple[int, int], orientation: int = 1
+) -> BytesIO:
+    """Makes a blue JPEG with a red preview embedded as an EXIF IFD1 thumbnail."""
+    preview = BytesIO()
+    Image.new("RGB", preview_size, "red").save(preview, "jpeg")
+    data = preview.getvalue()
+
+    header = struct.pack("<2sHI", b"II", 42, 8)
+    # IFD0 holds the orientation only and links to IFD1 at offset 26
+    ifd0 = (
+        struct.pack("<H", 1)
+        + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0)
+        + struct.pack("<I", 26)
+    )
+    # IFD1 points to the preview data placed right after it at offset 56
+    ifd1 = (
+        struct.pack("<H", 2)
+        + struct.pack("<HHII", 0x0201, 4, 1, 56)
+        + struct.pack("<HHII", 0x0202, 4, 1, len(data))
+        + struct.pack("<I", 0)
+    )
+    exif = b"Exif\x00\x00" + header + ifd0 + ifd1 + data
+
+    content = BytesIO()
+    Image.new("RGB", size, "blue").save(content, "jpeg", exif=exif)
+    content.seek(0)
+    return content
+
 
 class TestImageThumbnail:
     pkg = resources.files("tests.data.images")
@@ -29,8 +104,11 @@ class TestImageThumbnail:
         with self.pkg.joinpath(name).open("rb") as content:
             thumbnail, mediatype = thumbnail_image(content, size=size)
 
-        assert len(thumbnail) == 12086
         assert mediatype == MediaType.IMAGE_WEBP
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.format == "WEBP"
+            assert im.size == (64, 38)
+            assert im.n_frames == 12
 
     def test_animated_image_stays_the_same_on_upscale(self):
         size = 512
@@ -41,6 +119,17 @@ class TestImageThumbnail:
         assert len(thumbnail) == 33981
         assert mediatype == MediaType.IMAGE_GIF
 
+    def test_animated_image_as_jpeg(self):
+        name = "animated.gif"
+        with self.pkg.joinpath(name).open("rb") as content:
+            thumbnail, mediatype = thumbnail_image(
+                content, size=64, output_type=MediaType.IMAGE_JPEG
+            )
+
+        assert mediatype == MediaType.IMAGE_JPEG
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.format == "JPEG"
+
     @pytest.mark.parametrize(["size", "dimensions"], [
         (256, (192, 256)),
         (2048, (480, 640)),
@@ -54,6 +143,263 @@ class TestImageThumbnail:
         with Image.open(BytesIO(thumbnail)) as im:
             assert im.size == dimensions
 
+    @pytest.mark.parametrize(["output_type", "image_format"], [
+        (MediaType.IMAGE_AVIF, "AVIF"),
+        (MediaType.IMAGE_JPEG, "JPEG"),
+    ])
+    def test_output_type(self, output_type: MediaType, image_format: str):
+        name = "park_v1_downscaled.jpeg"
+        with self.pkg.joinpath(name).open("rb") as content:
+            thumbnail, mediatype = thumbnail_image(
+                content, size=256, output_type=output_type
+            )
+
+        assert mediatype == output_type
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.format == image_format
+            assert im.size == (192, 256)
+
+    def test_transparent_image_as_jpeg(self):
+        # GIVEN
+        content = BytesIO()
+        Image.new("RGBA", (64, 64), (0, 0, 0, 0)).save(content, "png")
+        content.seek(0)
+        # WHEN
+        thumbnail, mediatype = thumbnail_image(
+            content, size=32, output_type=MediaType.IMAGE_JPEG
+        )
+        # THEN
+        assert mediatype == MediaType.IMAGE_JPEG
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.getpixel((0, 0)) == (255, 255, 255)
+
     def test_but_file_is_not_an_image(self):
         with pytest.raises(ThumbnailUnavailable):
             thumbnail_image(BytesIO(), size=128)
+
+
+class TestImageThumbnailAnimationBudget:
+    def test_frames_are_subsampled(self):
+        # GIVEN
+        content = _make_animation(n_frames=20, duration=50)
+        # WHEN
+        thumbnail, mediatype = thumbnail_image(content, size=32, max_frames=5)
+        # THEN
+        assert mediatype == MediaType.IMAGE_WEBP
+        assert _get_durations(thumbnail) == [200] * 5
+
+    def test_duration_is_capped(self):
+        # GIVEN
+        content = _make_animation(n_frames=20, duration=100)
+        # WHEN
+        thumbnail, _ = thumbnail_image(content, size=32, max_duration=1000)
+        # THEN
+        assert _get_durations(thumbnail) == [100] * 10
+
+    def test_small_animation_over_budget_is_not_returned_as_is(self):
+        # GIVEN
+        content = _make_animation(n_frames=10, duration=50)
+        # WHEN
+        thumbnail, mediatype = thumbnail_image(content, size=128, max_frames=5)
+        # THEN
+        assert mediatype == MediaType.IMAGE_WEBP
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.size == (64, 64)
+            assert im.n_frames == 5
+
+    def test_animated_webp(self):
+        # GIVEN
+        webp, _ = thumbnail_image(_make_animation(n_frames=4, duration=50), size=48)
+        # WHEN
+        thumbnail, mediatype = thumbnail_image(BytesIO(webp), size=32)
+        # THEN
+        assert mediatype == MediaType.IMAGE_WEBP
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.size == (32, 32)
+            assert im.n_frames == 4
+
+
+class TestImageThumbnailEmbeddedPreview:
+    def test(self):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120))
+        # WHEN
+        with collect_preview_stats() as stats:
+            thumbnail, mediatype = thumbnail_image(content, size=72)
+        # THEN
+        assert mediatype == MediaType.IMAGE_WEBP
+        assert stats == {"hit": 1}
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.size == (72, 54)
+            red, _, blue = im.convert("RGB").getpixel((36, 27))  # type: ignore[misc]
+            assert red > blue
+
+    def test_preview_is_rotated(self):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120), orientation=6)
+        # WHEN
+        thumbnail, _ = thumbnail_image(content, size=72)
+        # THEN
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.size == (54, 72)
+
+    def test_when_preview_is_too_small(self):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120))
+        # WHEN
+        with collect_preview_stats() as stats:
+            thumbnail, _ = thumbnail_image(content, size=256)
+        # THEN
+        assert stats == {"miss": 1}
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.size == (256, 192)
+            red, _, blue = im.convert("RGB").getpixel((128, 96))  # type: ignore[misc]
+            assert blue > red
+
+    def test_when_aspect_ratio_differs(self):
+        # GIVEN: a letterboxed 4:3 preview of a 3:2 image
+        content = _make_jpeg_with_preview((1800, 1200), (160, 120))
+        # WHEN
+        with collect_preview_stats() as stats:
+            thumbnail, _ = thumbnail_image(content, size=72)
+        # THEN
+        assert stats == {"miss": 1}
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.size == (72, 48)
+            red, _, blue = im.convert("RGB").getpixel((36, 24))  # type: ignore[misc]
+            assert blue > red
+
+    def test_when_size_is_large(self):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120))
+        # WHEN
+        with collect_preview_stats() as stats:
+            thumbnail_image(content, size=768)
+        # THEN
+        assert not stats
+
+    def test_many(self):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120))
+        # WHEN
+        with collect_preview_stats() as stats:
+            result = thumbnail_image_many(content, sizes=[32, 72])
+        # THEN
+        assert stats == {"hit": 1}
+        with Image.open(BytesIO(result[72][0])) as im:
+            assert im.size == (72, 54)
+
+
+    @pytest.mark.anyio
+    async def test_stats_are_reported_from_pool(self):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120))
+        hits = thumbnails.preview_stats["hit"]
+        # WHEN
+        async with ProcessPool(max_workers=1) as pool:
+            await thumbnails.thumbnail(content, size=72, pool=pool)
+        # THEN
+        assert thumbnails.preview_stats["hit"] == hits + 1
+
+    @pytest.mark.anyio
+    async def test_stats_are_logged(self, caplog: LogCaptureFixture):
+        # GIVEN
+        content = _make_jpeg_with_preview((1600, 1200), (160, 120))
+        caplog.set_level(logging.INFO, logger=thumbnails.__name__)
+        # WHEN
+        with mock.patch.object(thumbnails, "_PREVIEW_STATS_LOG_INTERVAL", 1):
+            await thumbnails.thumbnail(content, size=72)
+        # THEN
+        hits, misses = thumbnails.preview_stats["hit"], thumbnails.preview_stats["miss"]
+        msg = f"Embedded thumbnail previews: {hits} hits, {misses} misses"
+        assert caplog.record_tuples == [(thumbnails.__name__, logging.INFO, msg)]
+
+
+class TestImageThumbnailDraft:
+    pkg = resources.files("tests.data.images")
+
+    @pytest.mark.parametrize("name", ["baikal_v1.jpeg", "park_v1.jpeg"])
+    def test(self, name: str):
+        # GIVEN
+        size = 120
+        content = BytesIO(self.pkg.joinpath(name).read_bytes())
+        with Image.open(content) as im:
+            full_size = im.size
+        decoded_sizes = []
+
+        def draft(im: JpegImageFile, *args):
+            result = _draft(im, *args)
+            decoded_sizes.append(im.size)
+            return result
+
+        # WHEN
+        content.seek(0)
+        with mock.patch.object(JpegImageFile, "draft", draft):
+            thumbnail, mediatype = thumbnail_image(content, size=size)
+        content.seek(0)
+        with mock.patch.object(JpegImageFile, "draft", return_value=None):
+            full_decode_thumbnail, _ = thumbnail_image(content, size=size)
+
+        # THEN
+        assert decoded_sizes == [(full_size[0] // 4, full_size[1] // 4)]
+        assert mediatype == MediaType.IMAGE_WEBP
+        with (
+            Image.open(BytesIO(thumbnail)) as im,
+            Image.open(BytesIO(full_decode_thumbnail)) as full_decode_im,
+        ):
+            assert im.size == full_decode_im.size
+            diff = ImageChops.difference(
+                im.convert("RGB"), full_decode_im.convert("RGB")
+            )
+            assert max(ImageStat.Stat(diff).mean) < 5
+
+
+class TestImageThumbnailMany:
+    pkg = resources.files("tests.data.images")
+
+    def test(self):
+        name = "park_v1_downscaled.jpeg"
+        with self.pkg.joinpath(name).open("rb") as content:
+            result = thumbnail_image_many(content, sizes=[2048, 128, 256])
+
+        assert result.keys() == {128, 256, 2048}
+        expected = {128: (96, 128), 256: (192, 256), 2048: (480, 640)}
+        for size, (thumbnail, mediatype) in result.items():
+            assert mediatype == MediaType.IMAGE_WEBP
+            with Image.open(BytesIO(thumbnail)) as im:
+                assert im.size == expected[size]
+
+    def test_output_type(self):
+        name = "park_v1_downscaled.jpeg"
+        with self.pkg.joinpath(name).open("rb") as content:
+            result = thumbnail_image_many(
+                content, sizes=[128, 256], output_type=MediaType.IMAGE_AVIF
+            )
+
+        for thumbnail, mediatype in result.values():
+            assert mediatype == MediaType.IMAGE_AVIF
+            with Image.open(BytesIO(thumbnail)) as im:
+                assert im.format == "AVIF"
+
+    def test_decodes_image_once(self):
+        name = "park_v1_downscaled.jpeg"
+        target = "app.toolkit.thumbnails.image.Image.open"
+        with (
+            self.pkg.joinpath(name).open("rb") as content,
+            mock.patch(target, wraps=Image.open) as open_mock,
+        ):
+            thumbnail_image_many(content, sizes=[64, 128, 256])
+
+        open_mock.assert_called_once()
+
+    def test_on_animated_image(self):
+        name = "animated.gif"
+        with self.pkg.joinpath(name).open("rb") as content:
+            result = thumbnail_image_many(content, sizes=[64, 512])
+
+        assert result[64][1] == MediaType.IMAGE_WEBP
+        assert result[512][1] == MediaType.IMAGE_GIF
+
+    def test_but_file_is_not_an_image(self):
+        with pytest.raises(ThumbnailUnavailable):
+            thumbnail_image_many(BytesIO(), sizes=[128])
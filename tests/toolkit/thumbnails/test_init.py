@@ -5,6 +5,7 @@ from unittest import mock
 import pytest
 
 from app.toolkit import thumbnails
+from app.toolkit.mediatypes import MediaType
 
 
 class TestIsSupported:
@@ -32,7 +33,13 @@ class TestThumbnail:
         # THEN
         assert result == image_mock.return_value
         guess_mock.assert_called_once_with(content)
-        image_mock.assert_called_once_with(content, size=32)
+        image_mock.assert_called_once_with(
+            content,
+            size=32,
+            output_type=MediaType.IMAGE_WEBP,
+            max_frames=thumbnails.MAX_ANIMATION_FRAMES,
+            max_duration=thumbnails.MAX_ANIMATION_DURATION,
+        )
 
     async def test_image(self):
         # GIVEN
@@ -48,7 +55,60 @@ class TestThumbnail:
         # THEN
         assert result == image_mock.return_value
         guess_mock.assert_called_once_with(content)
-        image_mock.assert_called_once_with(content, size=32)
+        image_mock.assert_called_once_with(
+            content,
+            size=32,
+            output_type=MediaType.IMAGE_WEBP,
+            max_frames=thumbnails.MAX_ANIMATION_FRAMES,
+            max_duration=thumbnails.MAX_ANIMATION_DURATION,
+        )
+
+    async def test_image_with_output_type(self):
+        # GIVEN
+        content = mock.MagicMock()
+        output_type = MediaType.IMAGE_AVIF
+        target_guess = "app.toolkit.thumbnails.mediatypes.guess"
+        target_image = "app.toolkit.thumbnails.thumbnail_image"
+        # WHEN
+        with (
+            mock.patch(target_guess, return_value="image/jpeg"),
+            mock.patch(target_image) as image_mock,
+        ):
+            result = await thumbnails.thumbnail(
+                content, size=32, output_type=output_type
+            )
+        # THEN
+        assert result == image_mock.return_value
+        image_mock.assert_called_once_with(
+            content,
+            size=32,
+            output_type=output_type,
+            max_frames=thumbnails.MAX_ANIMATION_FRAMES,
+            max_duration=thumbnails.MAX_ANIMATION_DURATION,
+        )
+
+    async def test_image_with_animation_budget(self):
+        # GIVEN
+        content = mock.MagicMock()
+        target_guess = "app.toolkit.thumbnails.mediatypes.guess"
+        target_image = "app.toolkit.thumbnails.thumbnail_image"
+        # WHEN
+        with (
+            mock.patch(target_guess, return_value="image/gif"),
+            mock.patch(target_image) as image_mock,
+        ):
+            result = await thumbnails.thumbnail(
+                content, size=32, max_frames=5, max_duration=1000
+            )
+        # THEN
+        assert result == image_mock.return_value
+        image_mock.assert_called_once_with(
+            content,
+            size=32,
+            output_type=MediaType.IMAGE_WEBP,
+            max_frames=5,
+            max_duration=1000,
+        )
 
     async def test_pdf(self):
         # GIVEN
@@ -63,7 +123,12 @@ class TestThumbnail:
             result = await thumbnails.thumbnail(content, size=32)
         # THEN
         assert result == pdf_mock.return_value
-        pdf_mock.assert_called_once_with(content, size=32, mediatype="application/pdf")
+        pdf_mock.assert_called_once_with(
+            content,
+            size=32,
+            mediatype="application/pdf",
+            output_type=MediaType.IMAGE_WEBP,
+        )
 
     async def test_svg(self):
         # GIVEN
@@ -80,3 +145,63 @@ class TestThumbnail:
         assert result == svg_mock.return_value
         guess_mock.assert_called_once_with(content)
         svg_mock.assert_called_once_with(content)
+
+
+@pytest.mark.anyio
+class TestThumbnailMany:
+    async def test_image(self):
+        # GIVEN
+        content = mock.MagicMock()
+        target_guess = "app.toolkit.thumbnails.mediatypes.guess"
+        target_image = "app.toolkit.thumbnails.thumbnail_image_many"
+        # WHEN
+        with (
+            mock.patch(target_guess, return_value="image/jpeg") as guess_mock,
+            mock.patch(target_image) as image_mock,
+        ):
+            result = await thumbnails.thumbnail_many(content, sizes=[32, 64])
+        # THEN
+        assert result == image_mock.return_value
+        guess_mock.assert_called_once_with(content)
+        image_mock.assert_called_once_with(
+            content,
+            sizes=[32, 64],
+            output_type=MediaType.IMAGE_WEBP,
+            max_frames=thumbnails.MAX_ANIMATION_FRAMES,
+            max_duration=thumbnails.MAX_ANIMATION_DURATION,
+        )
+
+    async def test_pdf(self):
+        # GIVEN
+        content = mock.MagicMock()
+        target_guess = "app.toolkit.thumbnails.mediatypes.guess"
+        target_pdf = "app.toolkit.thumbnails.thumbnail_pdf_many"
+        # WHEN
+        with (
+            mock.patch(target_guess, return_value="application/pdf"),
+            mock.patch(target_pdf) as pdf_mock,
+        ):
+            result = await thumbnails.thumbnail_many(content, sizes=[32, 64])
+        # THEN
+        assert result == pdf_mock.return_value
+        pdf_mock.assert_called_once_with(
+            content,
+            sizes=[32, 64],
+            mediatype="application/pdf",
+            output_type=MediaType.IMAGE_WEBP,
+        )
+
+    async def test_svg(self):
+        # GIVEN
+        content = mock.MagicMock()
+        target_guess = "app.toolkit.thumbnails.mediatypes.guess"
+        target_svg = "app.toolkit.thumbnails.thumbnail_svg"
+        # WHEN
+        with (
+            mock.patch(target_guess, return_value="image/svg+xml"),
+            mock.patch(target_svg) as svg_mock,
+        ):
+            result = await thumbnails.thumbnail_many(content, sizes=[32, 64])
+        # THEN
+        assert result == {32: svg_mock.return_value, 64: svg_mock.return_value}
+        svg_mock.assert_called_once_with(content)
@@ -7,7 +7,7 @@ import pytest
 from PIL import Image
 
 from app.toolkit.mediatypes import MediaType
-from app.toolkit.thumbnails.pdf import thumbnail_pdf
+from app.toolkit.thumbnails.pdf import thumbnail_pdf, thumbnail_pdf_many
 
 
 class TestPDFThumbnail:
@@ -41,3 +41,36 @@ class TestPDFThumbnail:
         assert width < 842
         assert height == 842
         assert thumbnail_mediatype == MediaType.IMAGE_WEBP
+
+
+    def test_output_type(self):
+        name = "example.pdf"
+        with self.pkg.joinpath(name).open("rb") as content:
+            result = thumbnail_pdf(
+                content,
+                size=64,
+                mediatype="application/pdf",
+                output_type=MediaType.IMAGE_JPEG,
+            )
+
+        thumbnail, thumbnail_mediatype = result
+        with Image.open(BytesIO(thumbnail)) as im:
+            assert im.format == "JPEG"
+        assert thumbnail_mediatype == MediaType.IMAGE_JPEG
+
+
+class TestPDFThumbnailMany:
+    pkg = resources.files("tests.data.pdf")
+
+    def test(self):
+        name = "example.pdf"
+        with self.pkg.joinpath(name).open("rb") as content:
+            result = thumbnail_pdf_many(
+                content, sizes=[64, 256], mediatype="application/pdf"
+            )
+
+        assert result.keys() == {64, 256}
+        for size, (thumbnail, mediatype) in result.items():
+            assert mediatype == MediaType.IMAGE_WEBP
+            with Image.open(BytesIO(thumbnail)) as im:
+                assert max(im.size) == size
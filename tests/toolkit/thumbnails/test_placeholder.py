@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import base64
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+from app.toolkit.thumbnails.image import thumbnail_image
+from app.toolkit.thumbnails.placeholder import PLACEHOLDER_SIZE, placeholder
+
+if TYPE_CHECKING:
+    from app.app.blobs.domain import IBlobContent
+
+
+class TestPlaceholder:
+    def test(self, image_content: IBlobContent):
+        # GIVEN
+        thumbnail, _ = thumbnail_image(image_content.file, size=72)
+        # WHEN
+        result = placeholder(thumbnail)
+        # THEN
+        assert result is not None
+        prefix = "data:image/webp;base64,"
+        assert result.startswith(prefix)
+        data = base64.b64decode(result.removeprefix(prefix))
+        assert len(data) < 256
+        with Image.open(BytesIO(data)) as im:
+            assert max(im.size) <= PLACEHOLDER_SIZE
+
+    def test_when_thumbnail_is_not_a_raster_image(self, svg_content: IBlobContent):
+        assert placeholder(svg_content.file.read()) is None
@@ -14,6 +14,8 @@ from app.app.blobs.services import (
 from app.app.files.services import FileService
 from app.app.files.services.file import FileCoreService
 from app.app.files.usecases.namespace import NamespaceUseCase
+from app.app.infrastructure.worker import IWorker
+from app.app.photos.usecases import MediaItemUseCase
 from app.infrastructure.context import UseCases
 
 if TYPE_CHECKING:
@@ -23,10 +25,12 @@ if TYPE_CHECKING:
 @pytest.fixture
 def arq_context() -> ARQContext:
     return {
+        "job_id": "test-job-id",
         "usecases": mock.MagicMock(
             UseCases,
             blob=mock.MagicMock(BlobService),
             blob_content_processor=mock.MagicMock(BlobContentProcessor),
+            media_item=mock.MagicMock(MediaItemUseCase),
             namespace=mock.MagicMock(
                 NamespaceUseCase,
                 file=mock.MagicMock(
@@ -36,5 +40,6 @@ def arq_context() -> ARQContext:
                 thumbnailer=mock.MagicMock(BlobThumbnailService),
             ),
         ),
+        "worker": mock.MagicMock(IWorker),
         "_stack": AsyncExitStack(),
     }
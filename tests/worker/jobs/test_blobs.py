@@ -20,12 +20,48 @@ class TestProcessBlobContent:
         blob_id = uuid.uuid7()
         usecases = cast(mock.MagicMock, arq_context["usecases"])
         content_processor = usecases.blob_content_processor
+        content_processor.process.return_value = 1024
         # WHEN
         await blobs.process_blob_content(arq_context, blob_id)
         # THEN
         content_processor.process.assert_awaited_once_with(blob_id)
 
 
+class TestProcessBlobContentBatch:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        blob_ids = [uuid.uuid7(), uuid.uuid7()]
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        content_processor = usecases.blob_content_processor
+        content_processor.process_batch.return_value = 2048
+        # WHEN
+        await blobs.process_blob_content_batch(arq_context, blob_ids)
+        # THEN
+        content_processor.process_batch.assert_awaited_once_with(blob_ids)
+
+
+class TestProcessMissedBlobContent:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        content_processor = usecases.blob_content_processor
+        content_processor.process_missed.return_value = 2
+        # WHEN
+        await blobs.process_missed_blob_content(arq_context)
+        # THEN
+        content_processor.process_missed.assert_awaited_once_with()
+
+    async def test_when_failed(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        content_processor = usecases.blob_content_processor
+        content_processor.process_missed.side_effect = Exception
+        # WHEN
+        await blobs.process_missed_blob_content(arq_context)
+        # THEN
+        content_processor.process_missed.assert_awaited_once_with()
+
+
 class TestProcessBlobJobs:
     async def test(self, arq_context: ARQContext):
         # GIVEN
@@ -38,3 +74,23 @@ class TestProcessBlobJobs:
 
         # THEN
         blob_service.process_blob_jobs.assert_awaited_once_with(ids)
+
+
+class TestProcessPendingBlobJobs:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.blob.process_pending_blob_jobs.return_value = 2
+        # WHEN
+        await blobs.process_pending_blob_jobs(arq_context)
+        # THEN
+        usecases.blob.process_pending_blob_jobs.assert_awaited_once_with()
+
+    async def test_when_failed(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.blob.process_pending_blob_jobs.side_effect = Exception
+        # WHEN
+        await blobs.process_pending_blob_jobs(arq_context)
+        # THEN
+        usecases.blob.process_pending_blob_jobs.assert_awaited_once_with()
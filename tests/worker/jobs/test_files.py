@@ -48,14 +48,14 @@ class TestDeleteImmediatelyBatch:
     async def test(self, caplog: LogCaptureFixture, arq_context: ARQContext):
         # GIVEN
         ns_path = "admin"
-        side_effect = [
+        batch_results = [
             _make_file(ns_path, "Trash/a.txt"),
-            File.NotFound,
-            Exception,
+            File.NotFound(),
+            Exception(),
             _make_file(ns_path, "Tras/f.txt"),
         ]
         usecases = cast(mock.MagicMock, arq_context["usecases"])
-        usecases.namespace.delete_item.side_effect = side_effect
+        usecases.namespace.delete_item_batch.return_value = batch_results
         paths = ["a.txt", "b.txt", "c.txt", "d.txt"]
 
         # WHEN
@@ -65,7 +65,7 @@ class TestDeleteImmediatelyBatch:
         assert len(results) == 4
 
         assert results[0].file is not None
-        assert results[0].file.path == side_effect[0].path
+        assert results[0].file.path == batch_results[0].path
 
         assert results[1].file is None
         assert results[1].err_code == ErrorCode.file_not_found
@@ -74,15 +74,69 @@ class TestDeleteImmediatelyBatch:
         assert results[2].err_code == ErrorCode.internal
 
         assert results[3].file is not None
-        assert results[3].file.path == side_effect[3].path
+        assert results[3].file.path == batch_results[3].path
 
-        assert usecases.namespace.delete_item.await_count == len(results)
+        usecases.namespace.delete_item_batch.assert_awaited_once_with(
+            ns_path, paths, on_result=mock.ANY
+        )
 
         msg = "Unexpectedly failed to delete a file"
         log_record = ("app.worker.jobs.files", logging.ERROR, msg)
         assert caplog.record_tuples == [log_record]
 
 
+    async def test_progress_is_published(self, arq_context: ARQContext):
+        # GIVEN
+        ns_path, paths = "admin", ["a.txt", "b.txt"]
+        file = _make_file(ns_path, "a.txt")
+
+        async def delete_item_batch(ns_path, paths, *, on_result):
+            await on_result(1, File.NotFound())
+            await on_result(0, file)
+            return [file, File.NotFound()]
+
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.namespace.delete_item_batch.side_effect = delete_item_batch
+        worker = cast(mock.MagicMock, arq_context["worker"])
+
+        # WHEN
+        await files.delete_immediately_batch(arq_context, ns_path, paths)
+
+        # THEN
+        calls = worker.publish_progress.await_args_list
+        assert [call.args[0] for call in calls] == [arq_context["job_id"]] * 2
+        (idx_1, result_1), (idx_2, result_2) = [call.args[1] for call in calls]
+        assert (idx_1, result_1.file, result_1.err_code) == (
+            1, None, ErrorCode.file_not_found
+        )
+        assert (idx_2, result_2.file, result_2.err_code) == (0, file, None)
+
+    async def test_when_publishing_progress_fails(
+        self, caplog: LogCaptureFixture, arq_context: ARQContext
+    ):
+        # GIVEN
+        ns_path, paths = "admin", ["a.txt"]
+        file = _make_file(ns_path, "a.txt")
+
+        async def delete_item_batch(ns_path, paths, *, on_result):
+            await on_result(0, file)
+            return [file]
+
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.namespace.delete_item_batch.side_effect = delete_item_batch
+        worker = cast(mock.MagicMock, arq_context["worker"])
+        worker.publish_progress.side_effect = Exception
+
+        # WHEN
+        results = await files.delete_immediately_batch(arq_context, ns_path, paths)
+
+        # THEN
+        assert results[0].file == file
+        msg = "Failed to publish job progress"
+        log_record = ("app.worker.jobs.files", logging.ERROR, msg)
+        assert caplog.record_tuples == [log_record]
+
+
 class TestEmptyTrash:
     async def test(self, arq_context: ARQContext):
         # GIVEN
@@ -117,10 +171,10 @@ class TestMoveBatch:
         ns_path = "admin"
         context = _make_context()
         usecases = cast(mock.MagicMock, arq_context["usecases"])
-        usecases.namespace.move_item.side_effect = [
+        usecases.namespace.move_item_batch.return_value = [
             _make_file(ns_path, "folder/a.txt"),
-            File.MissingParent,
-            Exception,
+            File.MissingParent(),
+            Exception(),
             _make_file(ns_path, "f.txt"),
         ]
 
@@ -151,7 +205,11 @@ class TestMoveBatch:
         assert results[3].file is not None
         assert results[3].file.path == relocations[3].to_path
 
-        assert usecases.namespace.move_item.await_count == len(results)
+        usecases.namespace.move_item_batch.assert_awaited_once_with(
+            ns_path,
+            [(r.from_path, r.to_path) for r in relocations],
+            on_result=mock.ANY,
+        )
 
         msg = "Unexpectedly failed to move a file"
         log_record = ("app.worker.jobs.files", logging.ERROR, msg)
@@ -165,12 +223,12 @@ class TestMovetoTrashFile:
         context = _make_context()
         side_effect = [
             _make_file(ns_path, "Trash/a.txt"),
-            File.NotFound,
-            Exception,
+            File.NotFound(),
+            Exception(),
             _make_file(ns_path, "Tras/f.txt"),
         ]
         usecases = cast(mock.MagicMock, arq_context["usecases"])
-        usecases.namespace.move_item_to_trash.side_effect = side_effect
+        usecases.namespace.move_item_to_trash_batch.return_value = side_effect
 
         paths = ["a.txt", "b.txt", "c.txt", "d.txt"]
 
@@ -194,8 +252,79 @@ class TestMovetoTrashFile:
         assert results[3].file is not None
         assert results[3].file.path == side_effect[3].path
 
-        assert usecases.namespace.move_item_to_trash.await_count == len(results)
+        usecases.namespace.move_item_to_trash_batch.assert_awaited_once_with(
+            ns_path, paths, on_result=mock.ANY
+        )
 
         msg = "Unexpectedly failed to move file to trash"
         log_record = ("app.worker.jobs.files", logging.ERROR, msg)
         assert caplog.record_tuples == [log_record]
+
+
+class TestPurgeDeletedFiles:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        # WHEN
+        await files.purge_deleted_files(arq_context)
+        # THEN
+        usecases.namespace.purge_deleted_files.assert_awaited_once_with()
+
+    async def test_when_failed_unexpectedly(
+        self, caplog: LogCaptureFixture, arq_context: ARQContext
+    ):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.namespace.purge_deleted_files.side_effect = Exception
+        # WHEN
+        await files.purge_deleted_files(arq_context)
+        # THEN
+        msg = "Unexpectedly failed to purge deleted files"
+        log_record = ("app.worker.jobs.files", logging.ERROR, msg)
+        assert caplog.record_tuples == [log_record]
+
+
+class TestPurgeExpiredTrash:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        # WHEN
+        await files.purge_expired_trash(arq_context)
+        # THEN
+        usecases.namespace.purge_expired_trash.assert_awaited_once_with()
+
+    async def test_when_failed_unexpectedly(
+        self, caplog: LogCaptureFixture, arq_context: ARQContext
+    ):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.namespace.purge_expired_trash.side_effect = Exception
+        # WHEN
+        await files.purge_expired_trash(arq_context)
+        # THEN
+        msg = "Unexpectedly failed to purge expired trash"
+        log_record = ("app.worker.jobs.files", logging.ERROR, msg)
+        assert caplog.record_tuples == [log_record]
+
+
+class TestReconcileSpaceUsage:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        # WHEN
+        await files.reconcile_space_usage(arq_context)
+        # THEN
+        usecases.namespace.reconcile_space_usage.assert_awaited_once_with()
+
+    async def test_when_failed_unexpectedly(
+        self, caplog: LogCaptureFixture, arq_context: ARQContext
+    ):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.namespace.reconcile_space_usage.side_effect = Exception
+        # WHEN
+        await files.reconcile_space_usage(arq_context)
+        # THEN
+        msg = "Unexpectedly failed to reconcile space usage"
+        log_record = ("app.worker.jobs.files", logging.ERROR, msg)
+        assert caplog.record_tuples == [log_record]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, cast
+from unittest import mock
+
+import pytest
+
+from app.worker.jobs import photos
+
+if TYPE_CHECKING:
+    from pytest import LogCaptureFixture
+
+    from app.worker.main import ARQContext
+
+pytestmark = [pytest.mark.anyio]
+
+
+class TestPurgeExpiredMediaItems:
+    async def test(self, arq_context: ARQContext):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        # WHEN
+        await photos.purge_expired_media_items(arq_context)
+        # THEN
+        usecases.media_item.purge_expired.assert_awaited_once_with()
+
+    async def test_when_failed_unexpectedly(
+        self, caplog: LogCaptureFixture, arq_context: ARQContext
+    ):
+        # GIVEN
+        usecases = cast(mock.MagicMock, arq_context["usecases"])
+        usecases.media_item.purge_expired.side_effect = Exception
+        # WHEN
+        await photos.purge_expired_media_items(arq_context)
+        # THEN
+        msg = "Unexpectedly failed to purge expired media items"
+        log_record = ("app.worker.jobs.photos", logging.ERROR, msg)
+        assert caplog.record_tuples == [log_record]
@@ -4,7 +4,9 @@ import pytest
 from arq.connections import ArqRedis
 from arq.worker import Worker
 
-from app.worker.main import WorkerSettings
+from app.infrastructure.worker.arq import QUEUE_NAMES, Lane
+from app.worker.__main__ import parse_lanes
+from app.worker.main import LANE_SETTINGS, WorkerSettings
 
 pytestmark = [pytest.mark.anyio]
 
@@ -35,3 +37,29 @@ class TestWorker:
         assert job is not None
         result = await job.result(timeout=1)
         assert result == "pong"
+
+
+class TestLaneSettings:
+    @pytest.mark.parametrize("lane", list(Lane))
+    async def test(self, lane: Lane):
+        settings = LANE_SETTINGS[lane]
+        assert settings.queue_name == QUEUE_NAMES[lane]
+        assert settings.functions == WorkerSettings.functions
+
+    async def test_cron_jobs_run_only_in_default_lane(self):
+        assert LANE_SETTINGS[Lane.default].cron_jobs
+        assert not LANE_SETTINGS[Lane.interactive].cron_jobs
+        assert not LANE_SETTINGS[Lane.bulk].cron_jobs
+
+
+class TestParseLanes:
+    async def test(self):
+        assert parse_lanes(["bulk", "interactive", "bulk"]) == [
+            Lane.bulk, Lane.interactive
+        ]
+
+    async def test_all_lanes_by_default(self):
+        assert parse_lanes([]) == list(Lane)
+
+    async def test_default_lane_when_lanes_disabled(self):
+        assert parse_lanes([], lanes_enabled=False) == [Lane.default]